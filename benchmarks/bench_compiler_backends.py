@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+""" Benchmark: Compiler Backends
+
+Compile a large synthetic corpus of Feature files with each compiler backend.
+
+    "ast"     := parse the Feature file once and write the step stubs
+    "morelia" := run the Feature file and read morelia's missing steps
+
+Run from the repository root:
+
+    python benchmarks/bench_compiler_backends.py --features 500 --steps 20 --rows 10
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from testharness.bdd.compiler import testcase_writer
+
+FEATURE_HEADER_FMT = """Feature:
+    @TestCaseKey=BENCH-T{index}
+    Scenario Outline: Synthetic Feature {index}
+
+"""
+
+
+def write_corpus(features_dir, feature_count, step_count, row_count):
+    """ Write a synthetic corpus of Scenario Outline Feature files.
+
+    :returns: list of Feature file paths
+    """
+
+    feature_files = []
+    for index in range(feature_count):
+        lines = [FEATURE_HEADER_FMT.format(index=index)]
+        for step in range(step_count):
+            keyword = 'When' if step == 0 else 'And'
+            lines.append('        {} step {} of feature {} uses <column_{}>\n'.format(
+                keyword, step, index, step % 4))
+
+        lines.append('\n        Examples:\n')
+        lines.append('            | {} |\n'.format(' | '.join('column_{}'.format(c) for c in range(4))))
+        for row in range(row_count):
+            lines.append('            | {} |\n'.format(' | '.join('value_{}'.format(row) for c in range(4))))
+
+        feature_file = os.path.join(features_dir, 'BENCH-T{}.feature'.format(index))
+        with open(feature_file, 'w') as f:
+            f.writelines(lines)
+        feature_files.append(feature_file)
+
+    return feature_files
+
+
+def time_backend(feature_files, backend):
+    """ Time one compiler backend over the whole corpus.
+
+    :returns: elapsed seconds
+    """
+
+    with tempfile.TemporaryDirectory() as package_directory:
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            start = time.perf_counter()
+            summary = testcase_writer.compile_many(feature_files, 'test', package_directory,
+                                                   jobs=1, backend=backend)
+            elapsed = time.perf_counter() - start
+
+    if not summary.ok:
+        raise RuntimeError('{} backend failed: {}'.format(backend, summary))
+    return elapsed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the BDD compiler backends.")
+    parser.add_argument("--features", type=int, default=500, help="Feature files in the corpus")
+    parser.add_argument("--steps", type=int, default=20, help="steps per Feature file")
+    parser.add_argument("--rows", type=int, default=10, help="Examples rows per Feature file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as features_dir:
+        feature_files = write_corpus(features_dir, args.features, args.steps, args.rows)
+
+        print('Corpus: {} features x {} steps x {} rows'.format(args.features, args.steps, args.rows))
+        for backend in testcase_writer.COMPILER_BACKENDS:
+            elapsed = time_backend(feature_files, backend)
+            print('{:8} {:8.3f}s total {:8.3f}ms/feature'.format(
+                backend, elapsed, 1000.0 * elapsed / args.features))
@@ -0,0 +1,57 @@
+#! /usr/bin/env python
+""" Benchmark: Feature Cache
+
+Load a large synthetic corpus of Feature files three ways.
+
+    "parse" := morelia parses every Feature file, no cache
+    "cold"  := the feature cache is empty; parse and write every cache file
+    "warm"  := unpickle every Feature from its cache file
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_feature_cache.py --features 1000 --steps 20 --rows 10
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from morelia.parser import Parser
+
+from bench_compiler_backends import write_corpus
+from testharness.bdd.runner import feature_cache
+
+
+def time_loads(feature_files, load):
+    """ Time loading every Feature file once.
+
+    :returns: elapsed seconds
+    """
+
+    start = time.perf_counter()
+    for feature_file in feature_files:
+        load(feature_file)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the parsed Feature cache.")
+    parser.add_argument("--features", type=int, default=1000, help="Feature files in the corpus")
+    parser.add_argument("--steps", type=int, default=20, help="steps per Feature file")
+    parser.add_argument("--rows", type=int, default=10, help="Examples rows per Feature file")
+    args = parser.parse_args()
+
+    features_dir = tempfile.mkdtemp()
+    try:
+        feature_files = write_corpus(features_dir, args.features, args.steps, args.rows)
+
+        print('Corpus: {} features x {} steps x {} rows'.format(args.features, args.steps, args.rows))
+        for name, load in [('parse', lambda f: Parser().parse_file(f)),
+                           ('cold', feature_cache.load_feature),
+                           ('warm', feature_cache.load_feature)]:
+            elapsed = time_loads(feature_files, load)
+            print('{:6} {:8.3f}s total {:8.3f}ms/feature'.format(
+                name, elapsed, 1000.0 * elapsed / args.features))
+    finally:
+        shutil.rmtree(features_dir)
@@ -0,0 +1,134 @@
+#! /usr/bin/env python
+""" Benchmark: Pooled HTTP Client
+
+Send GET requests to a local stand-in REST server two ways.
+
+    "new"    := a new connection per request, as a client built per test does
+    "pooled" := PooledHttpClient, sharing keep-alive connections
+
+The stand-in server answers each request with a small JSON document
+after --latency ms. Use --tls to add a TLS handshake to each connection;
+it needs the "openssl" command to make a throwaway certificate.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_http_client.py --requests 2000 --threads 8
+"""
+
+import argparse
+import http.client
+import os
+import ssl
+import subprocess
+import tempfile
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testharness.bdd.http.client import PooledHttpClient
+
+PAYLOAD = b'{"WFA_SERVERS": ["wfa1", "wfa2"], "message": "OK"}'
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True  # As production servers do.
+    latency = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.latency:
+            time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(PAYLOAD)))
+        self.end_headers()
+        self.wfile.write(PAYLOAD)
+
+
+def start_server(latency, tls_dir=None):
+    """ Start the stand-in server on a free port.
+
+    :returns: (server, base_url, client ssl context or None)
+    """
+
+    StandInHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.daemon_threads = True
+    client_context = None
+    scheme = 'http'
+    if tls_dir:
+        (cert_file, key_file) = (os.path.join(tls_dir, 'cert.pem'), os.path.join(tls_dir, 'key.pem'))
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=127.0.0.1', '-keyout', key_file, '-out', cert_file],
+                       check=True, capture_output=True)
+        server_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        server_context.load_cert_chain(cert_file, key_file)
+        server.socket = server_context.wrap_socket(server.socket, server_side=True)
+        client_context = ssl.create_default_context(cafile=cert_file)
+        client_context.check_hostname = False
+        scheme = 'https'
+
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return (server, '{}://127.0.0.1:{}/'.format(scheme, server.server_port), client_context)
+
+
+def get_new_connection(base_url, ssl_context):
+    """ GET over a new connection, closed after the response. """
+
+    port = int(base_url.rsplit(':', 1)[1].strip('/'))
+    if ssl_context is not None:
+        connection = http.client.HTTPSConnection('127.0.0.1', port, context=ssl_context)
+    else:
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+    try:
+        connection.request('GET', '/osscwl/servers')
+        return connection.getresponse().read()
+    finally:
+        connection.close()
+
+
+def time_requests(send, requests, threads):
+    """ Time `requests` calls of send() over `threads` threads.
+
+    :returns: elapsed seconds
+    """
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda n: send(), range(requests)))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the pooled HTTP client.")
+    parser.add_argument("--requests", type=int, default=2000, help="GET requests per run")
+    parser.add_argument("--threads", type=int, default=8, help="client threads")
+    parser.add_argument("--latency", type=float, default=0.0, help="server latency in ms")
+    parser.add_argument("--tls", action='store_true', help="serve HTTPS")
+    args = parser.parse_args()
+
+    tls_dir = tempfile.mkdtemp() if args.tls else None
+    (server, base_url, ssl_context) = start_server(args.latency / 1000.0, tls_dir)
+    try:
+        client = PooledHttpClient(base_url, pool_size=args.threads, ssl_context=ssl_context)
+        runs = [
+            ('new', lambda: get_new_connection(base_url, ssl_context)),
+            ('pooled', lambda: client.get('/osscwl/servers').content),
+        ]
+
+        print('{} requests, {} threads, {}'.format(args.requests, args.threads, base_url))
+        for (name, send) in runs:
+            elapsed = time_requests(send, args.requests, args.threads)
+            print('{:7} {:8.3f}s total {:8.3f}ms/request {:9.1f} requests/s'.format(
+                name, elapsed, 1000.0 * elapsed / args.requests, args.requests / elapsed))
+        print('pooled connections: {} created, {} reused'.format(
+            client.pool.connections_created, client.pool.connections_reused))
+    finally:
+        server.shutdown()
+        server.server_close()
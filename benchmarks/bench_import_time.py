@@ -0,0 +1,58 @@
+#! /usr/bin/env python
+""" Benchmark: Import Time
+
+Measure the import time of the test harness modules that the bin/ scripts
+load before argparse runs, with "python -X importtime".
+Each module is imported in a new interpreter several times; the fastest
+run counts. The script exits 1 when any module is over its budget, so
+it can guard CI against a slow startup creeping back in.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_import_time.py --runs 5
+"""
+
+import argparse
+import subprocess
+import sys
+
+# Import time budget, in milliseconds, for each module.
+IMPORT_BUDGETS_MS = {
+    'testharness.bdd': 5.0,
+    'testharness.bdd.compiler.testcase_writer': 60.0,
+    'testharness.bdd.compiler.tm4j_features': 60.0,
+    'testharness.bdd.tm4j.report_testruns': 40.0,
+}
+
+
+def get_import_time(module_name):
+    """ Get Import Time.
+
+    :param str module_name: module to import in a new interpreter
+    :returns: the module's cumulative import time in milliseconds
+    """
+
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module_name],
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True).stderr
+
+    # import time: self [us] | cumulative | imported package
+    for line in reversed(output.splitlines()):
+        fields = [field.strip() for field in line.split('|')]
+        if len(fields) == 3 and fields[2] == module_name:
+            return int(fields[1]) / 1000.0
+    raise RuntimeError('No import time for "{}"'.format(module_name))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the test harness import time.")
+    parser.add_argument("--runs", type=int, default=5, help="imports per module; the fastest counts")
+    args = parser.parse_args()
+
+    over_budget = False
+    for module_name, budget_ms in sorted(IMPORT_BUDGETS_MS.items()):
+        import_ms = min(get_import_time(module_name) for run in range(args.runs))
+        status = 'ok' if import_ms <= budget_ms else 'OVER BUDGET'
+        over_budget = over_budget or import_ms > budget_ms
+        print('{:45} {:8.1f}ms (budget {:6.1f}ms) {}'.format(module_name, import_ms, budget_ms, status))
+
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+""" Benchmark: JSON Codec
+
+Decode and encode JSON documents with every installed JSON backend.
+
+The documents are the JSON data files under the features directories,
+plus synthetic REST payloads of the sizes our TM4J attachments have:
+a small POST payload up to a bulk-load response.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_json_codec.py --sizes 1024 65536 1048576 16777216
+    PYTHONPATH=. python benchmarks/bench_json_codec.py --fixtures 'my_project/features/data/**/*.json'
+"""
+
+import argparse
+import glob
+import json
+import time
+
+from testharness.bdd.json_codec import JSONCodec, get_installed_backends
+
+
+def make_payload(size):
+    """ Make a synthetic REST payload of about `size` bytes of JSON. """
+
+    record = {
+        'id': 0,
+        'name': 'Circuit ACME-0000',
+        'status': 'ACTIVE',
+        'bandwidth': 1000.5,
+        'tags': ['ethernet', 'metro', 'qa'],
+        'location': {'city': 'Middletown', 'state': 'NJ', 'zip': '07748'},
+        'verified': True,
+        'notes': None,
+    }
+    record_size = len(json.dumps(record))
+    records = []
+    for n in range(max(1, size // record_size)):
+        records.append(dict(record, id=n, name='Circuit ACME-{:04}'.format(n)))
+    return json.dumps({'TRK': 'abc123', 'ROWS': records, 'message': 'OK'}).encode('utf-8')
+
+
+def time_codec(codec, data, repeat):
+    """ Time decoding and encoding one document.
+
+    :returns: (decode seconds, encode seconds), the best of `repeat` runs
+    """
+
+    value = codec.loads(data)
+    decode_times = []
+    encode_times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        codec.loads(data)
+        decode_times.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        codec.dumps(value, sort_keys=True)
+        encode_times.append(time.perf_counter() - start)
+    return (min(decode_times), min(encode_times))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the JSON codec backends.")
+    parser.add_argument("--sizes", type=int, nargs='*', default=[1024, 64 * 1024, 1024 * 1024, 16 * 1024 * 1024],
+                        help="synthetic payload sizes in bytes")
+    parser.add_argument("--fixtures", default='tests/features/data/**/*.json',
+                        help="glob of JSON data files to include")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per document; the best is shown")
+    args = parser.parse_args()
+
+    documents = []
+    for fixture_file in sorted(glob.glob(args.fixtures, recursive=True)):
+        with open(fixture_file, 'rb') as f:
+            documents.append((fixture_file, f.read()))
+    for size in args.sizes:
+        documents.append(('synthetic {} bytes'.format(size), make_payload(size)))
+
+    codecs = [JSONCodec(backend) for backend in get_installed_backends()]
+    print('Backends: {}'.format(', '.join(codec.backend for codec in codecs)))
+    for (name, data) in documents:
+        print('{} ({} bytes)'.format(name, len(data)))
+        for codec in codecs:
+            (decode_time, encode_time) = time_codec(codec, data, args.repeat)
+            print('    {:7} loads {:10.3f}ms  dumps {:10.3f}ms  {:8.1f} MB/s'.format(
+                codec.backend, 1000.0 * decode_time, 1000.0 * encode_time,
+                len(data) / decode_time / 1e6))
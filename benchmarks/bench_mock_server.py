@@ -0,0 +1,53 @@
+#! /usr/bin/env python
+""" Benchmark: Mock REST Server
+
+Start the mock REST server for a Feature's data directory, then send
+it GET requests from PooledHttpClient threads.
+
+Run from the repository root:
+
+    PYTHONPATH=. python benchmarks/bench_mock_server.py --requests 5000 --threads 8
+"""
+
+import argparse
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from testharness.bdd.http.client import PooledHttpClient
+from testharness.bdd.http.mock_server import MockRestServer
+
+
+def time_requests(send, requests, threads):
+    """ Time `requests` calls of send() over `threads` threads.
+
+    :returns: elapsed seconds
+    """
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda n: send(), range(requests)))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the mock REST server.")
+    parser.add_argument("--feature", default='tests/features/TC-T1.feature', help="Feature with mock_routes.json")
+    parser.add_argument("--path", default='/osscwl/servers', help="path to GET")
+    parser.add_argument("--requests", type=int, default=5000, help="GET requests")
+    parser.add_argument("--threads", type=int, default=8, help="client threads")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    server = MockRestServer().load_routes(args.feature).start()
+    start_time = time.perf_counter() - start
+    try:
+        client = PooledHttpClient(server.base_url, pool_size=args.threads)
+        client.get(args.path)  # Warm up.
+        elapsed = time_requests(lambda: client.get(args.path), args.requests, args.threads)
+
+        print('start-up {:.1f}ms, {} routes, {}'.format(1000.0 * start_time, len(server.routes), server.base_url))
+        print('{} requests, {} threads: {:.3f}s total {:.3f}ms/request {:.1f} requests/s'.format(
+            args.requests, args.threads, elapsed, 1000.0 * elapsed / args.requests, args.requests / elapsed))
+    finally:
+        server.stop()
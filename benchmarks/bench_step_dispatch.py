@@ -0,0 +1,85 @@
+#! /usr/bin/env python
+""" Benchmark: Step Dispatch
+
+Time how long finding each step method takes as the step library grows.
+
+    "morelia" := morelia's matchers, a dir() and regex scan for every step line
+    "indexed" := the step dispatch index built once per TestCase class
+
+Run from the repository root:
+
+    python benchmarks/bench_step_dispatch.py --library 50,200,1000 --lines 2000
+"""
+
+import argparse
+import time
+import unittest
+
+from morelia.matchers import MethodNameStepMatcher, ParseStepMatcher, RegexpStepMatcher
+
+from testharness.bdd.runner.dispatch import IndexedRegexpStepMatcher
+
+VERBS = ['GETs', 'POSTs', 'PUTs', 'DELETEs', 'sends', 'checks', 'expects', 'reads']
+WORDS = ['User', 'Admin', 'the', 'The', 'Operator', 'Client', 'Server', 'A']
+
+MATCHERS = {
+    'morelia': [RegexpStepMatcher, ParseStepMatcher, MethodNameStepMatcher],
+    'indexed': [IndexedRegexpStepMatcher, ParseStepMatcher, MethodNameStepMatcher],
+}
+
+
+def make_step_library(size):
+    """ Make a TestCase class with `size` regex docstring step methods.
+
+    :returns: (TestCase class, list of step lines that match its steps)
+    """
+
+    def make_step(docstring):
+        def step(self, *args):
+            pass
+        step.__doc__ = docstring
+        return step
+
+    attrs = {'runTest': lambda self: None}
+    step_lines = []
+    for index in range(size):
+        word = WORDS[index % len(WORDS)]
+        verb = VERBS[(index // len(WORDS)) % len(VERBS)]
+        attrs['step_{}'.format(index)] = make_step(r'{} {} resource {} with (.+)'.format(word, verb, index))
+        step_lines.append('{} {} resource {} with value_{}'.format(word, verb, index, index))
+
+    return (type('StepLibrary{}'.format(size), (unittest.TestCase,), attrs), step_lines)
+
+
+def time_dispatch(suite_class, step_lines, line_count, matcher_classes):
+    """ Time finding the step method for `line_count` step lines.
+
+    :returns: elapsed seconds
+    """
+
+    suite = suite_class()
+    start = time.perf_counter()
+    matcher = None
+    for matcher_class in reversed(matcher_classes):
+        matcher = matcher_class(suite).add_matcher(matcher) if matcher else matcher_class(suite)
+
+    for n in range(line_count):
+        step_line = step_lines[n % len(step_lines)]
+        (method, args, kwargs) = matcher.find(step_line, step_line)
+        if method is None:
+            raise RuntimeError('No step method for "{}"'.format(step_line))
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the BDD step dispatch.")
+    parser.add_argument("--library", default='50,200,1000', help="comma-separated step library sizes")
+    parser.add_argument("--lines", type=int, default=2000, help="step lines dispatched per library")
+    args = parser.parse_args()
+
+    for size in [int(s) for s in args.library.split(',')]:
+        (suite_class, step_lines) = make_step_library(size)
+        for name, matcher_classes in MATCHERS.items():
+            elapsed = time_dispatch(suite_class, step_lines, args.lines, matcher_classes)
+            print('{:5} steps {:8} {:8.3f}s total {:8.1f}us/step line'.format(
+                size, name, elapsed, 1000000.0 * elapsed / args.lines))
@@ -27,6 +27,8 @@ setup(name='testharness_bdd',
       scripts=[
           'bin/compile_bdd_feature',
           'bin/compile_bdd_feature_from_jira',
+          'bin/load_test_bdd_feature',
+          'bin/report_latency_histograms',
           'bin/update_bdd_feature_from_jira',
       ],
       # NO nosetests: junitparser.TestSuite confuses nose, testing ERRORs
@@ -0,0 +1,161 @@
+""" BDD Test Harness Compiler: Build Manifest
+
+The build manifest remembers which Feature file built each test module.
+It is a JSON file, ".bdd-build-manifest", in the package directory.
+
+Each test module records its Feature file's path and SHA-256 hash,
+plus the hash of the module exactly as the compiler wrote it.
+The file size and mtime are kept too, so an unchanged file is
+recognized from one os.stat() without hashing it again.
+
+    fresh    := the Feature file and module are both unchanged, skip it
+    stale    := the Feature file changed; the module was never edited, rebuild it
+    modified := the module was edited by hand, never overwrite it
+    unknown  := the module was not built with this manifest
+
+A module that had new steps merged into it holds implemented code,
+so it is never stale; it can only have more steps merged.
+"""
+
+import hashlib
+import json
+import os
+
+import logging
+log = logging.getLogger(__name__)
+
+BUILD_MANIFEST_FILENAME = '.bdd-build-manifest'
+BUILD_MANIFEST_VERSION = 1
+
+MODULE_FRESH = 'fresh'
+MODULE_STALE = 'stale'
+MODULE_MODIFIED = 'modified'
+MODULE_UNKNOWN = 'unknown'
+
+
+def file_hash(path):
+    """ File Hash.
+
+    :param str path: path to file
+    :returns: SHA-256 hex digest of the file contents
+    """
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_stamp(path):
+    """ File Stamp.
+
+    :param str path: path to file
+    :returns: [size, mtime_ns] list, or None when the file is missing
+    """
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class BuildManifest(object):
+    """ Build Manifest.
+
+    Load, check and record the test modules built in one package directory.
+    Call save() after recording new modules.
+    """
+
+    def __init__(self, package_directory):
+        """ Init BuildManifest.
+
+        :param package_directory: package directory where test modules are created
+        """
+
+        self.package_directory = str(package_directory)
+        self.path = os.path.join(self.package_directory, BUILD_MANIFEST_FILENAME)
+        self.modules = {}
+        self._changed = False
+        self.load()
+
+    def load(self):
+        """ Load the manifest file, if any. A corrupt manifest starts over empty. """
+
+        try:
+            with open(self.path, 'r') as f:
+                manifest_json = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            log.warning('Ignoring unreadable build manifest "%s": %s', self.path, e)
+            return
+
+        if manifest_json.get('version') == BUILD_MANIFEST_VERSION:
+            self.modules = manifest_json.get('modules', {})
+
+    def save(self):
+        """ Save the manifest file when any module was recorded. """
+
+        if not self._changed:
+            return
+
+        new_path = self.path + '.new'
+        with open(new_path, 'w') as f:
+            json.dump({
+                'version': BUILD_MANIFEST_VERSION,
+                'modules': self.modules
+            }, f, indent=2, sort_keys=True)
+        os.replace(new_path, self.path)
+        self._changed = False
+
+    def _same_file(self, path, stamp, sha256):
+        """ Same File: True when the file still has its recorded contents. """
+
+        current_stamp = file_stamp(path)
+        if current_stamp is None:
+            return False
+        if current_stamp == stamp:
+            return True
+        return file_hash(path) == sha256
+
+    def check(self, feature_file, bdd_filename):
+        """ Check a test module against its Feature file.
+
+        :param str feature_file: A BDD Gherkin Feature file
+        :param str bdd_filename: the test module filename in the package directory
+        :returns: the module state, e.g. MODULE_FRESH
+        """
+
+        entry = self.modules.get(bdd_filename)
+        if entry is None or entry['feature'] != str(feature_file):
+            return MODULE_UNKNOWN
+
+        module_path = os.path.join(self.package_directory, bdd_filename)
+        if not os.path.isfile(module_path):
+            return MODULE_STALE
+        if not self._same_file(module_path, entry['module_stamp'], entry['module_sha256']):
+            return MODULE_MODIFIED
+        if not self._same_file(feature_file, entry['feature_stamp'], entry['feature_sha256']):
+            return MODULE_MODIFIED if entry.get('merged') else MODULE_STALE
+        return MODULE_FRESH
+
+    def record(self, feature_file, bdd_filename, merged=False):
+        """ Record a test module just built from its Feature file.
+
+        :param str feature_file: A BDD Gherkin Feature file
+        :param str bdd_filename: the test module filename in the package directory
+        :param bool merged: new steps were merged into an existing module
+        """
+
+        module_path = os.path.join(self.package_directory, bdd_filename)
+        self.modules[bdd_filename] = {
+            'feature': str(feature_file),
+            'feature_stamp': file_stamp(feature_file),
+            'feature_sha256': file_hash(feature_file),
+            'module_stamp': file_stamp(module_path),
+            'module_sha256': file_hash(module_path),
+            'merged': merged,
+        }
+        self._changed = True
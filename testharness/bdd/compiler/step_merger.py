@@ -0,0 +1,293 @@
+""" BDD Test Harness Compiler: Step Merger
+
+Merge new step stubs into an existing BDD test module.
+
+A Feature file may gain steps after its test module was compiled and
+implemented. The module is parsed (never imported) to find the
+"def step_*()" regex docstrings it already has. The steps its TestCase
+class inherits count too: base classes written in the module are
+parsed, and imported base classes, e.g. the step mixins, are imported
+and inspected through their MRO. Only the stubs for the missing steps
+are appended to the end of the TestCase class, so the implemented code
+is never touched.
+"""
+
+import ast
+import importlib
+import inspect
+import re
+import sys
+
+from testharness.bdd.compiler import step_stubs
+
+BDD_TEST_CASE_CLASS = 'FeatureTestCase'
+
+
+class StepMergeError(ValueError):
+    """ BDD Step Merge Error.
+
+    The test module cannot be parsed, or has no FeatureTestCase class.
+    """
+    pass
+
+
+def _find_test_case_class(module_tree):
+    """ Find the TestCase class and the top-level statement after it.
+
+    :param module_tree: python module syntax tree
+    :returns: a tuple (ClassDef node, next statement node or None)
+    :raises StepMergeError: when there is no FeatureTestCase class
+    """
+
+    for index, node in enumerate(module_tree.body):
+        if isinstance(node, ast.ClassDef) and node.name == BDD_TEST_CASE_CLASS:
+            next_node = module_tree.body[index + 1] if index + 1 < len(module_tree.body) else None
+            return (node, next_node)
+    raise StepMergeError('No "{}" class to merge steps into'.format(BDD_TEST_CASE_CLASS))
+
+
+def get_class_steps(class_node):
+    """ Get Class Steps.
+
+    :param class_node: the TestCase class syntax tree
+    :returns: a dict {step method name: regex docstring or None}
+    """
+
+    return {
+        node.name: ast.get_docstring(node, clean=False)
+        for node in class_node.body
+        if isinstance(node, ast.FunctionDef) and node.name.startswith('step_')
+    }
+
+
+def _get_imported_names(module_tree):
+    """ Get the {local name: (module name, attribute or None)} of the module's imports. """
+
+    names = {}
+    for node in module_tree.body:
+        if isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                names[alias.asname or alias.name] = (node.module, alias.name)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    names[alias.asname] = (alias.name, None)
+                else:
+                    top_name = alias.name.split('.')[0]
+                    names[top_name] = (top_name, None)
+    return names
+
+
+def _get_dotted_name(node):
+    """ The dotted name of a Name or Attribute node, else None. """
+
+    if isinstance(node, ast.Name):
+        return node.id
+    if isinstance(node, ast.Attribute):
+        value = _get_dotted_name(node.value)
+        return None if value is None else value + '.' + node.attr
+    return None
+
+
+def _import_base_class(dotted_name, imported_names):
+    """ Import a base class by its dotted name in the module, else None. """
+
+    (name, _, attr_path) = dotted_name.partition('.')
+    if name not in imported_names:
+        return None
+    (module_name, attr) = imported_names[name]
+    path = ([attr] if attr else []) + (attr_path.split('.') if attr_path else [])
+    try:
+        value = importlib.import_module(module_name)
+        while path and inspect.ismodule(value) and not hasattr(value, path[0]):
+            # "import a.b" binds "a"; import the submodule "a.b".
+            module_name = module_name + '.' + path.pop(0)
+            value = importlib.import_module(module_name)
+        for attr in path:
+            value = getattr(value, attr)
+    except (ImportError, AttributeError):
+        return None
+    return value if inspect.isclass(value) else None
+
+
+def get_base_class_steps(module_tree, class_node):
+    """ Get Base Class Steps.
+
+    The steps the TestCase class inherits. A base class written in the
+    module is parsed; an imported base class is imported and inspected,
+    with its own bases through its MRO. A base class that cannot be
+    imported is skipped, with a warning.
+
+    :param module_tree: python module syntax tree
+    :param class_node: the TestCase class syntax tree
+    :returns: a dict {step method name: regex docstring or None}
+    """
+
+    module_classes = {node.name: node for node in module_tree.body if isinstance(node, ast.ClassDef)}
+    imported_names = _get_imported_names(module_tree)
+
+    steps = {}
+    seen = set()
+
+    def add_bases(node):
+        for base in reversed(node.bases):  # The first base's steps win.
+            dotted_name = _get_dotted_name(base)
+            if dotted_name is None or dotted_name in seen:
+                continue
+            seen.add(dotted_name)
+            if dotted_name in module_classes:
+                add_bases(module_classes[dotted_name])
+                steps.update(get_class_steps(module_classes[dotted_name]))
+                continue
+            base_class = _import_base_class(dotted_name, imported_names)
+            if base_class is None:
+                print('Cannot inspect base class "{}" for its steps.\n'.format(dotted_name), file=sys.stderr)
+                continue
+            for klass in reversed(inspect.getmro(base_class)):
+                for (name, value) in vars(klass).items():
+                    if name.startswith('step_') and callable(value):
+                        steps[name] = inspect.getdoc(value) if value.__doc__ else None
+
+    add_bases(class_node)
+    return steps
+
+
+def _get_placeholder_regex(regex):
+    """ The regex with each capture group as "(.+)", to match a "<name>" placeholder. """
+
+    pattern = regex.pattern
+    parts = []
+    depth = 0  # Inside a capture group.
+    x = 0
+    while x < len(pattern):
+        char = pattern[x]
+        if char == '\\':
+            if not depth:
+                parts.append(pattern[x:x + 2])
+            x += 2
+            continue
+        if depth:
+            depth += {'(': 1, ')': -1}.get(char, 0)
+        elif char == '(' and not pattern.startswith('(?', x):
+            parts.append('(.+)')
+            depth = 1
+        else:
+            parts.append(char)
+        x += 1
+    try:
+        return re.compile(''.join(parts))
+    except re.error:
+        return regex
+
+
+def _step_is_implemented(predicate, docstring, existing_docstrings, existing_regexes):
+    """ Step Is Implemented: an existing step has its docstring, or its regex matches.
+
+    An Outline step's "<name>" placeholder matches any capture group, e.g. "(\\d+)".
+    """
+
+    if ast.literal_eval(docstring) in existing_docstrings:
+        return True
+    if any(regex.match(predicate) for regex in existing_regexes):
+        return True
+    return '<' in predicate and any(_get_placeholder_regex(regex).match(predicate) for regex in existing_regexes)
+
+
+def get_missing_step_methods(feature_file, class_steps):
+    """ Get Missing Step Methods.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :param dict class_steps: the TestCase class {step method name: docstring}
+    :returns: list of (method name, method source code) for the missing steps
+    """
+
+    existing_docstrings = set(doc for doc in class_steps.values() if doc)
+    existing_regexes = []
+    for doc in existing_docstrings:
+        try:
+            existing_regexes.append(re.compile('^' + doc + '$'))
+        except re.error:
+            pass  # A step matched by its format-like docstring.
+
+    missing = []
+    new_docstrings = set()
+    for predicate in step_stubs.parse_feature_steps(feature_file):
+        (code, method_name, docstring) = step_stubs.get_step_method(predicate)
+        if docstring in new_docstrings:
+            continue
+        if _step_is_implemented(predicate, docstring, existing_docstrings, existing_regexes):
+            continue
+        if method_name in class_steps:
+            print('Cannot merge step "{}", method {}() already exists.\n'.format(
+                predicate, method_name), file=sys.stderr)
+            continue
+
+        new_docstrings.add(docstring)
+        missing.append((method_name, code))
+
+    return missing
+
+
+def _get_insert_line(lines, next_node):
+    """ Get the line index where the TestCase class ends.
+
+    :param list lines: module source lines
+    :param next_node: the top-level statement after the class, or None
+    :returns: line index to insert new methods before
+    """
+
+    if next_node is None:
+        insert_line = len(lines)
+    else:
+        insert_line = next_node.lineno - 1
+        if getattr(next_node, 'decorator_list', None):
+            insert_line = next_node.decorator_list[0].lineno - 1
+
+    # Back up over blank lines and top-level comments after the class.
+    while insert_line > 0 and (not lines[insert_line - 1].strip() or
+                               lines[insert_line - 1].startswith('#')):
+        insert_line -= 1
+    return insert_line
+
+
+def merge_test_module(feature_file, module_path):
+    """ Merge Test Module.
+
+    Append the stubs for any missing steps to the module's TestCase class,
+    skipping the steps it has or inherits.
+    The module is read, parsed and written in one pass.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :param str module_path: path to the existing test module
+    :raises StepMergeError: when the module has no FeatureTestCase class
+    :returns: list of the new step method names
+    """
+
+    with open(module_path, 'r') as f:
+        source = f.read()
+
+    try:
+        module_tree = ast.parse(source, filename=module_path)
+    except SyntaxError as e:
+        raise StepMergeError('Cannot parse "{}": {}'.format(module_path, e)) from e
+
+    (class_node, next_node) = _find_test_case_class(module_tree)
+    class_steps = get_base_class_steps(module_tree, class_node)
+    class_steps.update(get_class_steps(class_node))
+    missing = get_missing_step_methods(feature_file, class_steps)
+    if not missing:
+        return []
+
+    lines = source.splitlines(True)
+    insert_line = _get_insert_line(lines, next_node)
+    head = ''.join(lines[:insert_line])
+    if head and not head.endswith('\n'):
+        head += '\n'
+
+    new_methods = ('\n' + ''.join(code for (method_name, code) in missing)).rstrip() + '\n'
+    tail = ''.join(lines[insert_line:])
+
+    with open(module_path, 'w') as f:
+        f.write(head + new_methods + tail)
+
+    return [method_name for (method_name, code) in missing]
@@ -0,0 +1,173 @@
+""" BDD Test Harness Compiler: Step Stubs
+
+Write the "def step_*()" method stubs from a parsed Gherkin Feature file.
+
+The Feature file is parsed once into its syntax tree, and every step
+becomes one stub method with a regex docstring to match it.
+Nothing is executed, so this does not depend on the text of
+morelia's "Cannot match steps:" failure message.
+
+The stubs are the same code that morelia suggests for missing steps.
+"""
+
+import re
+import unicodedata
+
+from collections import OrderedDict
+
+# Step method stub, as morelia suggests it.
+STEP_METHOD_FMT = """    def step_{method_name}(self{arguments}):
+        {docstring}
+
+        raise NotImplementedError('{predicate}')
+
+"""
+
+# Step placeholders: "quoted text" or <outline_parameter>
+STEP_PLACEHOLDER_RE = re.compile(r'["\<](.+?)["\>]')
+QUOTED_TEXT_RE = re.compile(r'".+?"')
+OUTLINE_PARAMETER_RE = re.compile(r'\<.+?\>')
+SPACES_RE = re.compile(r' \s+')
+NON_WORD_RE = re.compile(r'[^\w]+')
+
+
+def _is_number(text):
+    """ Is Number: True when `text` parses as a float. """
+
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def slugify(predicate):
+    """ Slugify Step Predicate.
+
+    Turn the step text into the "step_*" method name suffix.
+    Numbers become "number" and non-word characters become '_'.
+
+    :param str predicate: step text
+    :returns: a python3 identifier suffix
+    """
+
+    result = []
+    for part in NON_WORD_RE.split(predicate):
+        part = unicodedata.normalize('NFD', part).encode('ascii', 'replace').decode('utf-8')
+        part = part.replace('??', '_').replace('?', '')
+        if _is_number(part):
+            part = 'number'
+        result.append(part)
+    return '_'.join(result).strip('_')
+
+
+def get_step_arguments(predicate):
+    """ Get Step Arguments.
+
+    Name one method argument for each step placeholder.
+    Numbers become "number" or, when there are several, "number1", "number2"...
+
+    :param str predicate: step text
+    :returns: list of argument names
+    """
+
+    placeholders = STEP_PLACEHOLDER_RE.findall(predicate)
+    number_count = sum(1 for arg in placeholders if _is_number(arg))
+    number_suffixes = iter(range(1, number_count + 1)) if number_count > 1 else None
+
+    arguments = []
+    for arg in placeholders:
+        if not _is_number(arg):
+            arguments.append(slugify(arg))
+        elif number_suffixes is None:
+            arguments.append('number')
+        else:
+            arguments.append('number{}'.format(next(number_suffixes)))
+    return arguments
+
+
+def get_step_docstring(predicate):
+    """ Get Step Docstring.
+
+    Build the regex docstring that matches the step text.
+    Placeholders become capture groups, one per method argument.
+
+    :param str predicate: step text
+    :returns: a tuple (docstring source, argument names)
+    """
+
+    predicate = predicate.replace("'", r"\'").replace('\n', r'\n')
+    arguments = get_step_arguments(predicate)
+
+    predicate = QUOTED_TEXT_RE.sub('"([^"]+)"', predicate)
+    predicate = OUTLINE_PARAMETER_RE.sub('(.+)', predicate)
+    predicate = SPACES_RE.sub(r'\\s+', predicate)
+
+    return ("r'{}'".format(predicate), arguments)
+
+
+def get_step_method(predicate):
+    """ Get Step Method.
+
+    Write the "def step_*()" stub that matches the step text.
+
+    :param str predicate: step text
+    :returns: a tuple (method source code, method name, docstring source)
+    """
+
+    (docstring, arguments) = get_step_docstring(predicate)
+    method_name = slugify(predicate)
+
+    code = STEP_METHOD_FMT.format_map({
+        'method_name': method_name,
+        'arguments': ''.join(', ' + arg for arg in arguments),
+        'docstring': docstring,
+        'predicate': predicate.replace("'", "\\'"),
+    })
+    return (code, 'step_' + method_name, docstring)
+
+
+def parse_feature_steps(feature_file):
+    """ Parse Feature Steps.
+
+    Parse the Feature file once and walk its syntax tree for the steps.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: list of step predicates, in Feature file order
+    :raises SyntaxError: when the Feature file is not valid Gherkin
+    """
+
+    from morelia.grammar import Step
+    from morelia.parser import Parser
+
+    ast = Parser().parse_file(feature_file)
+    return [node.predicate for node in ast.steps if isinstance(node, Step)]
+
+
+def get_step_methods(predicates):
+    """ Get Step Methods.
+
+    Write one stub per distinct step docstring, in step order.
+
+    :param predicates: list of step predicates
+    :returns: an OrderedDict {docstring source: method source code}
+    """
+
+    step_methods = OrderedDict()
+    for predicate in predicates:
+        (code, method_name, docstring) = get_step_method(predicate)
+        step_methods.setdefault(docstring, code)
+    return step_methods
+
+
+def get_steps_lines(feature_file):
+    """ Get Steps Lines.
+
+    Write the source code of every step method stub for the Feature file.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: python source code lines for the TestCase class body
+    """
+
+    step_methods = get_step_methods(parse_feature_steps(feature_file))
+    return ('\n' + ''.join(step_methods.values())).rstrip()
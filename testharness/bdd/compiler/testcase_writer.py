@@ -4,18 +4,43 @@ Compile a BDD Test Case from its Gherkin Feature file.
 
 BDD-Morelia lists the un-implemented test steps from a Feature.
 This module compiles a full python test module to aid in programming.
+
+morelia and the worker process pool are imported only when they are used,
+so the compiler scripts start fast, e.g. for "--help".
 """
 
+import glob
 import os.path
 import re
 import sys
 import unittest
 
-from morelia import run
+from collections import OrderedDict
+from itertools import repeat
+
+from testharness.bdd.compiler import step_merger, step_stubs
+from testharness.bdd.compiler.build_manifest import (
+    MODULE_FRESH,
+    MODULE_MODIFIED,
+    MODULE_STALE,
+    BuildManifest
+)
 
 # Fold *.feature file name to valid python3 identifier.
 PY_NAME_OK_RE = re.compile(r'\W+', flags=re.ASCII)
 
+# Compiler status codes for each Feature file.
+COMPILE_CREATED = 'created'
+COMPILE_MERGED = 'merged'
+COMPILE_UNCHANGED = 'unchanged'
+COMPILE_SKIPPED = 'skipped'
+COMPILE_FAILED = 'failed'
+
+# Compiler backends:
+#   "ast"     := parse the Feature file and write the step stubs directly
+#   "morelia" := run the Feature file and read morelia's missing steps
+COMPILER_BACKENDS = ('ast', 'morelia')
+
 
 def get_scenario_id(feature_filename):
     """ Get Scenario ID.
@@ -62,17 +87,90 @@ def get_bdd_module_name(testing_prefix, feature_filename):
 TEST_CASE_FILE_FMT = """
 import unittest
 
-from morelia import run
+from testharness.bdd.runner.feature import run
 
 
 class FeatureTestCase(unittest.TestCase):
 
     FEATURE_FILE = '{feature_file}'
+{test_methods}
+{steps_lines}"""
 
+# One test method runs every row of the Feature.
+TEST_METHOD_FMT = """
     def {testing_prefix}_scenario_{scenario_id}(self):
         "BDD Scenario(s): {feature_file}"
-        run(self.FEATURE_FILE, self, verbose=True)
-{steps_lines}"""
+        run(self.FEATURE_FILE, self, verbose=True)"""
+
+# One test method per Examples row, so a parallel runner can spread the rows.
+# The name still ends with the scenario ID for the TM4J test-case key.
+TEST_ROW_METHOD_FMT = """
+    def {testing_prefix}_row_{row}_scenario_{scenario_id}(self):
+        "BDD Scenario row {row}: {scenario}"
+        run(self.FEATURE_FILE, self, verbose=True, row={row})"""
+
+
+def get_test_methods(feature_file, testing_prefix, scenario_id, split_rows=False):
+    """ Get Test Methods.
+
+    :param feature_file: A BDD Gherkin Feature file
+    :param testing_prefix: Set Testing Stage Prefix, e.g. "qa" Quality Assurance
+    :param scenario_id: the Feature's scenario ID
+    :param split_rows: write one test method per Examples row
+    :returns: python source code of the test method(s)
+    """
+
+    if not split_rows:
+        return TEST_METHOD_FMT.format(feature_file=feature_file, testing_prefix=testing_prefix,
+                                      scenario_id=scenario_id)
+
+    from morelia.parser import Parser
+    from testharness.bdd.runner.examples_files import load_examples_files
+    from testharness.bdd.runner.feature import get_feature_rows
+
+    feature_rows = get_feature_rows(load_examples_files(Parser().parse_file(feature_file), feature_file))
+    return '\n'.join(
+        TEST_ROW_METHOD_FMT.format(testing_prefix=testing_prefix, scenario_id=scenario_id,
+                                   row=row, scenario=scenario.predicate.replace('"', "'"))
+        for row, (scenario, indices) in enumerate(feature_rows))
+
+
+def write_test_module(feature_file, testing_prefix, package_directory, steps_lines,
+                      split_rows=False):
+    """ Write BDD Test Case Module.
+
+    Write the new python test module with its step method stubs.
+
+    :param feature_file: A BDD Gherkin Feature file
+    :param testing_prefix: Set Testing Stage Prefix, e.g. "qa" Quality Assurance
+    :param package_directory: package directory where test modules will be created
+    :param steps_lines: python source code of the "def step_*()" methods
+    :param split_rows: write one test method per Examples row
+    :returns: the new module's filename
+    """
+
+    (scenario_id, bdd_filename) = get_bdd_module_name(testing_prefix, feature_file)
+    test_methods = get_test_methods(feature_file, testing_prefix, scenario_id, split_rows)
+    with open(os.path.join(package_directory, bdd_filename), 'w') as f:
+        print('# Feature File: {}'.format(feature_file), file=f)
+        print(TEST_CASE_FILE_FMT.format_map({
+            'feature_file': feature_file,
+            'scenario_id': scenario_id,
+            'steps_lines': steps_lines.rstrip(),
+            'test_methods': test_methods
+        }), file=f)
+
+    # Show the new module's filename.
+    print('New BDD Test Case module: "{}"\n'.format(bdd_filename),
+          file=sys.stderr)
+    return bdd_filename
+
+
+def run(filename, suite, **kwargs):
+    """ Run a Feature file with morelia, imported on first use. """
+
+    from morelia import run as morelia_run
+    return morelia_run(filename, suite, **kwargs)
 
 
 class BDDTestCaseWriter(unittest.TestCase):
@@ -85,6 +183,7 @@ class BDDTestCaseWriter(unittest.TestCase):
     FEATURE_FILE = ''
     TESTING_PREFIX = 'test'
     PACKAGE_DIRECTORY = ''
+    SPLIT_ROWS = False
 
     def bdd_morelia_write_code(self):
         """ Write BDD feature code """
@@ -95,20 +194,8 @@ class BDDTestCaseWriter(unittest.TestCase):
 
             if steps_code.startswith('Cannot match steps:'):
                 steps_lines = '\n'.join(steps_code.split('\n')[1:])
-
-                (scenario_id, bdd_filename) = get_bdd_module_name(self.TESTING_PREFIX, self.FEATURE_FILE)
-                with open(os.path.join(self.PACKAGE_DIRECTORY, bdd_filename), 'w') as f:
-                    print('# Feature File: {}'.format(self.FEATURE_FILE), file=f)
-                    print(TEST_CASE_FILE_FMT.format_map({
-                        'feature_file': self.FEATURE_FILE,
-                        'scenario_id': scenario_id,
-                        'steps_lines': steps_lines.rstrip(),
-                        'testing_prefix': self.TESTING_PREFIX
-                    }), file=f)
-
-                # Show the new module's filename.
-                print('New BDD Test Case module: "{}"\n'.format(bdd_filename),
-                      file=sys.stderr)
+                write_test_module(self.FEATURE_FILE, self.TESTING_PREFIX,
+                                  self.PACKAGE_DIRECTORY, steps_lines, self.SPLIT_ROWS)
             else:
                 raise
 
@@ -116,34 +203,271 @@ class BDDTestCaseWriter(unittest.TestCase):
 # ========================================================================
 
 
-def compile(feature_file, testing_prefix='test', package_directory='.'):
-    """ BDD Test Case Module Compiler.
+class CompileSummary(object):
+    """ Compile Summary.
+
+    Count the compiler status of every Feature file in a batch.
+    The status codes are "created", "merged", "unchanged", "skipped" and "failed".
+    """
+
+    def __init__(self):
+        self.results = OrderedDict()
+        self.counters = {
+            COMPILE_CREATED: 0,
+            COMPILE_MERGED: 0,
+            COMPILE_UNCHANGED: 0,
+            COMPILE_SKIPPED: 0,
+            COMPILE_FAILED: 0
+        }
+
+    def tally(self, feature_file, status):
+        """ Tally another Feature file status.
+
+        :param str feature_file: A BDD Gherkin Feature file
+        :param str status: compiler status code
+        """
+
+        self.results[feature_file] = status
+        if status in self.counters:
+            self.counters[status] += 1
+
+    @property
+    def ok(self):
+        """ OK when no Feature file failed to compile. """
+
+        return self.counters[COMPILE_FAILED] == 0
+
+    def __str__(self):
+        return 'created={}, merged={}, unchanged={}, skipped={}, failed={}'.format(
+            self.counters[COMPILE_CREATED],
+            self.counters[COMPILE_MERGED],
+            self.counters[COMPILE_UNCHANGED],
+            self.counters[COMPILE_SKIPPED],
+            self.counters[COMPILE_FAILED])
+
+
+def get_feature_files(path):
+    """ Get Feature Files.
+
+    Find the *.feature files to compile.
+    A directory holds many Feature files; any other path is one Feature file.
+
+    :param str path: a Feature file or a directory of them
+    :returns: a sorted list of Feature file paths
+    """
+
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, '*.feature')))
+    return [path]
 
-    This is the main entry point to the compiler.
-    It writes a new local file in the current directory.
+
+def _compile_feature(feature_file, testing_prefix, package_directory, backend='ast',
+                     rebuild=False, merge=False, split_rows=False):
+    """ Compile one Feature file.
+
+    The "ast" backend parses the Feature file once and writes the step stubs.
+    The "morelia" backend runs the Feature file in its own BDDTestCaseWriter
+    instance, so no class state is shared between Feature files or worker processes.
 
     :param feature_file: A BDD Gherkin Feature file
     :param testing_prefix: Set Testing Stage Prefix, e.g. "qa" Quality Assurance
     :param package_directory: package directory where test modules will be created
-    :returns: True when compilation was successful
+    :param backend: compiler backend in COMPILER_BACKENDS
+    :param rebuild: overwrite a stale test module the compiler wrote before
+    :param merge: append only the missing step stubs to an existing test module
+    :param split_rows: write one test method per Examples row
+    :returns: compiler status code
     """
 
+    if backend not in COMPILER_BACKENDS:
+        raise ValueError('Compiler backend "{}" is invalid'.format(backend))
+
     # Cannot re-compile FEATURE_FILE; BDD morelia will just run the existing file.
     (scenario_id, new_testcase_filename) = get_bdd_module_name(testing_prefix, feature_file)
-    if os.path.isfile(new_testcase_filename):
+    module_path = os.path.join(package_directory, new_testcase_filename)
+    if not rebuild and os.path.isfile(module_path):
+        if merge:
+            return _merge_feature(feature_file, module_path)
+
         print('Cannot compile new feature file, "{}" already exists.\n'.format(
             new_testcase_filename), file=sys.stderr)
-        return False
-
-    BDDTestCaseWriter.FEATURE_FILE = feature_file
-    BDDTestCaseWriter.TESTING_PREFIX = testing_prefix
-    BDDTestCaseWriter.PACKAGE_DIRECTORY = package_directory
+        return COMPILE_SKIPPED
 
-    print('Compiling Feature: {}...\n\n'.format(BDDTestCaseWriter.FEATURE_FILE),
+    print('Compiling Feature: {}...\n\n'.format(feature_file),
           file=sys.stderr)
 
+    if backend == 'ast':
+        try:
+            steps_lines = step_stubs.get_steps_lines(feature_file)
+        except (OSError, SyntaxError) as e:
+            print('Cannot compile feature file "{}": {}\n'.format(feature_file, e),
+                  file=sys.stderr)
+            return COMPILE_FAILED
+
+        write_test_module(feature_file, testing_prefix, package_directory, steps_lines, split_rows)
+        return COMPILE_CREATED
+
+    writer = BDDTestCaseWriter('bdd_morelia_write_code')
+    writer.FEATURE_FILE = feature_file
+    writer.TESTING_PREFIX = testing_prefix
+    writer.PACKAGE_DIRECTORY = package_directory
+    writer.SPLIT_ROWS = split_rows
+
     testSuite = unittest.TestSuite()
-    testSuite.addTest(BDDTestCaseWriter('bdd_morelia_write_code'))
+    testSuite.addTest(writer)
     result = unittest.TextTestRunner(verbosity=0).run(testSuite)
 
-    return result.wasSuccessful()
+    return COMPILE_CREATED if result.wasSuccessful() else COMPILE_FAILED
+
+
+def _merge_feature(feature_file, module_path):
+    """ Merge one Feature file's new steps into its existing test module.
+
+    :param feature_file: A BDD Gherkin Feature file
+    :param module_path: path to the existing test module
+    :returns: compiler status code
+    """
+
+    try:
+        new_methods = step_merger.merge_test_module(feature_file, module_path)
+    except (OSError, SyntaxError, step_merger.StepMergeError) as e:
+        print('Cannot merge feature file "{}": {}\n'.format(feature_file, e),
+              file=sys.stderr)
+        return COMPILE_FAILED
+
+    if not new_methods:
+        return COMPILE_UNCHANGED
+
+    print('Merged {} new steps into BDD Test Case module: "{}"\n'.format(
+        len(new_methods), module_path), file=sys.stderr)
+    return COMPILE_MERGED
+
+
+def _compile_feature_worker(feature_file, testing_prefix, package_directory, backend, rebuild,
+                            merge, split_rows):
+    """ Compile one Feature file in a worker process.
+
+    Any exception marks the Feature file as failed, so one bad file
+    cannot stop the rest of the batch.
+
+    :returns: compiler status code
+    """
+
+    try:
+        return _compile_feature(feature_file, testing_prefix, package_directory, backend,
+                                rebuild, merge, split_rows)
+    except Exception as e:
+        print('Cannot compile feature file "{}": {}\n'.format(feature_file, e),
+              file=sys.stderr)
+        return COMPILE_FAILED
+
+
+def compile(feature_file, testing_prefix='test', package_directory='.', backend='ast',
+            build_cache=False, merge=False, split_rows=False):
+    """ BDD Test Case Module Compiler.
+
+    This is the main entry point to the compiler.
+    It writes a new file in the package directory.
+
+    :param feature_file: A BDD Gherkin Feature file
+    :param testing_prefix: Set Testing Stage Prefix, e.g. "qa" Quality Assurance
+    :param package_directory: package directory where test modules will be created
+    :param backend: compiler backend in COMPILER_BACKENDS, default "ast"
+    :param build_cache: use the package directory's build manifest to skip unchanged modules
+    :param merge: append only the missing step stubs to an existing test module
+    :param split_rows: write one test method per Examples row
+    :returns: True when compilation was successful, or the module is up to date
+    """
+
+    if build_cache:
+        summary = compile_many([feature_file], testing_prefix, package_directory,
+                               jobs=1, backend=backend, build_cache=True, merge=merge,
+                               split_rows=split_rows)
+        status = summary.results[feature_file]
+    else:
+        status = _compile_feature(feature_file, testing_prefix, package_directory, backend,
+                                  merge=merge, split_rows=split_rows)
+
+    return status in (COMPILE_CREATED, COMPILE_MERGED, COMPILE_UNCHANGED)
+
+
+def compile_many(feature_files, testing_prefix='test', package_directory='.', jobs=None,
+                 backend='ast', build_cache=False, merge=False, split_rows=False):
+    """ BDD Test Case Module Batch Compiler.
+
+    Compile many Feature files, spread across a pool of worker processes.
+    One failed Feature file does not stop the others.
+
+    With the `build_cache`, the package directory's build manifest decides:
+    unchanged modules are skipped without compiling anything, and stale
+    modules (their Feature file changed) are rebuilt.
+    Modules edited by hand are never overwritten.
+
+    With `merge`, an existing module gets only the stubs for its missing steps,
+    so a large folder can be re-synced without clobbering implemented code.
+
+    With `split_rows`, new modules get one test method per Examples row,
+    so a parallel test runner can spread the rows across its processes.
+
+    :param feature_files: list of BDD Gherkin Feature files
+    :param testing_prefix: Set Testing Stage Prefix, e.g. "qa" Quality Assurance
+    :param package_directory: package directory where test modules will be created
+    :param jobs: number of worker processes, default is the CPU count
+    :param backend: compiler backend in COMPILER_BACKENDS, default "ast"
+    :param build_cache: use the package directory's build manifest
+    :param merge: append only the missing step stubs to existing test modules
+    :param split_rows: write one test method per Examples row
+    :returns: a CompileSummary with the status of each Feature file
+    """
+
+    feature_files = list(feature_files)
+    manifest = BuildManifest(package_directory) if build_cache else None
+    statuses = {}
+    rebuild = {}
+
+    for feature_file in feature_files:
+        rebuild[feature_file] = False
+        if manifest is None:
+            continue
+
+        (scenario_id, bdd_filename) = get_bdd_module_name(testing_prefix, feature_file)
+        module_state = manifest.check(feature_file, bdd_filename)
+        if module_state == MODULE_FRESH:
+            statuses[feature_file] = COMPILE_UNCHANGED
+        elif module_state == MODULE_STALE:
+            rebuild[feature_file] = True
+        elif module_state == MODULE_MODIFIED and not merge:
+            print('Cannot rebuild "{}", it was edited after it was compiled.\n'.format(
+                bdd_filename), file=sys.stderr)
+            statuses[feature_file] = COMPILE_SKIPPED
+
+    pending_files = [feature_file for feature_file in feature_files if feature_file not in statuses]
+    pending_rebuild = [rebuild[feature_file] for feature_file in pending_files]
+
+    if jobs == 1 or len(pending_files) < 2:
+        pending_statuses = [_compile_feature_worker(feature_file, testing_prefix, package_directory,
+                                                    backend, rebuild_module, merge, split_rows)
+                            for feature_file, rebuild_module in zip(pending_files, pending_rebuild)]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            pending_statuses = list(executor.map(_compile_feature_worker, pending_files,
+                                                 repeat(testing_prefix), repeat(package_directory),
+                                                 repeat(backend), pending_rebuild, repeat(merge),
+                                                 repeat(split_rows)))
+
+    for feature_file, status in zip(pending_files, pending_statuses):
+        statuses[feature_file] = status
+        if manifest is not None and status in (COMPILE_CREATED, COMPILE_MERGED, COMPILE_UNCHANGED):
+            (scenario_id, bdd_filename) = get_bdd_module_name(testing_prefix, feature_file)
+            manifest.record(feature_file, bdd_filename, merged=(status != COMPILE_CREATED))
+
+    if manifest is not None:
+        manifest.save()
+
+    summary = CompileSummary()
+    for feature_file in feature_files:
+        summary.tally(feature_file, statuses[feature_file])
+
+    return summary
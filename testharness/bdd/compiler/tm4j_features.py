@@ -13,8 +13,6 @@ import pathlib
 
 from pprint import pformat
 
-from jira_rest_clients.tm4j import JiraTM4JClient
-
 from testharness.bdd.compiler import testcase_writer
 from testharness.bdd.compiler.testcase_writer import PY_NAME_OK_RE
 from testharness.bdd.tm4j.utils import create_bdd_feature_file
@@ -103,11 +101,13 @@ def _test_cases_folder2py_package(test_cases_folder, output_dir, verbose):
 def get_tm4j_features(test_cases_folder, testing_prefix,
                       jira_username, jira_password,
                       project_key='MIC', output_dir='.',
-                      compile_new_modules=False, verbose=False):
+                      compile_new_modules=False, verbose=False, jobs=None,
+                      build_cache=True, merge_steps=False, split_rows=False):
     """ Get TM4J Features.
 
     Get BDD "feature file" test scripts and example data from JIRA.
     The first time, `compile_new_modules` to make stub test modules from *.feature files.
+    Later, `merge_steps` to append stubs for new steps to the existing test modules.
 
     :param test_cases_folder: JIRA Test Cases folder, e.g. "/Subproject/STORY-001"
     :param testing_prefix: test stage prefix in ('test', 'qa')
@@ -117,9 +117,16 @@ def get_tm4j_features(test_cases_folder, testing_prefix,
     :param output_dir: optional target output must exist, default PWD
     :param compile_new_modules: Set to True to compile test_*.py from *.feature files
     :param verbose: a boolean flag to show the JIRA BDD query
+    :param jobs: number of compiler worker processes, default is the CPU count
+    :param build_cache: skip unchanged modules and rebuild stale ones with the build manifest
+    :param merge_steps: Set to True to merge new steps into existing test modules
+    :param split_rows: Set to True to compile one test method per Examples row
     :raises: ValueError when test_cases_folder is no good
+    :returns: a CompileSummary when compiling or merging modules, otherwise None
     """
 
+    from jira_rest_clients.tm4j import JiraTM4JClient
+
     # Test Cases Folder must start with slash for TM4J.
     if not test_cases_folder.startswith('/'):
         test_cases_folder = '/' + test_cases_folder
@@ -132,14 +139,24 @@ def get_tm4j_features(test_cases_folder, testing_prefix,
         if test_case_results:
             test_cases_package = _test_cases_folder2py_package(test_cases_folder, output_dir, verbose)
 
-            # Download Feature files (and compile test modules when flag is True).
+            # Download Feature files.
+            feature_files = []
             for test_case_json in test_case_results:
                 if verbose:
                     log.info(pformat(test_case_json, indent=4))
                 feature_file = create_bdd_feature_file(test_case_json, test_cases_package / 'features')
-                if feature_file and compile_new_modules:
-                    testcase_writer.compile(os.path.join(test_cases_package, 'features', feature_file),
-                                            testing_prefix, test_cases_package)
+                if feature_file:
+                    feature_files.append(os.path.join(test_cases_package, 'features', feature_file))
+
+            # Compile (or merge) test modules in one batch when a flag is True.
+            summary = None
+            if compile_new_modules or merge_steps:
+                summary = testcase_writer.compile_many(feature_files, testing_prefix,
+                                                       test_cases_package, jobs=jobs,
+                                                       build_cache=build_cache, merge=merge_steps,
+                                                       split_rows=split_rows)
+                if verbose:
+                    log.info('Compiled Features: {}'.format(summary))
 
             # Download Feature "attachments" data files.
             features_dir = test_cases_package / 'features'
@@ -151,6 +168,8 @@ def get_tm4j_features(test_cases_folder, testing_prefix,
                 if verbose:
                     log.info('\tFeature "{}" has {} data files.'.format(feature_file.stem, file_count))
 
+            return summary
+
         else:
             raise ValueError("""
 JIRA and TM4J found no "{}" BDD Feature files ready to run.
@@ -0,0 +1,334 @@
+""" BDD Test Harness HTTP: Async Pooled HTTP Client
+
+AsyncPooledHttpClient is the asyncio twin of PooledHttpClient, for the
+async REST step mixins. Its get() and post() are coroutines:
+
+    self.response = await self.client.get('/osscwl/servers')
+
+asyncio connections belong to one event loop, so each event loop has
+its own keep-alive pool per origin, shared by every client on that loop.
+The timeout covers the whole response, from sending the request to
+reading the last body byte.
+"""
+
+import asyncio
+import http.client
+import io
+import ssl
+import threading
+import time
+import weakref
+
+from collections import deque
+from urllib.parse import urlsplit
+
+from testharness.bdd.http.client import (
+    DEFAULT_CONNECT_TIMEOUT,
+    DEFAULT_POOL_SIZE,
+    DEFAULT_PORTS,
+    DEFAULT_TIMEOUT,
+    STALE_CONNECTION_ERRORS,
+    HttpResponse,
+    encode_post_data,
+    get_request_target,
+    get_url_port
+)
+
+# A reused connection that fails with one of these was closed while idle.
+ASYNC_STALE_CONNECTION_ERRORS = STALE_CONNECTION_ERRORS + (asyncio.IncompleteReadError,)
+
+# Responses to these never have a body.
+NO_BODY_STATUSES = frozenset([204, 304])
+
+
+class AsyncConnection(object):
+    """ Async Connection: an asyncio stream pair to one server. """
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+
+    def close(self):
+        self.writer.close()
+
+
+class AsyncConnectionPool(object):
+    """ Async Connection Pool.
+
+    A pool of idle keep-alive connections to one origin, on one event loop.
+    """
+
+    def __init__(self, scheme, host, port, pool_size=DEFAULT_POOL_SIZE, ssl_context=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.ssl_context = ssl_context
+        self._idle = deque()
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    async def new_connection(self, connect_timeout):
+        """ Open a new connection. """
+
+        context = None
+        if self.scheme == 'https':
+            context = self.ssl_context or ssl.create_default_context()
+        (reader, writer) = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port, ssl=context), connect_timeout)
+        self.connections_created += 1
+        return AsyncConnection(reader, writer)
+
+    async def get_connection(self, connect_timeout):
+        """ Get Connection.
+
+        :returns: (connection, reused) the most recently idle connection, or a new one
+        """
+
+        while self._idle:
+            connection = self._idle.pop()
+            if not connection.reader.at_eof():
+                self.connections_reused += 1
+                return (connection, True)
+            connection.close()
+        return (await self.new_connection(connect_timeout), False)
+
+    def put_connection(self, connection):
+        """ Put a connection back, or close it when the pool is full. """
+
+        if len(self._idle) < self.pool_size:
+            self._idle.append(connection)
+        else:
+            connection.close()
+
+    def clear(self):
+        """ Close every idle connection. """
+
+        while self._idle:
+            self._idle.pop().close()
+
+
+_loop_pools = weakref.WeakKeyDictionary()
+_loop_pools_lock = threading.Lock()
+
+
+def get_async_connection_pool(scheme, host, port, pool_size=DEFAULT_POOL_SIZE, ssl_context=None):
+    """ Get Async Connection Pool.
+
+    Get the running event loop's pool for an origin and SSL context,
+    made on first use, so clients with their own TLS settings never share one.
+
+    :returns: the origin's AsyncConnectionPool
+    """
+
+    loop = asyncio.get_running_loop()
+    key = (scheme, host, port, ssl_context)
+    with _loop_pools_lock:
+        pools = _loop_pools.setdefault(loop, {})
+        pool = pools.get(key)
+        if pool is None:
+            pool = pools[key] = AsyncConnectionPool(scheme, host, port, pool_size, ssl_context)
+        pool.pool_size = max(pool.pool_size, pool_size)
+    return pool
+
+
+def close_async_connection_pools():
+    """ Close every idle connection in the running event loop's pools. """
+
+    loop = asyncio.get_running_loop()
+    with _loop_pools_lock:
+        pools = list(_loop_pools.pop(loop, {}).values())
+    for pool in pools:
+        pool.clear()
+
+
+def merge_headers(*headers_dicts):
+    """ Merge Headers.
+
+    HTTP header names are case-insensitive: a later "content-type"
+    replaces an earlier "Content-Type", so no header is sent twice.
+
+    :param headers_dicts: dicts of headers, or None, in order
+    :returns: a dict {lowercase name: (name, value)}
+    """
+
+    headers = {}
+    for headers_dict in headers_dicts:
+        for (name, value) in (headers_dict or {}).items():
+            headers[name.lower()] = (name, value)
+    return headers
+
+
+async def _read_body(reader, method, status, headers):
+    """ Read a response body.
+
+    :returns: (content, to_eof) the body, and whether it was read to the end of the stream
+    """
+
+    if method == 'HEAD' or 100 <= status < 200 or status in NO_BODY_STATUSES:
+        return (b'', False)
+
+    if 'chunked' in headers.get('Transfer-Encoding', '').lower():
+        chunks = []
+        while True:
+            size_line = await reader.readline()
+            size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass  # Skip the trailer headers.
+                return (b''.join(chunks), False)
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+
+    content_length = headers.get('Content-Length')
+    if content_length is not None:
+        return (await reader.readexactly(int(content_length)), False)
+    return (await reader.read(), True)
+
+
+class AsyncPooledHttpClient(object):
+    """ Async Pooled HTTP Client.
+
+    A keep-alive HTTP/1.1 asyncio client with coroutine get() and post().
+    Relative URLs are joined to the base URL.
+    """
+
+    def __init__(self, base_url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, headers=None, ssl_context=None):
+        """ Init AsyncPooledHttpClient.
+
+        :param str base_url: the service URL, e.g. "https://api.example.com/v1/"
+        :param int pool_size: the most idle connections to keep for the origin, per event loop
+        :param float timeout: seconds to wait for each whole response
+        :param float connect_timeout: seconds to wait for a new connection
+        :param dict headers: headers to send with every request
+        :param ssl.SSLContext ssl_context: TLS settings for "https", default the system's
+        :raises ValueError: when the base URL is not http or https
+        """
+
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError('Expecting an http or https base URL, not "{}"'.format(base_url))
+
+        self.base_url = base_url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = get_url_port(parts)
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.headers = dict(headers or {})
+        self.ssl_context = ssl_context
+
+    @property
+    def pool(self):
+        """ The running event loop's connection pool for the base URL's origin. """
+
+        return get_async_connection_pool(self.scheme, self.host, self.port, self.pool_size, self.ssl_context)
+
+    async def request(self, method, relative_url, body=None, headers=None):
+        """ Send a request.
+
+        :param str method: HTTP method, e.g. "GET"
+        :param str relative_url: URL relative to the base URL
+        :param bytes body: request body; any bytes-like object
+        :param dict headers: more request headers
+        :raises ValueError: when the URL is on another server
+        :raises asyncio.TimeoutError: when the response takes longer than the timeout
+        :returns: the HttpResponse
+        """
+
+        (url, target) = get_request_target(self.base_url, relative_url, self.scheme, self.host, self.port)
+
+        request_headers = merge_headers(self.headers, headers)
+        if 'host' not in request_headers:
+            request_headers['host'] = ('Host', self.host if self.port == DEFAULT_PORTS[self.scheme]
+                                       else '{}:{}'.format(self.host, self.port))
+        if 'content-length' not in request_headers and (body is not None or method in ('POST', 'PUT', 'PATCH')):
+            request_headers['content-length'] = ('Content-Length', str(len(memoryview(body or b'').cast('B'))))
+        head = '{} {} HTTP/1.1\r\n{}\r\n'.format(method, target, ''.join(
+            '{}: {}\r\n'.format(name, value) for (name, value) in request_headers.values()))
+
+        pool = self.pool
+        start = time.perf_counter()
+        (connection, reused) = await pool.get_connection(self.connect_timeout)
+        try:
+            try:
+                exchange = self._exchange(connection, method, head.encode('latin-1'), body)
+                (status, reason, response_headers, content, will_close) = \
+                    await asyncio.wait_for(exchange, self.timeout)
+            except ASYNC_STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                connection.close()
+                connection = await pool.new_connection(self.connect_timeout)
+                exchange = self._exchange(connection, method, head.encode('latin-1'), body)
+                (status, reason, response_headers, content, will_close) = \
+                    await asyncio.wait_for(exchange, self.timeout)
+        except BaseException:
+            connection.close()
+            raise
+
+        if will_close:
+            connection.close()
+        else:
+            pool.put_connection(connection)
+
+        return HttpResponse(url, status, reason, response_headers, content, time.perf_counter() - start)
+
+    async def _exchange(self, connection, method, head, body):
+        """ Write one request and read its response.
+
+        :returns: (status, reason, headers, content, will_close)
+        """
+
+        connection.writer.write(head)
+        if body:
+            connection.writer.write(body)
+        await connection.writer.drain()
+
+        reader = connection.reader
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise http.client.RemoteDisconnected('Remote end closed connection without response')
+            (version, status, reason) = (status_line.decode('latin-1').rstrip('\r\n').split(' ', 2) + [''])[:3]
+            status = int(status)
+
+            header_lines = []
+            while True:
+                line = await reader.readline()
+                header_lines.append(line)
+                if line in (b'\r\n', b'\n', b''):
+                    break
+            headers = http.client.parse_headers(io.BytesIO(b''.join(header_lines)))
+            if status != 100:
+                break  # Skip any "100 Continue".
+
+        (content, to_eof) = await _read_body(reader, method, status, headers)
+        connection_header = headers.get('Connection', '').lower()
+        will_close = to_eof or 'close' in connection_header or \
+            (version == 'HTTP/1.0' and 'keep-alive' not in connection_header)
+        return (status, reason, headers, content, will_close)
+
+    async def get(self, relative_url, headers=None):
+        """ HTTP GET.
+
+        :param str relative_url: URL relative to the base URL
+        :param dict headers: more request headers
+        :returns: the HttpResponse
+        """
+
+        return await self.request('GET', relative_url, headers=headers)
+
+    async def post(self, relative_url, data=None, headers=None):
+        """ HTTP POST.
+
+        :param str relative_url: URL relative to the base URL
+        :param data: the request body, see encode_post_data()
+        :param dict headers: more request headers
+        :returns: the HttpResponse
+        """
+
+        (body, headers) = encode_post_data(data, headers)
+        return await self.request('POST', relative_url, body=body, headers=headers)
@@ -0,0 +1,355 @@
+""" BDD Test Harness HTTP: Cassettes
+
+A cassette holds a Feature's recorded HTTP exchanges, so a QA-stage
+suite recorded once against the live services can replay as a fast,
+offline unit-stage suite, with no mocks written by hand.
+
+CassetteClient goes under self.client, around the real client:
+
+    class FeatureTestCase(unittest.TestCase, HttpGetRestApiBDDStepsMixin):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+
+        def setUp(self):
+            self.client = CassetteClient(self.FEATURE_FILE, PooledHttpClient('https://api.example.com'))
+
+Set BDD_CASSETTE_MODE in the environment, or pass `mode`:
+
+    "live"      send every request to the real client (the default with a client)
+    "record"    send every request, and write each exchange to the cassette file
+    "replay"    serve every response from the cassette file (the default without a client)
+
+The cassette file is "features/data/<feature>/cassette.jsonl": NDJSON,
+one exchange per line, with the response body as text where it is UTF-8.
+Recording appends to it, so parallel test processes record into the same
+file. Empty it once before a recording run starts, before the test
+processes do, e.g. in the CI script or in setUpClass() when one process
+runs the whole Feature:
+
+    start_recording('features/TC-T1.feature')
+
+A replay reads the cassette once into an in-memory index, kept in the
+data file cache; each request is one dict lookup.
+
+A request is matched on its method, relative URL and body, not on the
+base URL, so a cassette recorded against one stage replays anywhere.
+A JSON body is matched on its canonical encoding, whatever JSON backend
+is installed.
+The same request made again replays the next response recorded for it,
+and the last one once they run out.
+"""
+
+import base64
+import hashlib
+import http.client
+import json
+import os
+import threading
+
+from testharness.bdd.http.client import HttpResponse, encode_post_data
+from testharness.bdd.json_codec import json_codec
+from testharness.bdd.loader_mixins.cache import data_file_cache
+from testharness.bdd.loader_mixins.common import (
+    COMPRESSED_FILE_OPENERS,
+    DataFileError,
+    get_data_files_dir,
+    resolve_data_file
+)
+
+CASSETTE_MODE_ENV = 'BDD_CASSETTE_MODE'
+CASSETTE_MODES = ('live', 'record', 'replay')
+CASSETTE_FILENAME = 'cassette.jsonl'
+
+
+class CassetteMissError(LookupError):
+    """ BDD Cassette Miss Error.
+
+    The cassette has no recorded response for a request.
+    """
+    pass
+
+
+def get_canonical_body(data):
+    """ Get Canonical Body.
+
+    The request body to match a recorded exchange on. A dict or list is
+    encoded with the stdlib json, sorted and compact, so its key is the
+    same whatever JSON backend encoded the request.
+
+    :param data: the request body, see encode_post_data(), or None
+    :returns: the body as bytes
+    """
+
+    if isinstance(data, (dict, list)):
+        return json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return encode_post_data(data)[0]
+
+
+def get_request_key(method, relative_url, data=None):
+    """ Get Request Key.
+
+    :param str method: HTTP method, e.g. "GET"
+    :param str relative_url: URL relative to the base URL
+    :param data: the request body, see encode_post_data(), or None
+    :returns: (method, relative_url, body SHA-1) to match a recorded exchange
+    """
+
+    body = get_canonical_body(data) if data is not None else None
+    digest = hashlib.sha1(body).hexdigest() if body else ''
+    return (method.upper(), relative_url, digest)
+
+
+def _encode_content(content):
+    """ The body as {"text": str} when it is UTF-8, else {"base64": str}. """
+
+    try:
+        return {'text': content.decode('utf-8')}
+    except UnicodeDecodeError:
+        return {'base64': base64.b64encode(content).decode('ascii')}
+
+
+def _decode_content(encoded):
+    if 'base64' in encoded:
+        return base64.b64decode(encoded['base64'])
+    return encoded['text'].encode('utf-8')
+
+
+def get_exchange_record(key, response):
+    """ Get Exchange Record.
+
+    :param tuple key: the request key, see get_request_key()
+    :param response: an HttpResponse, or a requests.Response
+    :returns: the exchange as a JSON-ready dict for the cassette file
+    """
+
+    (method, relative_url, digest) = key
+    elapsed = getattr(response, 'elapsed', 0.0)
+    if hasattr(elapsed, 'total_seconds'):
+        elapsed = elapsed.total_seconds()  # requests' timedelta
+
+    return {
+        'method': method,
+        'url': relative_url,
+        'body_sha1': digest,
+        'status_code': response.status_code,
+        'reason': response.reason,
+        'headers': [[name, value] for (name, value) in response.headers.items()],
+        'content': _encode_content(bytes(response.content)),
+        'elapsed': round(elapsed, 6)
+    }
+
+
+def get_exchange_response(record):
+    """ Get Exchange Response.
+
+    :param dict record: an exchange from the cassette file
+    :returns: the recorded HttpResponse
+    """
+
+    headers = http.client.HTTPMessage()
+    for (name, value) in record['headers']:
+        headers[name] = value
+    return HttpResponse(record['url'], record['status_code'], record['reason'], headers,
+                        _decode_content(record['content']), record['elapsed'])
+
+
+class Cassette(object):
+    """ Cassette.
+
+    The recorded responses of one cassette file, indexed by request key.
+    """
+
+    def __init__(self, records=()):
+        self.responses = {}
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """ Add a recorded exchange. """
+
+        key = (record['method'], record['url'], record['body_sha1'])
+        self.responses.setdefault(key, []).append(get_exchange_response(record))
+
+    def __len__(self):
+        return sum(len(responses) for responses in self.responses.values())
+
+
+def read_cassette(file_path):
+    """ Read a Cassette file.
+
+    :param str file_path: path to the cassette file, maybe compressed
+    :raises DataFileError: when the file cannot be read or an exchange is corrupt
+    :returns: (Cassette, nbytes) for the data file cache
+    """
+
+    opener = COMPRESSED_FILE_OPENERS.get(os.path.splitext(file_path)[1], open)
+    cassette = Cassette()
+    nbytes = 0
+    try:
+        with opener(file_path, 'rb') as f:
+            for (line_number, line) in enumerate(f, 1):
+                nbytes += len(line)
+                if line.strip():
+                    cassette.add(json_codec.loads(line))
+    except (OSError, EOFError) as e:
+        raise DataFileError(file_path) from e
+    except (ValueError, KeyError, TypeError) as e:
+        raise DataFileError('{}: line {}: {}'.format(file_path, line_number, e)) from e
+
+    return (cassette, nbytes)
+
+
+_record_lock = threading.Lock()
+
+
+def get_cassette_path(feature_file, cassette_name=CASSETTE_FILENAME):
+    """ Get Cassette Path.
+
+    :param str feature_file: A BDD Gherkin Feature file, to find its data directory
+    :param str cassette_name: the cassette's filename in the data directory
+    :returns: path to the Feature's cassette file
+    """
+
+    return os.path.join(get_data_files_dir(feature_file), cassette_name)
+
+
+def start_recording(feature_file, cassette_name=CASSETTE_FILENAME):
+    """ Start Recording.
+
+    Remove a Feature's cassette file, so a new recording starts empty.
+    Call it once per recording run, before any test process records.
+
+    :param str feature_file: A BDD Gherkin Feature file, to find its data directory
+    :param str cassette_name: the cassette's filename in the data directory
+    """
+
+    with _record_lock:
+        try:
+            os.remove(get_cassette_path(feature_file, cassette_name))
+        except FileNotFoundError:
+            pass
+
+
+def write_exchange(cassette_path, record):
+    """ Append one exchange to a cassette file.
+
+    Each exchange is one write() of a whole line in append mode, so test
+    processes recording at the same time do not overwrite each other.
+    """
+
+    line = json_codec.dumps(record, sort_keys=True) + '\n'
+    with _record_lock:
+        os.makedirs(os.path.dirname(cassette_path) or '.', exist_ok=True)
+        with open(cassette_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+
+class CassetteClient(object):
+    """ Cassette Client.
+
+    An HTTP client with get() and post() that records or replays
+    the exchanges of the real client under it.
+    """
+
+    def __init__(self, feature_file, client=None, mode=None, cassette_name=CASSETTE_FILENAME):
+        """ Init CassetteClient.
+
+        :param str feature_file: A BDD Gherkin Feature file, to find its data directory
+        :param client: the real HTTP client, e.g. a PooledHttpClient; not needed to replay
+        :param str mode: "live", "record" or "replay", default $BDD_CASSETTE_MODE
+        :param str cassette_name: the cassette's filename in the data directory
+        :raises ValueError: when the mode is unknown, or needs a client
+        """
+
+        if mode is None:
+            mode = os.environ.get(CASSETTE_MODE_ENV) or ('replay' if client is None else 'live')
+        if mode not in CASSETTE_MODES:
+            raise ValueError('Unknown cassette mode "{}", use one of {}'.format(mode, CASSETTE_MODES))
+        if mode != 'replay' and client is None:
+            raise ValueError('The "{}" cassette mode needs a client'.format(mode))
+
+        self.client = client
+        self.mode = mode
+        self.cassette_path = get_cassette_path(feature_file, cassette_name)
+        self._plays = {}
+
+    @property
+    def cassette(self):
+        """ The Cassette, read from the cassette file on first use. """
+
+        return data_file_cache.load(resolve_data_file(self.cassette_path), 'cassette', read_cassette, sized=True)
+
+    def play(self, key):
+        """ Play the next recorded response for a request.
+
+        :param tuple key: the request key, see get_request_key()
+        :raises CassetteMissError: when the cassette has no response for the request
+        :returns: the recorded HttpResponse
+        """
+
+        responses = self.cassette.responses.get(key)
+        if not responses:
+            raise CassetteMissError('No recorded response for {} {} in "{}"'.format(
+                key[0], key[1], self.cassette_path))
+
+        plays = self._plays.get(key, 0)
+        self._plays[key] = plays + 1
+        return responses[min(plays, len(responses) - 1)]
+
+    def record(self, key, response):
+        """ Record an exchange when recording, and return the response. """
+
+        if self.mode == 'record':
+            write_exchange(self.cassette_path, get_exchange_record(key, response))
+        return response
+
+    def get(self, relative_url, headers=None):
+        """ HTTP GET.
+
+        :param str relative_url: URL relative to the base URL
+        :param dict headers: more request headers; not matched on replay
+        :returns: the response
+        """
+
+        key = get_request_key('GET', relative_url)
+        if self.mode == 'replay':
+            return self.play(key)
+        kwargs = {} if headers is None else {'headers': headers}
+        return self.record(key, self.client.get(relative_url, **kwargs))
+
+    def post(self, relative_url, data=None, headers=None):
+        """ HTTP POST.
+
+        :param str relative_url: URL relative to the base URL
+        :param data: the request body, see encode_post_data()
+        :param dict headers: more request headers; not matched on replay
+        :returns: the response
+        """
+
+        key = get_request_key('POST', relative_url, data)
+        if self.mode == 'replay':
+            return self.play(key)
+        kwargs = {} if headers is None else {'headers': headers}
+        return self.record(key, self.client.post(relative_url, data, **kwargs))
+
+
+class AsyncCassetteClient(CassetteClient):
+    """ Async Cassette Client.
+
+    A CassetteClient with coroutine get() and post(), for the async
+    step mixins, around e.g. an AsyncPooledHttpClient.
+    """
+
+    async def get(self, relative_url, headers=None):
+        key = get_request_key('GET', relative_url)
+        if self.mode == 'replay':
+            return self.play(key)
+        kwargs = {} if headers is None else {'headers': headers}
+        return self.record(key, await self.client.get(relative_url, **kwargs))
+
+    async def post(self, relative_url, data=None, headers=None):
+        key = get_request_key('POST', relative_url, data)
+        if self.mode == 'replay':
+            return self.play(key)
+        kwargs = {} if headers is None else {'headers': headers}
+        return self.record(key, await self.client.post(relative_url, data, **kwargs))
@@ -0,0 +1,318 @@
+""" BDD Test Harness HTTP: Pooled HTTP Client
+
+The REST step mixins call self.client.get() and self.client.post().
+PooledHttpClient is a client for QA-stage tests against live services.
+
+Every client in the process shares one keep-alive connection pool per
+origin, e.g. "https://api.example.com:443", so the TCP and TLS handshakes
+are paid once per connection, not once per test module or request.
+
+    class FeatureTestCase(unittest.TestCase, HttpGetRestApiBDDStepsMixin):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+
+        def setUp(self):
+            self.client = PooledHttpClient('https://api.example.com', pool_size=20, timeout=10)
+
+The pool keeps at most `pool_size` idle connections per origin; more may
+be open at once while requests are in flight. A kept connection the server
+has closed is detected on reuse and the request is sent again once.
+"""
+
+import http.client
+import socket
+import ssl
+import threading
+import time
+
+from collections import deque
+from urllib.parse import urljoin, urlsplit
+
+from testharness.bdd.json_codec import json_codec
+
+DEFAULT_POOL_SIZE = 10
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+DEFAULT_TIMEOUT = 30.0
+DEFAULT_CONNECT_TIMEOUT = 10.0
+
+# A reused keep-alive connection that fails with one of these was closed
+# by the server while idle; the request never reached it.
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+def encode_post_data(data, headers=None):
+    """ Encode POST Data.
+
+    A dict or list is sent as JSON; str is sent UTF-8 encoded;
+    any bytes-like object, e.g. a map_data() memoryview, is sent as is.
+
+    :param data: the request body
+    :param dict headers: the request headers
+    :returns: (body, headers) with a JSON Content-Type added when it is JSON
+    """
+
+    headers = dict(headers or {})
+    if isinstance(data, (dict, list)):
+        data = json_codec.dumps(data).encode('utf-8')
+        if not any(name.lower() == 'content-type' for name in headers):
+            headers['Content-Type'] = 'application/json'
+    elif isinstance(data, str):
+        data = data.encode('utf-8')
+    return (data, headers)
+
+
+def get_url_port(parts):
+    """ The port of a urlsplit() URL, default the scheme's. """
+
+    return parts.port or DEFAULT_PORTS.get(parts.scheme)
+
+
+def get_request_target(base_url, relative_url, scheme, host, port):
+    """ Get Request Target.
+
+    :param str base_url: the client's base URL
+    :param str relative_url: URL relative to the base URL
+    :param str scheme: the client's scheme
+    :param str host: the client's host
+    :param int port: the client's port
+    :raises ValueError: when the URL is on another server, or port
+    :returns: (url, target) the full URL and the path and query to request
+    """
+
+    url = urljoin(base_url, relative_url)
+    parts = urlsplit(url)
+    if (parts.scheme, parts.hostname, get_url_port(parts)) != (scheme, host, port):
+        raise ValueError('"{}" is not on the client\'s base URL "{}"'.format(url, base_url))
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    return (url, target)
+
+
+class HttpResponse(object):
+    """ HTTP Response.
+
+    The parts of a requests.Response the step mixins use.
+    """
+
+    def __init__(self, url, status_code, reason, headers, content, elapsed):
+        self.url = url
+        self.status_code = status_code
+        self.reason = reason
+        self.headers = headers  # Case-insensitive get().
+        self.content = content
+        self.elapsed = elapsed
+
+    @property
+    def text(self):
+        charset = self.headers.get_content_charset() or 'utf-8'
+        return self.content.decode(charset, errors='replace')
+
+    def json(self):
+        return json_codec.loads(self.content)
+
+    def __repr__(self):
+        return '<HttpResponse [{}]>'.format(self.status_code)
+
+
+class ConnectionPool(object):
+    """ Connection Pool.
+
+    A thread-safe pool of idle keep-alive connections to one origin.
+    """
+
+    def __init__(self, scheme, host, port, pool_size=DEFAULT_POOL_SIZE, ssl_context=None):
+        """ Init ConnectionPool.
+
+        :param str scheme: "http" or "https"
+        :param str host: server host
+        :param int port: server port
+        :param int pool_size: the most idle connections to keep
+        :param ssl.SSLContext ssl_context: TLS settings for "https", default the system's
+        """
+
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.pool_size = pool_size
+        self.ssl_context = ssl_context
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_reused = 0
+
+    def new_connection(self, connect_timeout):
+        """ Open a new connection. """
+
+        if self.scheme == 'https':
+            connection = http.client.HTTPSConnection(
+                self.host, self.port, timeout=connect_timeout,
+                context=self.ssl_context or ssl.create_default_context())
+        else:
+            connection = http.client.HTTPConnection(self.host, self.port, timeout=connect_timeout)
+        connection.connect()
+        # Send each request as soon as it is written, not after the last ACK.
+        connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        with self._lock:
+            self.connections_created += 1
+        return connection
+
+    def get_connection(self, connect_timeout):
+        """ Get Connection.
+
+        :returns: (connection, reused) the most recently idle connection, or a new one
+        """
+
+        with self._lock:
+            if self._idle:
+                self.connections_reused += 1
+                return (self._idle.pop(), True)
+        return (self.new_connection(connect_timeout), False)
+
+    def put_connection(self, connection):
+        """ Put a connection back, or close it when the pool is full. """
+
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(connection)
+                return
+        connection.close()
+
+    def clear(self):
+        """ Close every idle connection. """
+
+        with self._lock:
+            (idle, self._idle) = (self._idle, deque())
+        for connection in idle:
+            connection.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(scheme, host, port, pool_size=DEFAULT_POOL_SIZE, ssl_context=None):
+    """ Get Connection Pool.
+
+    Get the process-wide pool for an origin and SSL context, made on
+    first use, so clients with their own TLS settings never share one.
+    A larger pool_size than the pool has grows it.
+
+    :returns: the origin's ConnectionPool
+    """
+
+    key = (scheme, host, port, ssl_context)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = _pools[key] = ConnectionPool(scheme, host, port, pool_size, ssl_context)
+        pool.pool_size = max(pool.pool_size, pool_size)
+    return pool
+
+
+def close_connection_pools():
+    """ Close every idle connection in every pool. """
+
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.clear()
+
+
+class PooledHttpClient(object):
+    """ Pooled HTTP Client.
+
+    A keep-alive HTTP/1.1 client with the get() and post() surface
+    the REST step mixins use. Relative URLs are joined to the base URL.
+    """
+
+    def __init__(self, base_url, pool_size=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, headers=None, ssl_context=None):
+        """ Init PooledHttpClient.
+
+        :param str base_url: the service URL, e.g. "https://api.example.com/v1/"
+        :param int pool_size: the most idle connections to keep for the origin
+        :param float timeout: seconds to wait for each response read
+        :param float connect_timeout: seconds to wait for a new connection
+        :param dict headers: headers to send with every request
+        :param ssl.SSLContext ssl_context: TLS settings for "https", default the system's
+        :raises ValueError: when the base URL is not http or https
+        """
+
+        parts = urlsplit(base_url)
+        if parts.scheme not in ('http', 'https') or not parts.hostname:
+            raise ValueError('Expecting an http or https base URL, not "{}"'.format(base_url))
+
+        self.base_url = base_url
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.headers = dict(headers or {})
+        self.pool = get_connection_pool(parts.scheme, parts.hostname, get_url_port(parts),
+                                        pool_size, ssl_context)
+
+    def request(self, method, relative_url, body=None, headers=None):
+        """ Send a request.
+
+        :param str method: HTTP method, e.g. "GET"
+        :param str relative_url: URL relative to the base URL
+        :param bytes body: request body; any bytes-like object, e.g. a map_data() memoryview
+        :param dict headers: more request headers
+        :raises ValueError: when the URL is on another server
+        :returns: the HttpResponse
+        """
+
+        (url, target) = get_request_target(self.base_url, relative_url, self.pool.scheme, self.pool.host,
+                                           self.pool.port)
+        request_headers = dict(self.headers)
+        request_headers.update(headers or {})
+
+        start = time.perf_counter()
+        (connection, reused) = self.pool.get_connection(self.connect_timeout)
+        try:
+            try:
+                response = self._send(connection, method, target, body, request_headers)
+            except STALE_CONNECTION_ERRORS:
+                if not reused:
+                    raise
+                connection.close()
+                connection = self.pool.new_connection(self.connect_timeout)
+                response = self._send(connection, method, target, body, request_headers)
+            content = response.read()
+        except BaseException:
+            connection.close()
+            raise
+
+        if response.will_close:
+            connection.close()
+        else:
+            self.pool.put_connection(connection)
+
+        return HttpResponse(url, response.status, response.reason, response.msg, content,
+                            time.perf_counter() - start)
+
+    def _send(self, connection, method, target, body, headers):
+        connection.sock.settimeout(self.timeout)
+        connection.request(method, target, body=body, headers=headers)
+        return connection.getresponse()
+
+    def get(self, relative_url, headers=None):
+        """ HTTP GET.
+
+        :param str relative_url: URL relative to the base URL
+        :param dict headers: more request headers
+        :returns: the HttpResponse
+        """
+
+        return self.request('GET', relative_url, headers=headers)
+
+    def post(self, relative_url, data=None, headers=None):
+        """ HTTP POST.
+
+        :param str relative_url: URL relative to the base URL
+        :param data: the request body, see encode_post_data()
+        :param dict headers: more request headers
+        :returns: the HttpResponse
+        """
+
+        (body, headers) = encode_post_data(data, headers)
+        return self.request('POST', relative_url, body=body, headers=headers)
@@ -0,0 +1,253 @@
+""" BDD Test Harness HTTP: Latency Histograms
+
+The REST step mixins time every self.client request. Each time goes
+into the process-wide latency histogram of its request, e.g.
+"GET /osscwl/servers", so the p95 of a whole run is known without
+keeping every time.
+
+LatencyHistogram is HDR-style: values are counted in buckets that keep
+2 significant figures, from 1 microsecond up, so any percentile is
+within 1% of the true value. Histograms are small, and merge exactly,
+e.g. those of parallel test processes.
+
+Set BDD_LATENCY_HISTOGRAMS in the environment to a sidecar file path,
+e.g. next to the XUnit report. At exit, each test process appends one
+JSON line with its histograms:
+
+    BDD_LATENCY_HISTOGRAMS="${REPORTS_DIR}/latency.jsonl" nosetests --with-xunit ...
+
+load_latency_histograms() merges the lines again, and
+bin/report_latency_histograms prints the percentiles, exiting 1 when
+a p95 is over budget, to fail the build.
+"""
+
+import atexit
+import os
+import threading
+
+from testharness.bdd.json_codec import json_codec
+
+LATENCY_HISTOGRAMS_ENV = 'BDD_LATENCY_HISTOGRAMS'
+DEFAULT_SIGNIFICANT_FIGURES = 2
+
+_write_lock = threading.Lock()
+
+
+class LatencyHistogram(object):
+    """ Latency Histogram.
+
+    Count times in log-linear buckets, as HdrHistogram does.
+    Times are in seconds, counted in whole microseconds.
+    Only the buckets in use are kept.
+    """
+
+    def __init__(self, significant_figures=DEFAULT_SIGNIFICANT_FIGURES):
+        """ Init LatencyHistogram.
+
+        :param int significant_figures: the decimal digits each bucket keeps, from 1 to 5
+        :raises ValueError: when significant_figures is out of range
+        """
+
+        if not 1 <= significant_figures <= 5:
+            raise ValueError('Expecting 1 to 5 significant figures, not {}'.format(significant_figures))
+
+        self.significant_figures = significant_figures
+        # Each power of 2 is split into sub-buckets, enough for the significant figures.
+        self._sub_bucket_count = 1 << (2 * 10 ** significant_figures - 1).bit_length()
+        self._sub_bucket_half_magnitude = self._sub_bucket_count.bit_length() - 2
+        self._sub_bucket_half_count = self._sub_bucket_count // 2
+        self.counts = {}
+        self.total_count = 0
+        self.min_value = None
+        self.max_value = 0
+        self.total_value = 0
+
+    def _get_index(self, value):
+        """ The counts index of a value in microseconds. """
+
+        bucket = max(0, (value | (self._sub_bucket_count - 1)).bit_length() - self._sub_bucket_half_magnitude - 1)
+        sub_bucket = value >> bucket
+        return ((bucket + 1) << self._sub_bucket_half_magnitude) + sub_bucket - self._sub_bucket_half_count
+
+    def _get_highest_value(self, index):
+        """ The highest value, in microseconds, counted at an index. """
+
+        bucket = (index >> self._sub_bucket_half_magnitude) - 1
+        sub_bucket = (index & (self._sub_bucket_half_count - 1)) + self._sub_bucket_half_count
+        if bucket < 0:
+            sub_bucket -= self._sub_bucket_half_count
+            bucket = 0
+        return ((sub_bucket + 1) << bucket) - 1
+
+    def record(self, seconds, count=1):
+        """ Record a time.
+
+        :param float seconds: the time, e.g. a response time
+        :param int count: the number of times to count it
+        """
+
+        value = max(0, int(round(seconds * 1000000)))
+        index = self._get_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += count
+        self.total_value += value * count
+        self.min_value = value if self.min_value is None else min(self.min_value, value)
+        self.max_value = max(self.max_value, value)
+
+    def merge(self, other):
+        """ Add another histogram's counts; it must have the same significant figures.
+
+        :raises ValueError: when the significant figures differ
+        """
+
+        if other.significant_figures != self.significant_figures:
+            raise ValueError('Cannot merge histograms of {} and {} significant figures'.format(
+                self.significant_figures, other.significant_figures))
+        for (index, count) in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total_count += other.total_count
+        self.total_value += other.total_value
+        if other.min_value is not None:
+            self.min_value = other.min_value if self.min_value is None else min(self.min_value, other.min_value)
+        self.max_value = max(self.max_value, other.max_value)
+
+    def percentile(self, pct):
+        """ Percentile.
+
+        :param float pct: the percentile, from 0 to 100
+        :returns: the time in seconds that pct percent of the times are at or under,
+            or 0.0 with no times
+        """
+
+        if not self.total_count:
+            return 0.0
+        rank = max(1, -(-self.total_count * pct // 100))  # ceil()
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._get_highest_value(index), self.max_value) / 1000000.0
+        return self.max_value / 1000000.0
+
+    @property
+    def min(self):
+        return (self.min_value or 0) / 1000000.0
+
+    @property
+    def max(self):
+        return self.max_value / 1000000.0
+
+    @property
+    def mean(self):
+        return self.total_value / self.total_count / 1000000.0 if self.total_count else 0.0
+
+    def to_dict(self):
+        return {
+            'significant_figures': self.significant_figures,
+            'counts': [[index, count] for (index, count) in sorted(self.counts.items())],
+            'total_count': self.total_count,
+            'total_value': self.total_value,
+            'min_value': self.min_value,
+            'max_value': self.max_value
+        }
+
+    @classmethod
+    def from_dict(cls, value):
+        histogram = cls(value['significant_figures'])
+        histogram.counts = {index: count for (index, count) in value['counts']}
+        histogram.total_count = value['total_count']
+        histogram.total_value = value['total_value']
+        histogram.min_value = value['min_value']
+        histogram.max_value = value['max_value']
+        return histogram
+
+
+class LatencyHistograms(object):
+    """ Latency Histograms.
+
+    A thread-safe LatencyHistogram per name, e.g. per request.
+    """
+
+    def __init__(self, significant_figures=DEFAULT_SIGNIFICANT_FIGURES):
+        self.significant_figures = significant_figures
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds):
+        """ Record a time in the named histogram. """
+
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram(self.significant_figures)
+            histogram.record(seconds)
+
+    def get(self, name):
+        """ A copy of the named histogram, or None. """
+
+        with self._lock:
+            histogram = self.histograms.get(name)
+            return None if histogram is None else LatencyHistogram.from_dict(histogram.to_dict())
+
+    def merge(self, histograms):
+        """ Add the histograms of a {name: LatencyHistogram} dict. """
+
+        with self._lock:
+            for (name, histogram) in histograms.items():
+                self.histograms.setdefault(name, LatencyHistogram(histogram.significant_figures)).merge(histogram)
+
+    def to_dict(self):
+        with self._lock:
+            return {name: histogram.to_dict() for (name, histogram) in sorted(self.histograms.items())}
+
+    def clear(self):
+        with self._lock:
+            self.histograms = {}
+
+
+# The process-wide response time histograms.
+latency_histograms = LatencyHistograms()
+
+
+def write_latency_histograms(histograms_filename, histograms=None):
+    """ Write Latency Histograms.
+
+    Append one process's histograms to the sidecar file, when there are any.
+
+    :param str histograms_filename: path to the sidecar JSON lines file
+    :param LatencyHistograms histograms: default the process-wide histograms
+    """
+
+    histograms = (histograms or latency_histograms).to_dict()
+    if not histograms:
+        return
+
+    line = json_codec.dumps({'pid': os.getpid(), 'histograms': histograms}, sort_keys=True)
+    with _write_lock:
+        with open(histograms_filename, 'a') as f:
+            f.write(line + '\n')
+
+
+def load_latency_histograms(histograms_filename):
+    """ Load Latency Histograms.
+
+    :param str histograms_filename: path to the sidecar JSON lines file
+    :returns: LatencyHistograms with every process's histograms merged
+    """
+
+    histograms = LatencyHistograms()
+    with open(histograms_filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                histograms.merge({name: LatencyHistogram.from_dict(value)
+                                  for (name, value) in json_codec.loads(line)['histograms'].items()})
+    return histograms
+
+
+def _write_at_exit():
+    histograms_filename = os.environ.get(LATENCY_HISTOGRAMS_ENV)
+    if histograms_filename:
+        write_latency_histograms(histograms_filename)
+
+
+atexit.register(_write_at_exit)
@@ -0,0 +1,257 @@
+""" BDD Test Harness HTTP: Mock REST Server
+
+A local stand-in REST service for unit-stage tests, so the REST step
+mixins can run a Feature hermetically, with a real HTTP client and no
+mock client written by hand.
+
+The server's canned responses are routed by method and path, read from
+"features/data/<feature>/mock_routes.json":
+
+    [
+        {"method": "GET", "path": "/osscwl/servers", "status": 200,
+         "body": {"WFA_SERVERS": [], "message": "OK"}},
+        {"method": "POST", "path": "/osscwl/view", "status": 401,
+         "body_file": "osscwl_view_login_failure_output.json"}
+    ]
+
+"body" is a JSON document; "body_file" names a data file in the same
+directory, sent as is. "headers" are more response headers; the
+Content-Type is "application/json", or guessed from the body_file name.
+A path with a "?query" matches only that query; a path without one
+matches any query. Any other request gets a 404 JSON response.
+
+Each test class can share one server per Feature:
+
+    class FeatureTestCase(unittest.TestCase, HttpGetRestApiBDDStepsMixin):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+
+        def setUp(self):
+            self.client = PooledHttpClient(get_mock_server(self.FEATURE_FILE).base_url)
+
+The server listens on a free port of 127.0.0.1 and answers each
+connection in its own thread, with keep-alive. Each response is built
+once, when its route is added, and sent with one write.
+"""
+
+import http
+import mimetypes
+import os
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testharness.bdd.json_codec import json_codec
+from testharness.bdd.loader_mixins.common import DataFileError, get_data_files_dir
+
+MOCK_ROUTES_FILENAME = 'mock_routes.json'
+
+# Seconds between checks for stop(), so a test's server stops quickly.
+POLL_INTERVAL = 0.05
+
+
+def build_response(status, body=b'', headers=None):
+    """ Build Response.
+
+    :param int status: HTTP status code
+    :param bytes body: the response body
+    :param dict headers: response headers
+    :returns: the whole HTTP/1.1 response as bytes
+    """
+
+    lines = ['HTTP/1.1 {} {}'.format(status, http.HTTPStatus(status).phrase)]
+    lines.extend('{}: {}'.format(name, value) for (name, value) in (headers or {}).items())
+    lines.append('Content-Length: {}'.format(len(body)))
+    return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+
+def not_found_response(method, path):
+    body = json_codec.dumps({'message': 'No mock route for {} {}'.format(method, path)}).encode('utf-8')
+    return build_response(404, body, {'Content-Type': 'application/json'})
+
+
+class MockRestHandler(BaseHTTPRequestHandler):
+    """ Mock REST Handler: answer each request from the server's routes. """
+
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_route(self):
+        content_length = int(self.headers.get('Content-Length') or 0)
+        if content_length:
+            self.rfile.read(content_length)  # Read the body to keep the connection.
+
+        routes = self.server.routes
+        response = routes.get((self.command, self.path))
+        if response is None:
+            response = routes.get((self.command, self.path.split('?', 1)[0]))
+        if response is None:
+            response = not_found_response(self.command, self.path)
+
+        with self.server.count_lock:
+            self.server.requests_served += 1
+        self.wfile.write(response)
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_route
+
+
+class MockRestHTTPServer(ThreadingHTTPServer):
+    """ A threading HTTP server that ignores clients that hang up. """
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class MockRestServer(object):
+    """ Mock REST Server.
+
+    A local HTTP server of canned responses, routed by method and path.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0):
+        """ Init MockRestServer.
+
+        :param str host: address to listen on
+        :param int port: port to listen on, default a free port
+        """
+
+        self.host = host
+        self.port = port
+        self.routes = {}
+        self._server = None
+        self._thread = None
+
+    def add_route(self, method, path, status=200, body=None, headers=None, body_bytes=None):
+        """ Add a Route.
+
+        :param str method: HTTP method, e.g. "GET"
+        :param str path: URL path, e.g. "/osscwl/servers"
+        :param int status: HTTP status code
+        :param body: a JSON document to send, or None
+        :param dict headers: more response headers
+        :param bytes body_bytes: the body to send as is, instead of JSON
+        :raises ValueError: when the status code is unknown
+        """
+
+        headers = dict(headers or {})
+        if body_bytes is None:
+            body_bytes = b'' if body is None else json_codec.dumps(body).encode('utf-8')
+            if body is not None:
+                headers.setdefault('Content-Type', 'application/json')
+        self.routes[(method.upper(), path)] = build_response(status, body_bytes, headers)
+
+    def load_routes(self, feature_file):
+        """ Load Routes.
+
+        Add the routes of a Feature's mock_routes.json data file.
+
+        :param str feature_file: A BDD Gherkin Feature file, to find its data directory
+        :raises DataFileError: when the routes file cannot be read or a route is wrong
+        :returns: self
+        """
+
+        data_files_dir = get_data_files_dir(feature_file)
+        routes_path = os.path.join(data_files_dir, MOCK_ROUTES_FILENAME)
+        try:
+            with open(routes_path, 'rb') as f:
+                routes = json_codec.loads(f.read())
+        except (OSError, ValueError) as e:
+            raise DataFileError(routes_path) from e
+
+        for (x, route) in enumerate(routes):
+            try:
+                headers = dict(route.get('headers') or {})
+                body_bytes = None
+                if 'body_file' in route:
+                    body_path = os.path.join(data_files_dir, route['body_file'])
+                    with open(body_path, 'rb') as f:
+                        body_bytes = f.read()
+                    content_type = mimetypes.guess_type(body_path)[0] or 'application/octet-stream'
+                    headers.setdefault('Content-Type', content_type)
+                self.add_route(route['method'], route['path'], route.get('status', 200),
+                               route.get('body'), headers, body_bytes)
+            except (OSError, KeyError, TypeError, ValueError, AttributeError) as e:
+                raise DataFileError('{}: route {}: {!r}'.format(routes_path, x, e)) from e
+        return self
+
+    @property
+    def base_url(self):
+        """ The server's URL, e.g. "http://127.0.0.1:54321". """
+
+        return 'http://{}:{}'.format(self.host, self.port)
+
+    @property
+    def requests_served(self):
+        return self._server.requests_served if self._server is not None else 0
+
+    def start(self):
+        """ Start serving in a background thread.
+
+        :returns: self
+        """
+
+        if self._server is None:
+            server = MockRestHTTPServer((self.host, self.port), MockRestHandler)
+            server.routes = self.routes
+            server.requests_served = 0
+            server.count_lock = threading.Lock()
+            self.port = server.server_port
+            self._server = server
+            self._thread = threading.Thread(target=server.serve_forever, args=(POLL_INTERVAL,),
+                                            name='MockRestServer', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        """ Stop serving and close the listening socket. """
+
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+
+_servers = {}
+_servers_lock = threading.Lock()
+
+
+def get_mock_server(feature_file):
+    """ Get Mock Server.
+
+    Get the process-wide mock server for a Feature's data directory,
+    loaded and started on first use.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :raises DataFileError: when the routes file cannot be read
+    :returns: the started MockRestServer
+    """
+
+    key = os.path.abspath(get_data_files_dir(feature_file))
+    with _servers_lock:
+        server = _servers.get(key)
+        if server is None:
+            server = MockRestServer().load_routes(feature_file).start()
+            _servers[key] = server
+    return server
+
+
+def stop_mock_servers():
+    """ Stop every process-wide mock server. """
+
+    with _servers_lock:
+        servers = list(_servers.values())
+        _servers.clear()
+    for server in servers:
+        server.stop()
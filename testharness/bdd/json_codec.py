@@ -0,0 +1,179 @@
+""" BDD Test Harness: JSON Codec
+
+One JSON codec for the data file loaders, the step timings the TM4J
+reporter reads, and the response JSON the step mixins assert on.
+
+The codec uses the fastest backend installed: orjson, then ujson, then
+the stdlib json. Set BDD_JSON_BACKEND in the environment to choose one,
+or set it at run time:
+
+    from testharness.bdd.json_codec import json_codec
+    json_codec.backend = 'json'
+
+The stdlib json stays the reference. A document the fast backend
+refuses, e.g. an integer too big for 64 bits or NaN, is decoded again by
+the stdlib, so every backend accepts the same documents and a corrupt
+document raises the stdlib json.JSONDecodeError with its position.
+Encoded text may differ between backends in whitespace and escaping.
+"""
+
+import importlib
+import json
+import os
+
+import logging
+log = logging.getLogger(__name__)
+
+JSON_BACKEND_ENV = 'BDD_JSON_BACKEND'
+
+# JSON backends, fastest first.
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+
+
+def _orjson_codec(orjson):
+    """ orjson loads() and dumps() functions. """
+
+    def dumps(value, sort_keys=False, indent=None):
+        if indent not in (None, 2):
+            return json.dumps(value, sort_keys=sort_keys, indent=indent)
+        option = (orjson.OPT_SORT_KEYS if sort_keys else 0) | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(value, option=option).decode('utf-8')
+
+    return (orjson.loads, dumps)
+
+
+def _ujson_codec(ujson):
+    """ ujson loads() and dumps() functions. """
+
+    def dumps(value, sort_keys=False, indent=None):
+        return ujson.dumps(value, sort_keys=sort_keys, indent=indent or 0,
+                           ensure_ascii=False, escape_forward_slashes=False)
+
+    return (ujson.loads, dumps)
+
+
+def _json_codec(json_module):
+    """ stdlib json loads() and dumps() functions. """
+
+    def dumps(value, sort_keys=False, indent=None):
+        return json_module.dumps(value, sort_keys=sort_keys, indent=indent)
+
+    return (json_module.loads, dumps)
+
+
+_CODEC_FACTORIES = {
+    'orjson': _orjson_codec,
+    'ujson': _ujson_codec,
+    'json': _json_codec,
+}
+
+
+def get_installed_backends():
+    """ Get Installed Backends.
+
+    :returns: a list of the installed JSON backend names, fastest first
+    """
+
+    installed = []
+    for name in JSON_BACKENDS:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            continue
+        installed.append(name)
+    return installed
+
+
+class JSONCodec(object):
+    """ JSON Codec.
+
+    Encode and decode JSON with the chosen backend.
+    """
+
+    def __init__(self, backend=None):
+        """ Init JSONCodec.
+
+        :param str backend: "orjson", "ujson" or "json", default the fastest installed
+        :raises ValueError: when the backend is unknown
+        :raises ImportError: when the backend is not installed
+        """
+
+        self.backend = backend
+
+    @property
+    def backend(self):
+        return self._backend
+
+    @backend.setter
+    def backend(self, backend):
+        if backend is None:
+            backend = get_installed_backends()[0]
+        if backend not in _CODEC_FACTORIES:
+            raise ValueError('Unknown JSON backend "{}", use one of {}'.format(backend, JSON_BACKENDS))
+
+        (self._loads, self._dumps) = _CODEC_FACTORIES[backend](importlib.import_module(backend))
+        self._backend = backend
+
+    def loads(self, data):
+        """ Decode JSON.
+
+        :param data: JSON document as str or UTF-8 bytes
+        :raises json.JSONDecodeError: when the document is corrupt
+        :returns: the parsed JSON document
+        """
+
+        try:
+            return self._loads(data)
+        except ValueError:
+            if self._backend == 'json':
+                raise
+        return json.loads(data)
+
+    def dumps(self, value, sort_keys=False, indent=None):
+        """ Encode JSON.
+
+        :param value: a JSON document
+        :param bool sort_keys: sort the dict keys
+        :param int indent: indent nested values by this many spaces, default one line
+        :returns: JSON text as str
+        """
+
+        try:
+            return self._dumps(value, sort_keys=sort_keys, indent=indent)
+        except (TypeError, ValueError, OverflowError):
+            if self._backend == 'json':
+                raise
+        return json.dumps(value, sort_keys=sort_keys, indent=indent)
+
+    def loads_response(self, response):
+        """ Decode a Response's JSON.
+
+        Decode the body bytes of a requests-like HTTP response.
+        A response without body bytes, or not in UTF-8, uses its own json().
+
+        :param response: HTTP response with `content` bytes and a json() method
+        :returns: the parsed JSON document
+        """
+
+        content = getattr(response, 'content', None)
+        if isinstance(content, (bytes, bytearray)):
+            try:
+                return self.loads(content)
+            except ValueError:
+                pass
+        return response.json()
+
+
+def _get_default_codec():
+    """ The process-wide codec: BDD_JSON_BACKEND, else the fastest installed. """
+
+    backend = os.environ.get(JSON_BACKEND_ENV) or None
+    try:
+        return JSONCodec(backend)
+    except (ValueError, ImportError) as e:
+        log.warning('Ignoring %s=%s: %s', JSON_BACKEND_ENV, backend, e)
+        return JSONCodec()
+
+
+# The process-wide JSON codec.
+json_codec = _get_default_codec()
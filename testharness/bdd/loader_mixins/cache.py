@@ -0,0 +1,161 @@
+""" BDD Feature Files: Data File Cache
+
+The same data file, e.g. a "post_payload" JSON, is loaded once per
+Examples row in every test that shares it. The data file cache keeps
+what the loader mixins read, shared by every test in the process.
+
+Each entry is keyed by the file path and the kind of load, e.g. "json",
+and remembers the file's size and mtime. A changed file is read again.
+The cache holds at most `max_bytes` of data files, measured by their
+size on disk, or their decoded size for compressed files; the least
+recently used files are evicted first.
+
+The budget is BDD_DATA_CACHE_BYTES in the environment, default 64 MiB,
+or set it at run time:
+
+    from testharness.bdd.loader_mixins.cache import data_file_cache
+    data_file_cache.max_bytes = 256 * 1024 * 1024
+    print(data_file_cache.stats())
+"""
+
+import os
+import threading
+
+from collections import OrderedDict
+
+DATA_CACHE_BYTES_ENV = 'BDD_DATA_CACHE_BYTES'
+DEFAULT_DATA_CACHE_BYTES = 64 * 1024 * 1024
+
+
+def copy_json(value):
+    """ Copy JSON.
+
+    Copy the dicts and lists of a parsed JSON document.
+    Strings, numbers, booleans and None cannot change, so they are shared.
+    This is much faster than copy.deepcopy().
+
+    :param value: a parsed JSON document
+    :returns: a copy that is safe to change
+    """
+
+    if isinstance(value, dict):
+        return {key: copy_json(item) for key, item in value.items()}
+    elif isinstance(value, list):
+        return [copy_json(item) for item in value]
+    return value
+
+
+class DataFileCache(object):
+    """ Data File Cache.
+
+    A thread-safe LRU cache of loaded data files with a byte budget.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_DATA_CACHE_BYTES):
+        """ Init DataFileCache.
+
+        :param int max_bytes: the most bytes of data files to keep; 0 turns the cache off
+        """
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @max_bytes.setter
+    def max_bytes(self, max_bytes):
+        with self._lock:
+            self._max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        """ Evict the least recently used files until the cache fits its budget. """
+
+        while self._entries and self.current_bytes > self._max_bytes:
+            (key, (stamp, value, nbytes)) = self._entries.popitem(last=False)
+            self.current_bytes -= nbytes
+            self.evictions += 1
+
+    def load(self, file_path, kind, loader, sized=False):
+        """ Load a data file through the cache.
+
+        A file that cannot be stat()-ed is passed to the loader uncached,
+        so the loader raises its usual error.
+
+        :param str file_path: path to the data file
+        :param str kind: kind of load, e.g. "bytes", "text" or "json"
+        :param loader: function loader(file_path) that reads the file
+        :param bool sized: the loader returns (value, nbytes) to count nbytes, not the file size
+        :returns: the loaded value, shared with other callers
+        """
+
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return loader(file_path)[0] if sized else loader(file_path)
+
+        key = (file_path, kind)
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        if sized:
+            (value, nbytes) = loader(file_path)
+        else:
+            (value, nbytes) = (loader(file_path), stat.st_size)
+        self.put(key, stamp, value, nbytes)
+        return value
+
+    def put(self, key, stamp, value, nbytes):
+        """ Put a loaded value in the cache; one too big for the budget is not kept. """
+
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry is not None:
+                self.current_bytes -= old_entry[2]
+            if nbytes > self._max_bytes:
+                return
+
+            self._entries[key] = (stamp, value, nbytes)
+            self.current_bytes += nbytes
+            self._evict()
+
+    def clear(self):
+        """ Clear every entry and reset the stats. """
+
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        """ Stats.
+
+        :returns: a dict of hits, misses, evictions, entries, bytes and max_bytes
+        """
+
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'bytes': self.current_bytes,
+                'max_bytes': self._max_bytes,
+            }
+
+
+# The process-wide data file cache for every loader mixin.
+data_file_cache = DataFileCache(int(os.environ.get(DATA_CACHE_BYTES_ENV, DEFAULT_DATA_CACHE_BYTES)))
@@ -1,11 +1,67 @@
 """ BDD Feature Files: Data File Loaders
+
+The loaders share one process-wide data file cache, see loader_mixins.cache.
+
+A data file may be stored compressed. When "login.json" is not found,
+the loaders read "login.json.gz", "login.json.xz" or "login.json.bz2",
+decompressed as they read, and cache the decoded result.
+
+Set PREFETCH_DATA_FILES on the TestCase class to load the data files
+named in the Feature's "Examples:" tables into the cache on a background
+thread, so the steps do not wait on the disk:
+
+    class FeatureTestCase(unittest.TestCase, JSONDataLoaderMixin):
+
+        FEATURE_FILE = 'features/TC-T2.feature'
+        PREFETCH_DATA_FILES = True
+
+The Feature runners start the prefetch before the first step runs,
+whatever the order of the bases; so does the mixin's setUpClass(),
+when it runs.
 """
 
+import bz2
+import codecs
+import gzip
 import json
+import lzma
+import mmap
 import os.path
+import re
+import threading
+
+from functools import partial
+
+from testharness.bdd.json_codec import json_codec
+from testharness.bdd.loader_mixins.cache import copy_json, data_file_cache
+from testharness.bdd.loader_mixins.manifest import get_data_manifest, get_examples_cells
+
+import logging
+log = logging.getLogger(__name__)
 
 UNPARSEABLE_JSON_TOKEN = '<Unparseable JSON Document>'
 
+# Stream large JSON data files in chunks of this many bytes.
+JSON_RECORDS_CHUNK_SIZE = 64 * 1024
+
+JSON_WHITESPACE_RE = re.compile(r'[ \t\n\r]*')
+
+# The longest JSON token that can be cut short at a chunk's end, a "\uXXXX" escape.
+JSON_LONGEST_TOKEN = 6
+
+# A payload template placeholder, e.g. "${order_id}".
+PLACEHOLDER_RE = re.compile(r'\$\{(\w+)\}')
+
+# A data file with this suffix is a payload template, e.g. "order.tmpl.json".
+PAYLOAD_TEMPLATE_SUFFIX = '.tmpl.json'
+
+# Compressed data file suffixes, in the order they are looked for.
+COMPRESSED_FILE_OPENERS = {
+    '.gz': gzip.open,
+    '.xz': lzma.open,
+    '.bz2': bz2.open,
+}
+
 
 class DataFileError(ValueError):
     """ BDD Data File Error.
@@ -15,6 +71,382 @@ class DataFileError(ValueError):
     pass
 
 
+class JSONRecordError(DataFileError):
+    """ BDD JSON Record Error.
+
+    A JSON record in a large data file is corrupt.
+    The `offset` is the byte offset of the error in the file.
+    """
+
+    def __init__(self, file_path, offset, msg):
+        super(JSONRecordError, self).__init__('{}: byte {}: {}'.format(file_path, offset, msg))
+        self.file_path = file_path
+        self.offset = offset
+
+
+def _iter_ndjson_records(f, file_path):
+    """ Iterate NDJSON Records: one JSON document per line; blank lines are skipped. """
+
+    offset = 0
+    for line in f:
+        if line.strip():
+            try:
+                record = json_codec.loads(line)
+            except UnicodeDecodeError as e:
+                raise JSONRecordError(file_path, offset + e.start, e.reason) from e
+            except json.JSONDecodeError as e:
+                raise JSONRecordError(file_path, offset + len(e.doc[:e.pos].encode('utf-8')), e.msg) from e
+            yield record
+        offset += len(line)
+
+
+def _json_error_is_truncated(error, buffer_length):
+    """ JSON Error Is Truncated.
+
+    Could a JSONDecodeError be the end of the buffer, in the middle of a
+    record? Only an unterminated string, or an error in the last few
+    characters, e.g. "tru" or "\\u12", can be. An error earlier in the
+    buffer is corrupt data, raised before any more of the file is read.
+    """
+
+    return error.msg.startswith('Unterminated string') or error.pos >= buffer_length - JSON_LONGEST_TOKEN
+
+
+def _iter_json_array_records(f, file_path, chunk_size=JSON_RECORDS_CHUNK_SIZE):
+    """ Iterate JSON Array Records.
+
+    Yield the elements of a top-level JSON array, one at a time.
+    Only the current element and one chunk are held in memory.
+    This parses with the stdlib json, the only backend with raw_decode().
+    """
+
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''            # decoded text
+    parsed_index = 0       # buffer[:parsed_index] is parsed
+    parsed_offset = 0      # byte offset of buffer[parsed_index] in the file
+    at_eof = False
+
+    def byte_offset(index):
+        return parsed_offset + len(buffer[parsed_index:index].encode('utf-8'))
+
+    def read_more(min_chars=1):
+        nonlocal buffer, at_eof
+        wanted = len(buffer) + min_chars
+        while not at_eof and len(buffer) < wanted:
+            chunk = f.read(chunk_size)
+            try:
+                buffer += utf8_decoder.decode(chunk, final=not chunk)
+            except UnicodeDecodeError as e:
+                raise JSONRecordError(file_path, byte_offset(len(buffer)) + e.start, e.reason) from e
+            at_eof = not chunk
+
+    def skip_whitespace(index):
+        while True:
+            index = JSON_WHITESPACE_RE.match(buffer, index).end()
+            if index < len(buffer) or at_eof:
+                return index
+            read_more()
+
+    def expect(index, chars, msg):
+        if index >= len(buffer) or buffer[index] not in chars:
+            raise JSONRecordError(file_path, byte_offset(index), msg)
+        return buffer[index]
+
+    read_more()
+    index = skip_whitespace(0)
+    expect(index, '[', 'Expecting a JSON array "["')
+    index = skip_whitespace(index + 1)
+    if index < len(buffer) and buffer[index] == ']':
+        end_char = ']'
+        index += 1
+    else:
+        end_char = ','
+
+    while end_char == ',':
+        index = skip_whitespace(index)
+        while True:
+            try:
+                (record, end) = decoder.raw_decode(buffer, index)
+            except json.JSONDecodeError as e:
+                if at_eof or not _json_error_is_truncated(e, len(buffer)):
+                    raise JSONRecordError(file_path, byte_offset(e.pos), e.msg) from e
+                read_more(max(len(buffer), 1))  # The record is not all read yet; double the buffer.
+                continue
+
+            # A number at the end of the buffer may go on in the next chunk.
+            if end < len(buffer) or at_eof:
+                break
+            read_more()
+
+        index = skip_whitespace(end)
+        end_char = expect(index, ',]', 'Expecting "," or "]" after a JSON array element')
+        index += 1
+        yield record
+
+        # Drop the parsed text, once there is a chunk of it.
+        parsed_offset = byte_offset(index)
+        parsed_index = index
+        if parsed_index >= chunk_size:
+            buffer = buffer[parsed_index:]
+            (index, parsed_index) = (0, 0)
+
+    index = skip_whitespace(index)
+    if index < len(buffer):
+        raise JSONRecordError(file_path, byte_offset(index), 'Extra data after the JSON array')
+
+
+def _read_data(file_path):
+    """ Read a data file as bytes. """
+
+    data = b''
+    with open(file_path, 'rb') as f:
+        data = f.read()
+    return data
+
+
+def _read_text(file_path):
+    """ Read a data file as str. """
+
+    data = ''
+    with open(file_path, 'r') as f:
+        data = f.read()
+    return data
+
+
+def _read_json(file_path):
+    """ Read a data file as JSON, or UNPARSEABLE_JSON_TOKEN when it is not JSON. """
+
+    data = {}
+    with open(file_path, 'rb') as f:
+        try:
+            data = json_codec.loads(f.read())
+        except json.JSONDecodeError as e:
+            data = UNPARSEABLE_JSON_TOKEN
+    return data
+
+
+class PayloadTemplate(object):
+    """ Payload Template.
+
+    A JSON document whose strings may hold "${name}" placeholders.
+    The document is compiled once: render() rebuilds only the strings
+    with placeholders and the dicts and lists that hold them;
+    the rest is copied as a whole.
+    """
+
+    def __init__(self, data, file_path=''):
+        """ Init PayloadTemplate.
+
+        :param data: a parsed JSON document
+        :param str file_path: the template's data file, for error messages
+        """
+
+        self.file_path = file_path
+        self.placeholders = set()
+        self._render = self._compile(data) or (lambda values: copy_json(data))
+
+    def _compile(self, value):
+        """ Compile a JSON value.
+
+        :returns: a function render(values), or None when the value has no placeholders
+        """
+
+        if isinstance(value, str):
+            parts = PLACEHOLDER_RE.split(value)
+            if len(parts) == 1:
+                return None
+            names = parts[1::2]
+            self.placeholders.update(names)
+            if parts[0] == parts[-1] == '' and len(names) == 1:
+                return lambda values: self._get_value(values, names[0])
+
+            def render_str(values):
+                rendered = list(parts)
+                rendered[1::2] = [self._get_value(values, name) for name in names]
+                return ''.join(rendered)
+            return render_str
+
+        elif isinstance(value, dict):
+            if any(PLACEHOLDER_RE.search(key) for key in value):
+                raise DataFileError('{}: placeholders are not allowed in JSON keys'.format(self.file_path))
+            items = [(key, self._compile(item), item) for (key, item) in value.items()]
+            if all(render_item is None for (key, render_item, item) in items):
+                return None
+            return lambda values: {
+                key: render_item(values) if render_item else copy_json(item)
+                for (key, render_item, item) in items
+            }
+
+        elif isinstance(value, list):
+            items = [(self._compile(item), item) for item in value]
+            if all(render_item is None for (render_item, item) in items):
+                return None
+            return lambda values: [
+                render_item(values) if render_item else copy_json(item)
+                for (render_item, item) in items
+            ]
+
+        return None
+
+    def _get_value(self, values, name):
+        try:
+            return values[name]
+        except KeyError:
+            raise DataFileError('{}: no value for placeholder "${{{}}}"'.format(self.file_path, name)) from None
+
+    def render(self, values):
+        """ Render the template.
+
+        :param dict values: a str value for each placeholder name
+        :raises DataFileError: when a placeholder has no value
+        :returns: a new JSON document, safe to change
+        """
+
+        return self._render(values)
+
+
+def _read_template(file_path):
+    """ Read a data file as a PayloadTemplate. """
+
+    return PayloadTemplate(_read_json(file_path), file_path)
+
+
+def _read_compressed(file_path, kind):
+    """ Read a compressed data file, decompressed as it is read.
+
+    :returns: (value, nbytes) the value and its decoded size
+    """
+
+    opener = COMPRESSED_FILE_OPENERS[os.path.splitext(file_path)[1]]
+    try:
+        if kind == 'text':
+            with opener(file_path, 'rt') as f:
+                data = f.read()
+            return (data, len(data.encode('utf-8')))  # Count bytes, not characters.
+
+        with opener(file_path, 'rb') as f:
+            data = f.read()
+    except (OSError, EOFError, lzma.LZMAError) as e:
+        raise DataFileError(file_path) from e
+
+    if kind in ('json', 'template'):
+        try:
+            value = json_codec.loads(data)
+        except json.JSONDecodeError:
+            value = UNPARSEABLE_JSON_TOKEN
+        if kind == 'template':
+            value = PayloadTemplate(value, file_path)
+        return (value, len(data))
+    return (data, len(data))
+
+
+# The readers for each kind of load in the data file cache.
+DATA_FILE_READERS = {
+    'bytes': _read_data,
+    'text': _read_text,
+    'json': _read_json,
+    'template': _read_template,
+}
+
+
+def resolve_data_file(file_path):
+    """ Resolve Data File.
+
+    :param str file_path: path to the data file
+    :returns: the path itself, or the first compressed file for it, when only that exists
+    """
+
+    if os.path.exists(file_path) or os.path.splitext(file_path)[1] in COMPRESSED_FILE_OPENERS:
+        return file_path
+
+    for suffix in COMPRESSED_FILE_OPENERS:
+        if os.path.exists(file_path + suffix):
+            return file_path + suffix
+    return file_path
+
+
+def load_data_file(file_path, kind):
+    """ Load Data File.
+
+    Load a data file, or its compressed file, through the data file cache.
+
+    :param str file_path: path to the data file
+    :param str kind: kind of load, "bytes", "text", "json" or "template"
+    :returns: the loaded value, shared with other callers
+    """
+
+    file_path = resolve_data_file(file_path)
+    if os.path.splitext(file_path)[1] in COMPRESSED_FILE_OPENERS:
+        return data_file_cache.load(file_path, kind, partial(_read_compressed, kind=kind), sized=True)
+    return data_file_cache.load(file_path, kind, DATA_FILE_READERS[kind])
+
+
+def get_examples_values(step):
+    """ Get Examples Values.
+
+    Find the current "Examples:" row of a running morelia Step,
+    the way morelia fills in the Step's "<name>" placeholders.
+
+    :param step: the morelia Step, the TestCase's `step` attribute
+    :returns: a dict {column title: cell value}, empty outside a Scenario Outline
+    """
+
+    values = {}
+    scenario = getattr(step, 'parent', None)
+    row_indices = getattr(scenario, 'row_indices', None) or []
+    for (x, row_index) in enumerate(row_indices):
+        table = scenario.steps[x].steps
+        header = next((row for row in table if hasattr(row, 'harvest')), None)
+        if header is not None and row_index + 1 < len(table):
+            values.update(zip(header.harvest(), table[row_index + 1].harvest()))
+    return values
+
+
+def get_data_files_dir(feature_file):
+    """ Get Data Files Directory.
+
+        feature_file:   'project/features/TC-T2.feature'
+        data_files_dir: 'project/features/data/TC-T2'
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: the Feature's data files directory
+    """
+
+    (root_dir, feature_filename) = os.path.split(feature_file)
+    feature_code = feature_filename.split('.')[0]
+    return os.path.join(root_dir, 'data', feature_code)
+
+
+def prefetch_data_files(data_files_dir, data_filenames, kind='bytes'):
+    """ Prefetch Data Files.
+
+    Load the data files into the data file cache on a background thread.
+    A file that cannot be read is skipped; its step reports the error.
+
+    :param str data_files_dir: the data directory
+    :param data_filenames: short filenames in the data directory
+    :param str kind: kind of load, e.g. "bytes", "text" or "json"
+    :returns: the started daemon thread
+    """
+
+    file_paths = [os.path.join(data_files_dir, data_filename) for data_filename in data_filenames]
+
+    def prefetch():
+        for file_path in file_paths:
+            try:
+                load_data_file(file_path, kind)
+            except Exception as e:
+                log.debug('Cannot prefetch data file "%s": %s', file_path, e)
+
+    thread = threading.Thread(target=prefetch, name='bdd-data-prefetch', daemon=True)
+    thread.start()
+    return thread
+
+
+_set_up_lock = threading.Lock()
+
+
 class BaseDataLoaderMixin:
     """ Base Data Loader Mixin.
 
@@ -22,6 +454,53 @@ class BaseDataLoaderMixin:
     The data filename is the "Examples:" data table cell.
     """
 
+    # Prefetch the Examples' data files at class setup, loaded as this kind.
+    PREFETCH_DATA_FILES = False
+    PREFETCH_KIND = 'bytes'
+
+    @classmethod
+    def setUpClass(cls):
+        super_set_up_class = getattr(super(BaseDataLoaderMixin, cls), 'setUpClass', None)
+        if super_set_up_class is not None:
+            super_set_up_class()
+        cls.set_up_data_files()
+
+    @classmethod
+    def set_up_data_files(cls, feature_file=None):
+        """ Set Up Data Files.
+
+        Build the data directory manifest, and start the prefetch when
+        PREFETCH_DATA_FILES is set, once per class and data directory.
+        The Feature runners call this before the first step, and the
+        mixin's setUpClass() when it runs and the class has a FEATURE_FILE.
+
+        :param str feature_file: A BDD Gherkin Feature file, default FEATURE_FILE
+        :returns: the prefetch thread, or None
+        """
+
+        feature_file = feature_file or getattr(cls, 'FEATURE_FILE', None)
+        if not feature_file:
+            return None
+
+        data_files_dir = get_data_files_dir(feature_file)
+        with _set_up_lock:
+            prefetch_threads = cls.__dict__.get('_data_prefetch_threads')
+            if prefetch_threads is None:
+                prefetch_threads = cls._data_prefetch_threads = {}
+            if data_files_dir in prefetch_threads:
+                return prefetch_threads[data_files_dir]
+            prefetch_threads[data_files_dir] = None
+
+        data_manifest = get_data_manifest(data_files_dir)
+        if cls.PREFETCH_DATA_FILES and len(data_manifest):
+            data_filenames = [cell for cell in get_examples_cells(feature_file)
+                              if any(cell + suffix in data_manifest
+                                     for suffix in ('',) + tuple(COMPRESSED_FILE_OPENERS))]
+            if data_filenames:
+                prefetch_threads[data_files_dir] = prefetch_data_files(data_files_dir, data_filenames,
+                                                                       cls.PREFETCH_KIND)
+        return prefetch_threads[data_files_dir]
+
     @property
     def data_files_dir(self):
         """ Data Files Directory.
@@ -34,12 +513,19 @@ class BaseDataLoaderMixin:
         """
 
         if not hasattr(self, '_data_files_dir'):
-            (root_dir, feature_file) = os.path.split(self.FEATURE_FILE)
-            feature_code = feature_file.split('.')[0]
-            self._data_files_dir = os.path.join(root_dir, 'data', feature_code)
+            self._data_files_dir = get_data_files_dir(self.FEATURE_FILE)
 
         return self._data_files_dir
 
+    @property
+    def data_manifest(self):
+        """ Data Manifest.
+
+        :returns: the DataFilesManifest of every file in the data_files_dir
+        """
+
+        return get_data_manifest(self.data_files_dir)
+
     def get_path(self, data_filename):
         """ Get Data File Path.
 
@@ -65,11 +551,57 @@ class BaseDataLoaderMixin:
         """
 
         file_path = self.get_path(data_filename)
+        return load_data_file(file_path, 'bytes')
 
-        data = b''
-        with open(file_path, 'rb') as f:
-            data = f.read()
-        return data
+    def map_data(self, data_filename):
+        """ Map Raw Data.
+
+        Memory-map the file in the data_files_dir, read-only.
+        Large files are never copied into memory; the memoryview
+        can be passed straight to an HTTP client as the request body.
+
+        The mapping is released when the test finishes, via addCleanup().
+        Outside a unittest.TestCase call release_data_maps().
+
+        :param str data_filename: short filename without directory
+        :raises DataFileError: when the file cannot be mapped
+        :returns: file data as a read-only memoryview
+        """
+
+        file_path = self.get_path(data_filename)
+
+        try:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    return memoryview(b'')  # mmap cannot map an empty file.
+                data_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError) as e:
+            raise DataFileError(file_path) from e
+
+        data_view = memoryview(data_map)
+        if not hasattr(self, '_data_maps'):
+            self._data_maps = []
+            if hasattr(self, 'addCleanup'):
+                self.addCleanup(self.release_data_maps)
+        self._data_maps.append((data_map, data_view))
+        return data_view
+
+    def release_data_maps(self):
+        """ Release Data Maps.
+
+        Release every memoryview from map_data() and close its mmap.
+        A mmap with slices of its memoryview still in use is left for
+        the garbage collector to close.
+        """
+
+        data_maps = getattr(self, '_data_maps', [])
+        while data_maps:
+            (data_map, data_view) = data_maps.pop()
+            data_view.release()
+            try:
+                data_map.close()
+            except BufferError:
+                pass
 
 # ================================================================
 
@@ -81,6 +613,8 @@ class TextDataLoaderMixin(BaseDataLoaderMixin):
     The data filename is the "Examples:" data table cell.
     """
 
+    PREFETCH_KIND = 'text'
+
     def load_text(self, data_filename):
         """ Load Data as Text.
 
@@ -91,11 +625,7 @@ class TextDataLoaderMixin(BaseDataLoaderMixin):
         """
 
         file_path = self.get_path(data_filename)
-
-        data = ''
-        with open(file_path, 'r') as f:
-            data = f.read()
-        return data
+        return load_data_file(file_path, 'text')
 
 
 class JSONDataLoaderMixin(BaseDataLoaderMixin):
@@ -105,28 +635,100 @@ class JSONDataLoaderMixin(BaseDataLoaderMixin):
     The data filename is the "Examples:" data table cell.
     """
 
+    PREFETCH_KIND = 'json'
+
+    # Fill payload template placeholders from the environment variables too.
+    TEMPLATE_ENVIRONMENT = False
+
     def load_json(self, data_filename):
         """ Load Data as JSON.
 
         Load JSON data from the file in the data_files_dir.
 
         :param str data_filename: short filename without directory
-        :returns: file data as JSON dict
+        :returns: file data as JSON dict, a new copy each time
         """
 
         file_path = self.get_path(data_filename)
 
-        data = {}
         try:
-            with open(file_path, 'rb') as f:
-                try:
-                    data = json.load(f)
-                except json.JSONDecodeError as e:
-                    data = UNPARSEABLE_JSON_TOKEN
+            data = load_data_file(file_path, 'json')
+        except OSError as e:
+            raise DataFileError(file_path) from e
+
+        return copy_json(data)
+
+    def get_template_values(self):
+        """ Get Template Values.
+
+        The values for payload template placeholders: the current
+        "Examples:" row's columns, over the environment variables when
+        TEMPLATE_ENVIRONMENT is set.
+
+        :returns: a dict {name: str value}
+        """
+
+        values = dict(os.environ) if self.TEMPLATE_ENVIRONMENT else {}
+        values.update(get_examples_values(getattr(self, 'step', None)))
+        return values
+
+    def load_json_template(self, data_filename, **values):
+        """ Load Data as a JSON Template.
+
+        Load the JSON data file in the data_files_dir and fill in its
+        "${name}" placeholders from get_template_values() and `values`.
+        The template is compiled once and cached; each call renders
+        a new copy.
+
+            {"order_id": "${order_id}", "user": "${BDD_USER}"}
+
+        :param str data_filename: short filename without directory
+        :param values: more placeholder values, overriding the others
+        :raises DataFileError: when a placeholder has no value
+        :returns: the rendered JSON data
+        """
+
+        file_path = self.get_path(data_filename)
+
+        try:
+            template = load_data_file(file_path, 'template')
         except OSError as e:
             raise DataFileError(file_path) from e
 
-        return data
+        if template.placeholders:
+            template_values = self.get_template_values()
+            template_values.update(values)
+            return template.render(template_values)
+        return template.render(values)
+
+    def iter_json_records(self, data_filename):
+        """ Iterate JSON Records.
+
+        Stream the records of a large JSON data file, with bounded memory.
+        The file holds either one top-level JSON array, whose elements
+        are the records, or NDJSON, one JSON record per line.
+        Records are parsed as they are read and never cached.
+        A compressed file's byte offsets are in the decompressed data.
+
+        :param str data_filename: short filename without directory
+        :raises JSONRecordError: when a record is corrupt, with its byte offset
+        :raises DataFileError: when the file cannot be read
+        :returns: an iterator of JSON records
+        """
+
+        file_path = resolve_data_file(self.get_path(data_filename))
+        opener = COMPRESSED_FILE_OPENERS.get(os.path.splitext(file_path)[1], open)
+
+        try:
+            with opener(file_path, 'rb') as f:
+                first_byte = f.read(JSON_RECORDS_CHUNK_SIZE).lstrip()[:1]
+                f.seek(0)
+                if first_byte == b'[':
+                    yield from _iter_json_array_records(f, file_path)
+                else:
+                    yield from _iter_ndjson_records(f, file_path)
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            raise DataFileError(file_path) from e
 
 
 if __name__ == '__main__':  # pragma: no cover
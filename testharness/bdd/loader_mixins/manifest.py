@@ -0,0 +1,112 @@
+""" BDD Feature Files: Data Directory Manifest
+
+A Feature's data files live in "features/data/<feature>/". The manifest
+lists every file in that directory, with its size and mtime, so the
+loaders can tell which "Examples:" cells name a data file without
+touching the disk in the middle of a Scenario.
+
+A manifest is built once per data directory and shared by every test
+in the process. Call rebuild() after adding data files at run time.
+
+morelia is imported only to read the Examples tables for a prefetch.
+"""
+
+import os
+import threading
+
+
+class DataFilesManifest(object):
+    """ Data Files Manifest.
+
+    An index of every file under a data directory, by its name relative
+    to the directory, e.g. "payloads/login.json".
+    """
+
+    def __init__(self, data_files_dir):
+        """ Init DataFilesManifest.
+
+        :param str data_files_dir: the data directory; it need not exist
+        """
+
+        self.data_files_dir = data_files_dir
+        self.files = {}
+        self.rebuild()
+
+    def rebuild(self):
+        """ Rebuild the manifest from the data directory. """
+
+        files = {}
+        pending_dirs = [self.data_files_dir]
+        while pending_dirs:
+            try:
+                entries = list(os.scandir(pending_dirs.pop()))
+            except OSError:
+                continue
+
+            for entry in entries:
+                if entry.is_dir():
+                    pending_dirs.append(entry.path)
+                elif entry.is_file():
+                    stat = entry.stat()
+                    data_filename = os.path.relpath(entry.path, self.data_files_dir)
+                    files[data_filename] = (stat.st_size, stat.st_mtime_ns)
+
+        self.files = files
+
+    def __contains__(self, data_filename):
+        return os.path.normpath(data_filename) in self.files
+
+    def __iter__(self):
+        return iter(sorted(self.files))
+
+    def __len__(self):
+        return len(self.files)
+
+    @property
+    def total_bytes(self):
+        return sum(size for (size, mtime_ns) in self.files.values())
+
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+
+def get_data_manifest(data_files_dir):
+    """ Get Data Manifest.
+
+    Build the data directory's manifest the first time it is asked for.
+
+    :param str data_files_dir: the data directory
+    :returns: its DataFilesManifest, shared by every caller
+    """
+
+    key = os.path.abspath(data_files_dir)
+    with _manifests_lock:
+        manifest = _manifests.get(key)
+        if manifest is None:
+            manifest = _manifests[key] = DataFilesManifest(data_files_dir)
+    return manifest
+
+
+def get_examples_cells(feature_file):
+    """ Get Examples Cells.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: every cell value of the Feature's "Examples:" tables, in order, once each
+    """
+
+    from morelia.grammar import Examples, Row
+    from testharness.bdd.runner.feature_cache import load_feature
+
+    cells = []
+    pending_nodes = [load_feature(feature_file)]
+    while pending_nodes:
+        node = pending_nodes.pop()
+        if isinstance(node, Examples):
+            for row in node.steps[1:]:  # Skip the header row.
+                if isinstance(row, Row):
+                    cells.extend(row.harvest())
+        else:
+            pending_nodes.extend(reversed(node.steps))
+
+    return list(dict.fromkeys(cells))
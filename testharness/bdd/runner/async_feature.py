@@ -0,0 +1,490 @@
+""" BDD Test Harness Runner: Async Feature
+
+Run a Gherkin Feature file's rows as coroutines on one asyncio event loop.
+
+The async step mixins' request steps are coroutines, see
+steps_mixins.async_rest_api_common. This run() awaits them, so every
+row of a Scenario Outline can wait on the network at the same time
+without a thread per row. Plain steps are called as before.
+
+    class FeatureTestCase(unittest.TestCase, AsyncHttpGetRestApiBDDStepsMixin):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+
+        def qa_scenario_TC_T1(self):
+            async_feature.run(self.FEATURE_FILE, self, concurrency=20)
+
+As with concurrent rows, each row runs on its own shallow copy of the
+TestCase, set up with setUp() and torn down with tearDown(), its step
+output is written in row order, and every row's failure is reported
+together in one test outcome.
+
+AsyncFeatureRunner runs many Feature tests at once, on one event loop
+with one limit on the rows in flight. It is a unittest.TextTestRunner;
+its results are ordinary unittest outcomes, and it can write them as
+an XUnit XML report in nose's format for the TM4J reporter:
+
+    unittest.main(module=None, testRunner=AsyncFeatureRunner(concurrency=20, xunit_file='nosetests.xml'))
+
+Only TestCases with a FEATURE_FILE run at the same time, each in a
+worker thread that waits on the shared loop; other tests run one by one.
+"""
+
+import asyncio
+import copy
+import inspect
+import os
+import sys
+import threading
+import time
+import traceback
+import unittest
+
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree
+
+from morelia import has_color_support
+from morelia.exceptions import MissingStepError
+from morelia.formatters import ColorTextFormatter, PlainTextFormatter
+from morelia.grammar import Step
+from morelia.visitors import IVisitor
+
+from testharness.bdd.http.async_client import close_async_connection_pools
+from testharness.bdd.runner.concurrent_rows import RowBufferFormatter, raise_row_failures
+from testharness.bdd.runner.examples_files import load_examples_files
+from testharness.bdd.runner.feature import (
+    STEP_MATCHERS,
+    RowTestVisitor,
+    get_feature_rows,
+    report_missing_steps,
+    set_up_data_files
+)
+from testharness.bdd.runner.feature_cache import load_feature
+from testharness.bdd.runner.step_timings import (
+    STEP_TIMINGS_ENV,
+    StepTimingFormatter,
+    get_test_key,
+    write_step_timings
+)
+
+DEFAULT_CONCURRENCY = 10
+
+# The AsyncFeatureRunner suite now running, whose loop run() uses.
+_active_suite = None
+
+
+class RowNodesVisitor(IVisitor):
+    """ Row Nodes Visitor.
+
+    Collect the nodes one row of the Feature visits, in order.
+    """
+
+    def __init__(self, row):
+        self.nodes = []
+        self._row = row
+        self._first_row = 0
+
+    permute_schedule = RowTestVisitor.permute_schedule
+
+    def visit(self, node):
+        self.nodes.append(node)
+
+    def after_visit(self, node):
+        pass
+
+
+async def _run_step(node, matcher):
+    """ Run one step method, and await it when it is a coroutine. """
+
+    (method, args, kwargs) = node.find_step(matcher)
+    spec = inspect.getfullargspec(method)
+    arglist = spec.args + spec.kwonlyargs
+    if '_labels' in arglist:
+        kwargs['_labels'] = node.get_labels()
+    if '_text' in arglist:
+        kwargs['_text'] = node.payload
+
+    result = method(*args, **kwargs)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _run_row_steps(filename, row_suite, row, matchers, formatter):
+    """ Run the steps of one row of the Feature.
+
+    :raises AssertionError: the TestCase's failureException when a step failed
+    """
+
+    ast = load_examples_files(load_feature(filename), filename)
+    visitor = RowNodesVisitor(row)
+    ast.steps[0].accept(visitor)
+    matcher = ast._create_matchers_chain(row_suite, matchers)
+
+    failure = None
+    for node in visitor.nodes:
+        line = node.get_real_reconstruction()
+        if not isinstance(node, Step):
+            formatter.output(node, line, '', 0)
+            continue
+        if failure is not None:
+            continue  # Skip the steps after a failed step, as morelia does.
+
+        row_suite.step = node
+        start = time.perf_counter()
+        status = 'pass'
+        try:
+            await _run_step(node, matcher)
+        except (MissingStepError, AssertionError) as e:
+            status = 'fail'
+            failure = e
+            step_line = node.parent.get_real_reconstruction() + line
+        except Exception as e:
+            status = 'error'
+            if e.args:
+                e.args = (node.format_fault(e.args[0]),) + e.args[1:]
+            raise
+        finally:
+            formatter.output(node, line, status, time.perf_counter() - start)
+
+    if failure is not None:
+        msg = '{}\n{}'.format(step_line, ''.join(traceback.format_exception_only(type(failure), failure)))
+        raise row_suite.failureException(msg.rstrip()) from failure
+
+
+async def _run_one_row(filename, suite, row, matchers, formatter, semaphore):
+    """ Run one row on its own copy of the TestCase.
+
+    :returns: None when the row passed, or the exception it raised
+    """
+
+    async with semaphore:
+        row_suite = copy.copy(suite)
+        try:
+            row_suite.setUp()
+            try:
+                await _run_row_steps(filename, row_suite, row, matchers, formatter)
+            finally:
+                row_suite.tearDown()
+        except Exception as e:
+            return e
+    return None
+
+
+async def run_async(filename, suite, verbose=False, show_all_missing=True, row=None,
+                    concurrency=None, step_timings=None, formatter=None, matchers=STEP_MATCHERS):
+    """ Run a Feature file on the running event loop.
+
+    :param str filename: A BDD Gherkin Feature file
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    :param bool verbose: be verbose
+    :param bool show_all_missing: show all missing steps
+    :param int row: run only this row of the Feature, default all rows
+    :param int concurrency: run this many rows at the same time, default ROW_CONCURRENCY or 10;
+        under AsyncFeatureRunner, its concurrency applies instead
+    :param str step_timings: append step timings to this file, default $BDD_STEP_TIMINGS
+    :param formatter: morelia formatter for the step output
+    :param matchers: list of morelia step matcher classes
+    :raises IndexError: when the Feature has no such row
+    :raises AssertionError: the TestCase's failureException when any row failed
+    :raises ConcurrentRowsError: when any row raised an error
+    """
+
+    if verbose and formatter is None:
+        formatter = ColorTextFormatter() if has_color_support() else PlainTextFormatter()
+    if step_timings is None:
+        step_timings = os.environ.get(STEP_TIMINGS_ENV)
+    timing_formatter = None
+    if step_timings:
+        formatter = timing_formatter = StepTimingFormatter(formatter, first_row=row or 0)
+
+    set_up_data_files(filename, suite)
+    ast = load_examples_files(load_feature(filename), filename)
+    row_count = len(get_feature_rows(ast))
+    if row is None:
+        rows = range(row_count)
+    elif 0 <= row < row_count:
+        rows = [row]
+    else:
+        raise IndexError('Feature "{}" has no row {}, only {}'.format(filename, row, row_count))
+
+    if show_all_missing:
+        report_missing_steps(ast, suite, matchers)
+
+    if _active_suite is not None and _active_suite.loop is asyncio.get_running_loop():
+        semaphore = _active_suite.semaphore
+    else:
+        semaphore = asyncio.Semaphore(concurrency or getattr(suite, 'ROW_CONCURRENCY', None) or DEFAULT_CONCURRENCY)
+
+    buffers = [RowBufferFormatter() for x in rows]
+    start = time.perf_counter()
+    try:
+        row_exceptions = await asyncio.gather(*(
+            _run_one_row(filename, suite, x, matchers, buffer, semaphore)
+            for (x, buffer) in zip(rows, buffers)))
+
+        if formatter is not None:
+            for buffer in buffers:
+                buffer.replay(formatter)
+    finally:
+        if timing_formatter is not None:
+            write_step_timings(step_timings, suite, timing_formatter.rows, time.perf_counter() - start)
+
+    if row is not None and row_exceptions[0] is not None:
+        raise row_exceptions[0]
+    raise_row_failures(suite, row_exceptions)
+
+
+async def _run_and_close_pools(coroutine):
+    try:
+        return await coroutine
+    finally:
+        close_async_connection_pools()
+
+
+def run(filename, suite, **kwargs):
+    """ Run a Feature file.
+
+    Run the Feature's rows on the AsyncFeatureRunner's event loop,
+    or else on a new event loop. This takes the same arguments as run_async().
+    """
+
+    coroutine = run_async(filename, suite, **kwargs)
+    active_suite = _active_suite
+    if active_suite is not None and threading.current_thread() is not active_suite.loop_thread:
+        return asyncio.run_coroutine_threadsafe(coroutine, active_suite.loop).result()
+    return asyncio.run(_run_and_close_pools(coroutine))
+
+
+def _recorder(outcome):
+    """ A TestResult method that records the outcome to replay later. """
+
+    def add_outcome(self, *args):
+        self.outcomes.append((outcome, args))
+    return add_outcome
+
+
+class TestOutcomeRecorder(unittest.TestResult):
+    """ Test Outcome Recorder.
+
+    Record one test's outcomes in a worker thread, to replay them to
+    the real TestResult in test order.
+    """
+
+    def __init__(self, test):
+        super(TestOutcomeRecorder, self).__init__()
+        self.test = test
+        self.outcomes = []
+        self.time = 0.0
+        self._start = None
+
+    def startTest(self, test):
+        self._start = time.perf_counter()
+
+    def stopTest(self, test):
+        self.time += time.perf_counter() - self._start
+
+    addSuccess = _recorder('addSuccess')
+    addFailure = _recorder('addFailure')
+    addError = _recorder('addError')
+    addSkip = _recorder('addSkip')
+    addExpectedFailure = _recorder('addExpectedFailure')
+    addUnexpectedSuccess = _recorder('addUnexpectedSuccess')
+    addSubTest = _recorder('addSubTest')
+
+    def replay(self, result):
+        """ Replay the recorded outcomes to a TestResult. """
+
+        result.startTest(self.test)
+        for (outcome, args) in self.outcomes:
+            getattr(result, outcome)(*args)
+        result.stopTest(self.test)
+
+
+def _iter_tests(test):
+    """ Flatten a unittest suite into its TestCases, in order. """
+
+    if isinstance(test, unittest.TestCase):
+        yield test
+    else:
+        for child in test:
+            yield from _iter_tests(child)
+
+
+class AsyncFeatureSuite(object):
+    """ Async Feature Suite.
+
+    Run the Feature tests of a unittest suite at the same time,
+    with one event loop shared by every Feature's rows.
+    """
+
+    def __init__(self, test, concurrency=DEFAULT_CONCURRENCY):
+        """ Init AsyncFeatureSuite.
+
+        :param test: a unittest TestSuite or TestCase
+        :param int concurrency: the most Feature tests, and rows, to run at the same time
+        """
+
+        self.tests = list(_iter_tests(test))
+        self.concurrency = concurrency
+        self.records = []
+        self.loop = None
+        self.loop_thread = None
+        self.semaphore = None
+
+    def countTestCases(self):
+        return len(self.tests)
+
+    def __call__(self, result):
+        return self.run(result)
+
+    def run(self, result):
+        """ Run every test, then report them to the TestResult in order. """
+
+        global _active_suite
+
+        classes = list(dict.fromkeys(type(test) for test in self.tests))
+        class_errors = {cls: self._set_up_class(cls) for cls in classes}
+
+        self.loop = asyncio.new_event_loop()
+        self.loop_thread = threading.Thread(target=self.loop.run_forever, name='AsyncFeatureLoop', daemon=True)
+        self.loop_thread.start()
+        self.semaphore = asyncio.run_coroutine_threadsafe(self._new_semaphore(), self.loop).result()
+        _active_suite = self
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+                runs = []
+                for test in self.tests:
+                    if class_errors[type(test)] is not None or not getattr(test, 'FEATURE_FILE', None):
+                        runs.append(None)
+                    else:
+                        runs.append(executor.submit(self._run_test, test))
+
+                for (test, future) in zip(self.tests, runs):
+                    class_error = class_errors[type(test)]
+                    if class_error is not None:
+                        record = TestOutcomeRecorder(test)
+                        record.outcomes.append(('addError', (test, class_error)))
+                    elif future is None:
+                        record = self._run_test(test)
+                    else:
+                        record = future.result()
+                    self.records.append(record)
+                    record.replay(result)
+        finally:
+            _active_suite = None
+            asyncio.run_coroutine_threadsafe(self._close_pools(), self.loop).result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.loop_thread.join()
+            self.loop.close()
+
+            for cls in reversed(classes):
+                if class_errors[cls] is None:
+                    self._tear_down_class(cls, result)
+
+        return result
+
+    async def _new_semaphore(self):
+        return asyncio.Semaphore(self.concurrency)
+
+    async def _close_pools(self):
+        close_async_connection_pools()
+
+    @staticmethod
+    def _run_test(test):
+        record = TestOutcomeRecorder(test)
+        test(record)
+        return record
+
+    @staticmethod
+    def _set_up_class(cls):
+        """ Set up a TestCase class.
+
+        :returns: None, or the exc_info when setUpClass() raised
+        """
+
+        if getattr(cls, '__unittest_skip__', False):
+            return None
+        try:
+            cls.setUpClass()
+        except Exception:
+            return sys.exc_info()
+        return None
+
+    @staticmethod
+    def _tear_down_class(cls, result):
+        if getattr(cls, '__unittest_skip__', False):
+            return
+        try:
+            cls.tearDownClass()
+        except Exception:
+            error = unittest.suite._ErrorHolder('tearDownClass ({}.{})'.format(cls.__module__, cls.__qualname__))
+            result.addError(error, sys.exc_info())
+
+
+def write_xunit(xunit_file, records, suite_name='nosetests'):
+    """ Write XUnit.
+
+    Write the tests' outcomes as an XUnit XML report, as nose's --with-xunit does.
+
+    :param str xunit_file: path to the XUnit XML file
+    :param list records: the TestOutcomeRecorder of each test, in order
+    :param str suite_name: the testsuite name
+    """
+
+    counts = {'errors': 0, 'failures': 0, 'skip': 0}
+    testsuite = ElementTree.Element('testsuite', name=suite_name, tests=str(len(records)))
+    for record in records:
+        (classname, name) = get_test_key(record.test)
+        testcase = ElementTree.SubElement(testsuite, 'testcase', classname=classname, name=name,
+                                          time='{:.3f}'.format(record.time))
+
+        for (outcome, args) in record.outcomes:
+            if outcome in ('addFailure', 'addError'):
+                err = args[1]
+            elif outcome == 'addSubTest' and args[2] is not None:
+                err = args[2]
+                outcome = 'addFailure' if issubclass(err[0], record.test.failureException) else 'addError'
+            elif outcome == 'addSkip':
+                counts['skip'] += 1
+                ElementTree.SubElement(testcase, 'skipped', type='unittest.case.SkipTest', message=args[1])
+                break
+            else:
+                continue
+
+            (tag, count) = ('failure', 'failures') if outcome == 'addFailure' else ('error', 'errors')
+            counts[count] += 1
+            element = ElementTree.SubElement(testcase, tag, type=err[0].__name__, message=str(err[1]))
+            element.text = record._exc_info_to_string(err, record.test)
+            break
+
+    for (count, value) in counts.items():
+        testsuite.set(count, str(value))
+    ElementTree.ElementTree(testsuite).write(xunit_file, encoding='UTF-8', xml_declaration=True)
+
+
+class AsyncFeatureRunner(unittest.TextTestRunner):
+    """ Async Feature Runner.
+
+    A unittest.TextTestRunner that runs Feature tests at the same time
+    on one event loop, and can write an XUnit XML report.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY, xunit_file=None, **kwargs):
+        """ Init AsyncFeatureRunner.
+
+        :param int concurrency: the most Feature tests, and rows, to run at the same time
+        :param str xunit_file: write an XUnit XML report to this file
+        :param kwargs: unittest.TextTestRunner arguments, e.g. verbosity
+        """
+
+        super(AsyncFeatureRunner, self).__init__(**kwargs)
+        self.concurrency = concurrency
+        self.xunit_file = xunit_file
+
+    def run(self, test):
+        suite = AsyncFeatureSuite(test, self.concurrency)
+        result = super(AsyncFeatureRunner, self).run(suite)
+        if self.xunit_file:
+            write_xunit(self.xunit_file, suite.records)
+        return result
@@ -0,0 +1,128 @@
+""" BDD Test Harness Runner: Concurrent Rows
+
+Run the Examples rows of a Feature in a pool of threads.
+
+QA-stage Scenario Outlines spend nearly all their time waiting on HTTP.
+The rows are independent, so they can wait at the same time.
+
+The step mixins keep their state on the TestCase, e.g. self.response.
+Each row runs on its own shallow copy of the TestCase, set up with
+setUp() and torn down with tearDown() as morelia does between rows.
+Each row also parses its own Feature syntax tree, because morelia
+stores the current row in it.
+
+The step output of each row is held back and written in row order,
+and every row's failure is reported together in one test outcome.
+"""
+
+import copy
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
+
+from morelia.formatters import IFormatter
+
+ROW_SEPARATOR = '-' * 66
+
+
+class ConcurrentRowsError(Exception):
+    """ BDD Concurrent Rows Error.
+
+    One or more rows raised an error, not just an assertion failure.
+    The first error is chained as the __cause__.
+    """
+    pass
+
+
+class RowBufferFormatter(IFormatter):
+    """ Row Buffer Formatter.
+
+    Hold back a row's morelia formatter output until replay().
+    """
+
+    def __init__(self):
+        self.outputs = []
+
+    def output(self, node, line, status, duration):
+        self.outputs.append((node, line, status, duration))
+
+    def replay(self, formatter):
+        """ Replay the held back output to the real formatter. """
+
+        for (node, line, status, duration) in self.outputs:
+            formatter.output(node, line, status, duration)
+
+
+def _run_one_row(run_row, suite, row, formatter):
+    """ Run one row on its own copy of the TestCase.
+
+    :returns: None when the row passed, or the exception it raised
+    """
+
+    row_suite = copy.copy(suite)
+    try:
+        row_suite.setUp()
+        run_row(row_suite, row, formatter)
+    except Exception as e:
+        return e
+    return None
+
+
+def _format_row_exception(row, exc):
+    """ Format one row's failure or error, indented under its row number. """
+
+    if isinstance(exc, AssertionError):
+        detail = str(exc)
+    else:
+        detail = ''.join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+    return '\n{}\nrow {}: {}'.format(ROW_SEPARATOR, row, detail.rstrip()).replace('\n', '\n    ')
+
+
+def run_rows(run_row, suite, row_count, concurrency, formatter=None):
+    """ Run Rows.
+
+    Run every row in a thread pool, then report all of them at once.
+
+    :param run_row: function run_row(row_suite, row, formatter) that runs one row
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    :param int row_count: number of rows in the Feature
+    :param int concurrency: number of rows to run at the same time
+    :param formatter: morelia formatter for the step output, or None
+    :raises AssertionError: the TestCase's failureException when any row failed
+    :raises ConcurrentRowsError: when any row raised an error
+    """
+
+    buffers = [RowBufferFormatter() for row in range(row_count)]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        row_exceptions = list(executor.map(_run_one_row, [run_row] * row_count,
+                                           [suite] * row_count, range(row_count), buffers))
+
+    if formatter is not None:
+        for buffer in buffers:
+            buffer.replay(formatter)
+
+    raise_row_failures(suite, row_exceptions)
+
+
+def raise_row_failures(suite, row_exceptions):
+    """ Raise Row Failures.
+
+    Report every row's failure together in one exception.
+
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    :param list row_exceptions: each row's exception, or None when it passed
+    :raises AssertionError: the TestCase's failureException when any row failed
+    :raises ConcurrentRowsError: when any row raised an error
+    """
+
+    failed_rows = [(row, exc) for row, exc in enumerate(row_exceptions) if exc is not None]
+    if not failed_rows:
+        return
+
+    msg = '{} of {} rows failed'.format(len(failed_rows), len(row_exceptions))
+    msg += ''.join(_format_row_exception(row, exc) for (row, exc) in failed_rows)
+
+    errors = [exc for (row, exc) in failed_rows if not isinstance(exc, AssertionError)]
+    if errors:
+        raise ConcurrentRowsError(msg) from errors[0]
+    raise suite.failureException(msg)
@@ -0,0 +1,178 @@
+""" BDD Test Harness Runner: Step Dispatch Index
+
+Morelia matches every step line against every "def step_*()" docstring
+regex on the TestCase, and it repeats that scan for each Examples row.
+It also calls dir() and re-compiles each docstring for every step line.
+
+The step dispatch index is built once per TestCase class and reused by
+every row and test method. Each docstring regex is compiled once, and it
+is filed under the literal first word it must start with, e.g. "User"
+for r'User GETs endpoint (.+)'. A step line only tries the regexes for
+its own first word, plus those with no literal first word.
+
+The candidates are tried in morelia's own order, so the same method wins.
+"""
+
+import re
+import threading
+import weakref
+
+from morelia.matchers import RegexpStepMatcher
+
+STEP_METHOD_PATTERN = '^step_'
+
+# Regex characters that end a docstring's literal prefix.
+REGEX_SPECIAL_CHARS = frozenset('.^$*+?{}[]\\|()')
+REGEX_QUANTIFIER_CHARS = frozenset('*+?{')
+
+_dispatch_indexes = weakref.WeakKeyDictionary()
+_dispatch_indexes_lock = threading.Lock()
+
+
+def get_literal_first_word(docstring):
+    """ Get Literal First Word.
+
+    Find the first word every match of the docstring regex must start with.
+    Any alternation, or a regex character inside the first word, means
+    there is no literal first word.
+
+    :param str docstring: a step docstring regex
+    :returns: the first word, or None
+    """
+
+    if '|' in docstring:
+        return None
+
+    end = 0
+    while end < len(docstring) and docstring[end] not in REGEX_SPECIAL_CHARS:
+        end += 1
+
+    prefix = docstring[:end]
+    if end < len(docstring) and docstring[end] in REGEX_QUANTIFIER_CHARS:
+        prefix = prefix[:-1]  # The quantifier makes the last character optional.
+
+    if ' ' not in prefix:
+        return None
+    return prefix.split(' ', 1)[0]
+
+
+class StepDispatchIndex(object):
+    """ Step Dispatch Index.
+
+    Index the regex docstrings of the "def step_*()" methods on one TestCase class.
+    """
+
+    def __init__(self, suite_class, step_pattern=STEP_METHOD_PATTERN):
+        """ Init StepDispatchIndex.
+
+        :param suite_class: a unittest.TestCase class with step methods
+        :param str step_pattern: regex to select the step method names
+        """
+
+        step_re = re.compile(step_pattern)
+        self._buckets = {}
+        self._any_word = []
+        self._candidates = {}
+        self._lock = threading.Lock()
+
+        for order, method_name in enumerate(sorted(name for name in dir(suite_class) if step_re.match(name))):
+            docstring = getattr(getattr(suite_class, method_name), '__doc__', None)
+            if not docstring:
+                continue
+            try:
+                regex = re.compile('^' + docstring + '$')
+            except re.error:
+                continue  # Not a regex; leave it to the format-like string matcher.
+
+            entry = (order, method_name, regex)
+            first_word = get_literal_first_word(docstring)
+            if first_word is None:
+                self._any_word.append(entry)
+            else:
+                self._buckets.setdefault(first_word, []).append(entry)
+
+    def candidates(self, predicate):
+        """ Candidates.
+
+        :param str predicate: the step line, with any Examples values filled in
+        :returns: list of (order, method name, regex) in morelia's order
+        """
+
+        first_word = predicate.split(' ', 1)[0]
+        try:
+            return self._candidates[first_word]
+        except KeyError:
+            pass
+
+        candidates = sorted(self._buckets.get(first_word, []) + self._any_word)
+        with self._lock:
+            self._candidates[first_word] = candidates
+        return candidates
+
+    def match(self, predicate):
+        """ Match a step line to its step method.
+
+        :param str predicate: the step line, with any Examples values filled in
+        :returns: (method name, args, kwargs), or (None, (), {})
+        """
+
+        for (order, method_name, regex) in self.candidates(predicate):
+            m = regex.match(predicate)
+            if m:
+                kwargs = m.groupdict()
+                args = () if kwargs else m.groups()
+                return (method_name, args, kwargs)
+        return (None, (), {})
+
+
+def get_dispatch_index(suite_class):
+    """ Get Dispatch Index.
+
+    Build the step dispatch index once per TestCase class, then reuse it.
+
+    :param suite_class: a unittest.TestCase class with step methods
+    :returns: the class's StepDispatchIndex
+    """
+
+    try:
+        return _dispatch_indexes[suite_class]
+    except KeyError:
+        pass
+
+    with _dispatch_indexes_lock:
+        if suite_class not in _dispatch_indexes:
+            _dispatch_indexes[suite_class] = StepDispatchIndex(suite_class)
+        return _dispatch_indexes[suite_class]
+
+
+class IndexedRegexpStepMatcher(RegexpStepMatcher):
+    """ Indexed Regexp Step Matcher.
+
+    A morelia step matcher that finds the regex docstring step method
+    through the class's step dispatch index.
+    """
+
+    def __init__(self, suite, step_pattern=STEP_METHOD_PATTERN):
+        super(IndexedRegexpStepMatcher, self).__init__(suite, step_pattern)
+        if step_pattern == STEP_METHOD_PATTERN:
+            self._index = get_dispatch_index(type(suite))
+        else:
+            self._index = StepDispatchIndex(type(suite), step_pattern)
+
+    def find(self, predicate, augmented_predicate, step_methods=None):
+        """ Find the step method, asking the next matcher only on a miss. """
+
+        method, args, kwargs = self.match(predicate, augmented_predicate, step_methods)
+        if method:
+            return method, args, kwargs
+        if self._next is not None:
+            return self._next.find(predicate, augmented_predicate, step_methods)
+        return None, (), {}
+
+    def match(self, predicate, augmented_predicate, step_methods):
+        """ Match the step line through the index; `step_methods` is not needed. """
+
+        (method_name, args, kwargs) = self._index.match(augmented_predicate)
+        if method_name is None:
+            return None, (), {}
+        return getattr(self._suite, method_name), args, kwargs
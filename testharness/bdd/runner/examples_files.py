@@ -0,0 +1,265 @@
+""" BDD Test Harness Runner: Examples Files
+
+A Scenario Outline may keep its Examples table in a CSV file in its data
+directory, "features/data/<feature>/", instead of inline. The Examples
+table names the file in an "examples_file" column:
+
+    Scenario Outline: Order lookup
+        When User GETs endpoint /orders/<order_id>
+        Then the response code is <status_code>
+
+        Examples:
+            | examples_file |
+            | orders.csv    |
+
+The CSV file's first line holds the column titles, e.g. "order_id,status_code".
+Its rows run through the same step methods as an inline table's rows.
+A compressed "orders.csv.gz", ".xz" or ".bz2" is found as the data loaders do.
+
+The CSV file is read when the rows are first counted, into a compact
+column-oriented ExamplesTable: each distinct cell value is stored once,
+and each column holds only 4-byte value codes. The parsed table is kept
+in the data file cache. No morelia Row node is kept per CSV row; the
+row being run is built when it is needed, so a 10k-row outline costs
+about as much memory as a 10-row one.
+"""
+
+import csv
+import os
+
+from array import array
+
+from morelia.grammar import Examples, Row
+
+from testharness.bdd.loader_mixins.cache import data_file_cache
+from testharness.bdd.loader_mixins.common import (
+    COMPRESSED_FILE_OPENERS,
+    DataFileError,
+    get_data_files_dir,
+    resolve_data_file
+)
+
+EXAMPLES_FILE_TITLE = 'examples_file'
+
+
+class ExamplesTable(object):
+    """ Examples Table.
+
+    A column-oriented table of str cells. Each distinct value is stored
+    once; each column is an array of codes into the values.
+    """
+
+    def __init__(self, titles):
+        """ Init ExamplesTable.
+
+        :param list titles: the column titles
+        """
+
+        self.titles = list(titles)
+        self.values = []
+        self._codes = {}
+        self._columns = [array('I') for title in self.titles]
+
+    def append(self, row):
+        """ Append a row; it must have one cell per column. """
+
+        for (column, value) in zip(self._columns, row):
+            code = self._codes.get(value)
+            if code is None:
+                code = self._codes[value] = len(self.values)
+                self.values.append(value)
+            column.append(code)
+
+    def freeze(self):
+        """ Drop the value index once every row is appended. """
+
+        self._codes = {}
+
+    def __len__(self):
+        return len(self._columns[0]) if self._columns else 0
+
+    def row(self, index):
+        """ Get a row.
+
+        :param int index: row number from 0
+        :returns: the row's cells as a list of str
+        """
+
+        return [self.values[column[index]] for column in self._columns]
+
+    def column(self, title):
+        """ Get a column.
+
+        :param str title: the column title
+        :returns: an iterator of the column's cells
+        """
+
+        values = self.values
+        return (values[code] for code in self._columns[self.titles.index(title)])
+
+    @property
+    def nbytes(self):
+        """ About how many bytes the table holds. """
+
+        return sum(column.itemsize * len(column) for column in self._columns) + \
+            sum(len(value) for value in self.values) + 64 * len(self.values)
+
+
+def read_examples_csv(file_path):
+    """ Read an Examples CSV file.
+
+    :param str file_path: path to the CSV file, maybe compressed
+    :raises DataFileError: when the file cannot be read or a row has the wrong number of cells
+    :returns: (ExamplesTable, nbytes) for the data file cache
+    """
+
+    opener = COMPRESSED_FILE_OPENERS.get(os.path.splitext(file_path)[1], open)
+    try:
+        with opener(file_path, 'rt', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            table = ExamplesTable(next(reader, []))
+            if not table.titles:
+                raise DataFileError('{}: no column titles'.format(file_path))
+            for row in reader:
+                if not row:
+                    continue  # Skip blank lines.
+                if len(row) != len(table.titles):
+                    raise DataFileError('{}: line {}: {} cells, expected {}'.format(
+                        file_path, reader.line_num, len(row), len(table.titles)))
+                table.append(row)
+    except DataFileError:
+        raise
+    except (OSError, EOFError, ValueError, csv.Error) as e:
+        raise DataFileError(file_path) from e
+
+    table.freeze()
+    return (table, table.nbytes)
+
+
+class ExamplesFileRow(Row):
+    """ Examples File Row.
+
+    A morelia Row whose cells come from an ExamplesTable.
+    """
+
+    def __init__(self, cells, parent):
+        super(ExamplesFileRow, self).__init__('|', ' | '.join(cells) + ' |', [])
+        self.cells = cells
+        self.parent = parent
+        self.line_number = getattr(parent, 'line_number', 0)
+        self._labels = []
+
+    def harvest(self):
+        return list(self.cells)
+
+
+class ExamplesFileRows(object):
+    """ Examples File Rows.
+
+    The `steps` of an ExamplesFile node: the header Row, then one Row
+    per table row, each built when it is indexed.
+    """
+
+    def __init__(self, examples):
+        self._examples = examples
+        self._last_row = (None, None)  # (index, Row): morelia reads the current row once per step.
+
+    def __len__(self):
+        return len(self._examples.table) + 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        if index == 0:
+            return self._examples.header
+        (last_index, row) = self._last_row
+        if last_index != index:
+            row = ExamplesFileRow(self._examples.table.row(index - 1), self._examples)
+            self._last_row = (index, row)
+        return row
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class ExamplesFile(Examples):
+    """ Examples File.
+
+    A morelia Examples node whose rows are read from a CSV file.
+    It visits only its header and the row being run, not every row.
+    """
+
+    def __init__(self, examples, file_path):
+        """ Init ExamplesFile.
+
+        :param examples: the morelia Examples node that names the CSV file
+        :param str file_path: path to the CSV file
+        """
+
+        super(ExamplesFile, self).__init__(examples.keyword, examples.predicate, [])
+        self.__dict__.update({key: value for (key, value) in examples.__dict__.items() if key != 'steps'})
+        self.file_path = file_path
+        self._table = None
+        self._header = None
+        self.steps = ExamplesFileRows(self)
+
+    @property
+    def table(self):
+        """ The ExamplesTable, read from the CSV file on first use. """
+
+        if self._table is None:
+            self._table = data_file_cache.load(self.file_path, 'examples', read_examples_csv, sized=True)
+        return self._table
+
+    @property
+    def header(self):
+        if self._header is None:
+            self._header = ExamplesFileRow(self.table.titles, self)
+        return self._header
+
+    def count_dimensions(self):
+        return len(self.table)
+
+    def accept(self, visitor):
+        try:
+            visitor.visit(self)
+            self.header.accept(visitor)
+            row_indices = getattr(self.parent, 'row_indices', None)
+            if row_indices:
+                self.steps[row_indices[self.parent.steps.index(self)] + 1].accept(visitor)
+        finally:
+            visitor.after_visit(self)
+
+
+def load_examples_files(ast, feature_file):
+    """ Load Examples Files.
+
+    Replace every Examples table that names an "examples_file" with
+    an ExamplesFile node for the CSV file in the Feature's data directory.
+
+    :param ast: morelia AST for a Feature; it is changed in place
+    :param str feature_file: the Feature file, to find its data directory
+    :raises DataFileError: when an "examples_file" table does not name one file
+    :returns: the AST
+    """
+
+    data_files_dir = get_data_files_dir(feature_file)
+    for scenario in ast.steps[0].steps:
+        for (x, node) in enumerate(getattr(scenario, 'steps', [])):
+            if not isinstance(node, Examples) or isinstance(node, ExamplesFile):
+                continue
+
+            rows = [row for row in node.steps if isinstance(row, Row)]
+            if not rows or rows[0].harvest() != [EXAMPLES_FILE_TITLE]:
+                continue
+            if len(rows) != 2:
+                raise DataFileError('{}: an "{}" Examples table names one file, not {}'.format(
+                    feature_file, EXAMPLES_FILE_TITLE, len(rows) - 1))
+
+            file_path = resolve_data_file(os.path.join(data_files_dir, rows[1].harvest()[0]))
+            scenario.steps[x] = ExamplesFile(node, file_path)
+
+    return ast
@@ -0,0 +1,190 @@
+""" BDD Test Harness Runner: Feature
+
+Run a Gherkin Feature file against a unittest.TestCase, like morelia's run().
+
+The compiled BDD test modules call this run(). It finds step methods
+through the TestCase class's step dispatch index instead of morelia's
+linear scan of every step docstring. The parsed Feature comes from the
+on-disk feature cache when the Feature file is unchanged.
+
+A Scenario Outline runs once per Examples row. The `row` argument runs
+just one of them, so each row can be its own test method.
+Rows are numbered from 0 across every Scenario in the Feature;
+a Scenario without Examples is one row.
+
+The rows can run at the same time in a thread pool, see concurrent_rows.
+Pass `concurrency`, or set ROW_CONCURRENCY on the TestCase class:
+
+    class FeatureTestCase(unittest.TestCase):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+        ROW_CONCURRENCY = 8
+
+The time of each step and row is recorded when step timings are on,
+see step_timings.
+
+An Examples table may be read from a CSV file, see examples_files.
+
+Steps that are coroutines, e.g. the async REST step mixins, run with
+async_feature's run() instead.
+"""
+
+import os
+import time
+
+from functools import partial
+
+from morelia import has_color_support
+from morelia.formatters import ColorTextFormatter, PlainTextFormatter
+from morelia.grammar import Scenario
+from morelia.matchers import MethodNameStepMatcher, ParseStepMatcher
+from morelia.parser import Parser
+from morelia.visitors import TestVisitor
+
+from testharness.bdd.runner.concurrent_rows import run_rows
+from testharness.bdd.runner.dispatch import IndexedRegexpStepMatcher
+from testharness.bdd.runner.examples_files import load_examples_files
+from testharness.bdd.runner.feature_cache import load_feature
+from testharness.bdd.runner.step_timings import (
+    STEP_TIMINGS_ENV,
+    StepTimingFormatter,
+    write_step_timings
+)
+
+ALL_SCENARIOS = r'.*'
+
+# Step matchers, in morelia's order: regex, format-like string, method name.
+STEP_MATCHERS = [IndexedRegexpStepMatcher, ParseStepMatcher, MethodNameStepMatcher]
+
+
+def get_feature_rows(ast):
+    """ Get Feature Rows.
+
+    :param ast: morelia AST for a Feature
+    :returns: list of (Scenario, Examples row indices) tuples, one per row
+    """
+
+    rows = []
+    for scenario in ast.steps[0].steps:
+        if isinstance(scenario, Scenario):
+            rows.extend((scenario, indices) for indices in scenario.permute_schedule())
+    return rows
+
+
+class RowTestVisitor(TestVisitor):
+    """ Row Test Visitor.
+
+    A morelia TestVisitor that runs only one row of the Feature.
+    """
+
+    def __init__(self, suite, matcher, formatter, row):
+        super(RowTestVisitor, self).__init__(suite, matcher, formatter)
+        self._row = row
+        self._first_row = 0
+
+    def permute_schedule(self, node):
+        schedule = node.permute_schedule()
+        row_index = self._row - self._first_row
+        self._first_row += len(schedule)
+        if 0 <= row_index < len(schedule):
+            return [schedule[row_index]]
+        return []
+
+
+def report_missing_steps(ast, suite, matchers):
+    """ Report Missing Steps.
+
+    :param ast: morelia AST for a Feature
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    :param matchers: list of morelia step matcher classes
+    :raises AssertionError: "Cannot match steps:" with the missing step stubs
+    """
+
+    matcher_visitor = ast._matcher_visitor_class(suite, ast._create_matchers_chain(suite, matchers))
+    ast.steps[0].accept(matcher_visitor)
+    matcher_visitor.report_missing()
+
+
+def set_up_data_files(filename, suite):
+    """ Set Up Data Files.
+
+    Start a data loader mixin TestCase's data file prefetch, once per
+    class, before its steps run; see loader_mixins.common.
+
+    :param str filename: A BDD Gherkin Feature file
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    """
+
+    set_up = getattr(type(suite), 'set_up_data_files', None)
+    if set_up is not None:
+        set_up(filename)
+
+
+def run(filename, suite, as_str=None, scenario=ALL_SCENARIOS,
+        verbose=False, show_all_missing=True, row=None, concurrency=None, step_timings=None,
+        **kwargs):
+    """ Run a Feature file.
+
+    Parse the Feature file and run its steps on the TestCase.
+    This takes the same arguments as morelia.run().
+
+    :param str filename: A BDD Gherkin Feature file
+    :param unittest.TestCase suite: TestCase instance with the step methods
+    :param str as_str: None to use the file, or the Feature text to parse
+    :param str scenario: a regex pattern to match the scenarios to run
+    :param bool verbose: be verbose
+    :param bool show_all_missing: show all missing steps
+    :param int row: run only this row of the Feature, default all rows
+    :param int concurrency: run this many rows at the same time, default ROW_CONCURRENCY or 1
+    :param str step_timings: append step timings to this file, default $BDD_STEP_TIMINGS
+    :raises IndexError: when the Feature has no such row
+    """
+
+    if verbose and not kwargs.get('formatter'):
+        kwargs['formatter'] = ColorTextFormatter() if has_color_support() else PlainTextFormatter()
+    kwargs.setdefault('matchers', STEP_MATCHERS)
+
+    if step_timings is None:
+        step_timings = os.environ.get(STEP_TIMINGS_ENV)
+    if step_timings:
+        timing_formatter = StepTimingFormatter(kwargs.get('formatter'), first_row=row or 0)
+        kwargs['formatter'] = timing_formatter
+        start = time.perf_counter()
+        try:
+            return run(filename, suite, as_str, scenario, show_all_missing=show_all_missing,
+                       row=row, concurrency=concurrency, step_timings='', **kwargs)
+        finally:
+            write_step_timings(step_timings, suite, timing_formatter.rows, time.perf_counter() - start)
+
+    set_up_data_files(filename, suite)
+    if as_str is not None:
+        ast = Parser().parse_as_str(filename, as_str, scenario=scenario)
+    elif scenario == ALL_SCENARIOS:
+        ast = load_feature(filename)
+    else:
+        ast = Parser().parse_file(filename, scenario=scenario)
+    load_examples_files(ast, filename)
+
+    if concurrency is None:
+        concurrency = getattr(suite, 'ROW_CONCURRENCY', None)
+
+    if row is None and concurrency and concurrency > 1:
+        row_count = len(get_feature_rows(ast))
+        if row_count > 1:
+            if show_all_missing:
+                report_missing_steps(ast, suite, kwargs['matchers'])
+            formatter = kwargs.pop('formatter', None)
+
+            def run_row(row_suite, row, row_formatter):
+                run(filename, row_suite, as_str, scenario, show_all_missing=False,
+                    row=row, concurrency=1, step_timings='', formatter=row_formatter, **kwargs)
+
+            return run_rows(run_row, suite, row_count, concurrency, formatter)
+
+    if row is not None:
+        row_count = len(get_feature_rows(ast))
+        if not 0 <= row < row_count:
+            raise IndexError('Feature "{}" has no row {}, only {}'.format(filename, row, row_count))
+        ast._test_visitor_class = partial(RowTestVisitor, row=row)
+
+    return ast.evaluate(suite, show_all_missing=show_all_missing, **kwargs)
@@ -0,0 +1,118 @@
+""" BDD Test Harness Runner: Feature Cache
+
+Every compiled test module parses its Feature file each time it runs.
+The feature cache keeps the parsed Feature syntax tree on disk, so the
+next run unpickles it instead of parsing the Gherkin text again.
+
+The cache files live in a ".cache" directory beside the Feature files,
+e.g. "features/.cache/TC-T1.feature.pickle". Each one records the Feature
+file's path, size, mtime and SHA-256 hash. An unchanged size and mtime
+trusts the cache at once; otherwise the hash decides.
+
+The cache is only an accelerator. A cache file that is missing, corrupt,
+from another morelia version or cannot be written is parsed again.
+"""
+
+import os
+import pickle
+import threading
+
+import morelia
+from morelia.parser import Parser
+
+from testharness.bdd.compiler.build_manifest import file_hash, file_stamp
+
+import logging
+log = logging.getLogger(__name__)
+
+FEATURE_CACHE_DIRNAME = '.cache'
+FEATURE_CACHE_SUFFIX = '.pickle'
+FEATURE_CACHE_VERSION = 1
+
+
+def get_cache_path(feature_file):
+    """ Get Cache Path.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: the path of its cache file
+    """
+
+    (features_dir, feature_filename) = os.path.split(os.path.abspath(feature_file))
+    return os.path.join(features_dir, FEATURE_CACHE_DIRNAME, feature_filename + FEATURE_CACHE_SUFFIX)
+
+
+def _read_cache(cache_path):
+    """ Read a cache file.
+
+    :returns: the cache entry dict, or None when it cannot be used
+    """
+
+    try:
+        with open(cache_path, 'rb') as f:
+            entry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        log.warning('Ignoring unreadable feature cache "%s": %s', cache_path, e)
+        return None
+
+    if not isinstance(entry, dict) or \
+            entry.get('version') != FEATURE_CACHE_VERSION or \
+            entry.get('morelia_version') != morelia.__version__:
+        return None
+    return entry
+
+
+def _write_cache(cache_path, entry):
+    """ Write a cache file atomically; a failure only logs a warning. """
+
+    new_path = '{}.{}.{}.new'.format(cache_path, os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(new_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(new_path, cache_path)
+    except (OSError, pickle.PicklingError) as e:
+        log.warning('Cannot write feature cache "%s": %s', cache_path, e)
+        try:
+            os.remove(new_path)
+        except OSError:
+            pass
+
+
+def load_feature(feature_file):
+    """ Load Feature.
+
+    Get the parsed Feature syntax tree from the cache, or parse the
+    Feature file and cache it. Every call returns a new syntax tree.
+
+    :param str feature_file: A BDD Gherkin Feature file
+    :returns: morelia AST for the whole Feature
+    """
+
+    cache_path = get_cache_path(feature_file)
+    stamp = file_stamp(feature_file)
+
+    entry = _read_cache(cache_path)
+    if entry is not None and entry['feature'] == os.path.abspath(feature_file):
+        if stamp is not None and stamp == entry['feature_stamp']:
+            return pickle.loads(entry['ast'])
+
+        sha256 = file_hash(feature_file)
+        if sha256 == entry['feature_sha256']:
+            entry['feature_stamp'] = stamp  # Touched, not changed.
+            _write_cache(cache_path, entry)
+            return pickle.loads(entry['ast'])
+    else:
+        sha256 = file_hash(feature_file)
+
+    ast = Parser().parse_file(feature_file)
+    _write_cache(cache_path, {
+        'version': FEATURE_CACHE_VERSION,
+        'morelia_version': morelia.__version__,
+        'feature': os.path.abspath(feature_file),
+        'feature_stamp': stamp,
+        'feature_sha256': sha256,
+        'ast': pickle.dumps(ast, protocol=pickle.HIGHEST_PROTOCOL),
+    })
+    return ast
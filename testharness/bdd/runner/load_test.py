@@ -0,0 +1,271 @@
+""" BDD Test Harness Runner: Load Test
+
+Run a compiled BDD test module as a load test. Its Feature is the
+virtual-user script, and its step mixins make the requests, so the same
+API scenarios need not be written again for a separate load tool.
+
+Each virtual user is a thread that runs every row of the Feature in
+turn, again and again, for a duration or a number of iterations.
+Each iteration runs on a new instance of the module's TestCase class,
+set up with setUp() and torn down with tearDown() and doCleanups(), so
+e.g. map_data()'s mappings are released; setUp() must make self.client,
+e.g. a PooledHttpClient for the service under load.
+The class's setUpClass() runs once before the virtual users start, and
+its tearDownClass() once after they finish.
+
+    report = run_load_test(FeatureTestCase, users=20, duration=60)
+    print(report.format())
+
+The report has the throughput and the p50, p95 and p99 latency of each
+step, as the step timings measure them, e.g. "When User GETs endpoint
+/osscwl/servers". A failed step is counted and its time is included.
+The error of each failed iteration is counted by its message, so the
+report also says why the iterations failed.
+"""
+
+import importlib
+import importlib.util
+import inspect
+import os
+import threading
+import time
+import unittest
+
+from collections import OrderedDict
+
+from testharness.bdd.compiler.step_merger import BDD_TEST_CASE_CLASS
+from testharness.bdd.runner import feature
+from testharness.bdd.runner.step_timings import StepTimingFormatter
+
+LOAD_TEST_PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_samples, pct):
+    """ Percentile.
+
+    :param list sorted_samples: the samples, in ascending order
+    :param float pct: the percentile, from 0 to 100
+    :returns: the nearest-rank percentile, or 0.0 with no samples
+    """
+
+    if not sorted_samples:
+        return 0.0
+    rank = max(1, -(-len(sorted_samples) * pct // 100))  # ceil()
+    return sorted_samples[int(rank) - 1]
+
+
+class StepLatencies(object):
+    """ Step Latencies.
+
+    The time of every run of each step, and the failed runs.
+    """
+
+    def __init__(self):
+        self.samples = OrderedDict()
+        self.failures = {}
+
+    def add_row(self, row_timing):
+        """ Add the step timings of one row, see StepTimingFormatter. """
+
+        for step in row_timing['steps']:
+            self.samples.setdefault(step['step'], []).append(step['time'])
+            if step['status'] != 'pass':
+                self.failures[step['step']] = self.failures.get(step['step'], 0) + 1
+
+    def update(self, other):
+        """ Add another StepLatencies' samples. """
+
+        for (step, samples) in other.samples.items():
+            self.samples.setdefault(step, []).extend(samples)
+        for (step, count) in other.failures.items():
+            self.failures[step] = self.failures.get(step, 0) + count
+
+
+class LoadTestReport(object):
+    """ Load Test Report. """
+
+    def __init__(self, latencies, users, iterations, failed_iterations, elapsed, errors=None):
+        """ Init LoadTestReport.
+
+        :param StepLatencies latencies: every virtual user's step latencies
+        :param int users: number of virtual users
+        :param int iterations: number of Feature runs
+        :param int failed_iterations: number of Feature runs that failed
+        :param float elapsed: seconds the load test ran
+        :param dict errors: the number of failed Feature runs by error message
+        """
+
+        self.latencies = latencies
+        self.users = users
+        self.iterations = iterations
+        self.failed_iterations = failed_iterations
+        self.elapsed = elapsed
+        self.errors = errors or {}
+
+    @property
+    def steps(self):
+        """ Steps.
+
+        :returns: a list of dicts, one per step: its "step" line, run "count",
+            "failures", "throughput" per second, and "p50", "p95", "p99", "max" seconds
+        """
+
+        steps = []
+        for (step, samples) in self.latencies.samples.items():
+            samples = sorted(samples)
+            stats = {
+                'step': step,
+                'count': len(samples),
+                'failures': self.latencies.failures.get(step, 0),
+                'throughput': len(samples) / self.elapsed if self.elapsed else 0.0,
+                'max': samples[-1],
+            }
+            for pct in LOAD_TEST_PERCENTILES:
+                stats['p{}'.format(pct)] = percentile(samples, pct)
+            steps.append(stats)
+        return steps
+
+    def to_dict(self):
+        return {
+            'users': self.users,
+            'iterations': self.iterations,
+            'failed_iterations': self.failed_iterations,
+            'elapsed': round(self.elapsed, 6),
+            'throughput': self.iterations / self.elapsed if self.elapsed else 0.0,
+            'steps': self.steps,
+            'errors': [{'error': error, 'count': count}
+                       for (error, count) in sorted(self.errors.items(), key=lambda item: -item[1])]
+        }
+
+    def format(self):
+        """ Format the report as a text table, times in ms. """
+
+        summary = self.to_dict()
+        lines = ['{users} users, {iterations} iterations ({failed_iterations} failed) in {elapsed:.3f}s, '
+                 '{throughput:.1f} iterations/s'.format(**summary),
+                 '{:>8} {:>6} {:>9} {:>9} {:>9} {:>9} {:>9}  {}'.format(
+                     'count', 'fail', 'per sec', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'step')]
+        for stats in summary['steps']:
+            lines.append('{:8d} {:6d} {:9.1f} {:9.3f} {:9.3f} {:9.3f} {:9.3f}  {}'.format(
+                stats['count'], stats['failures'], stats['throughput'], 1000.0 * stats['p50'],
+                1000.0 * stats['p95'], 1000.0 * stats['p99'], 1000.0 * stats['max'], stats['step']))
+        if summary['errors']:
+            lines.append('{:>8}  {}'.format('count', 'error'))
+            for error in summary['errors']:
+                lines.append('{:8d}  {}'.format(error['count'], error['error']))
+        return '\n'.join(lines)
+
+
+class VirtualUser(object):
+    """ Virtual User: run the Feature again and again in one thread. """
+
+    def __init__(self, test_case_class):
+        self.test_case_class = test_case_class
+        self.latencies = StepLatencies()
+        self.iterations = 0
+        self.failed_iterations = 0
+        self.errors = {}
+
+    def add_error(self, message):
+        """ Count an error of a failed iteration by its message. """
+
+        self.errors[message] = self.errors.get(message, 0) + 1
+
+    def run_iteration(self):
+        """ Run every row of the Feature once, on a new TestCase. """
+
+        suite = self.test_case_class()
+        timing_formatter = StepTimingFormatter()
+        try:
+            suite.setUp()
+            try:
+                feature.run(suite.FEATURE_FILE, suite, show_all_missing=False, concurrency=1,
+                            step_timings='', formatter=timing_formatter)
+            finally:
+                suite.tearDown()
+        except Exception as e:
+            self.failed_iterations += 1
+            self.add_error('{}: {}'.format(type(e).__name__, str(e).rstrip()))
+        finally:
+            if not suite.doCleanups():
+                self.add_error('A cleanup failed')
+        self.iterations += 1
+
+        for row_timing in timing_formatter.rows:
+            self.latencies.add_row(row_timing)
+
+    def run(self, iterations=None, deadline=None):
+        """ Run until the iterations are done, or the deadline passes. """
+
+        while (iterations is None or self.iterations < iterations) and \
+                (deadline is None or time.monotonic() < deadline):
+            self.run_iteration()
+
+
+def run_load_test(test_case_class, users=10, duration=None, iterations=None):
+    """ Run Load Test.
+
+    :param test_case_class: a BDD TestCase class with a FEATURE_FILE and its step methods
+    :param int users: number of virtual users running at the same time
+    :param float duration: seconds to run; an iteration under way still finishes
+    :param int iterations: number of Feature runs per user, default 1 with no duration
+    :raises AssertionError: "Cannot match steps:" when the TestCase is missing steps
+    :raises Exception: what the class's setUpClass() raises
+    :returns: the LoadTestReport
+    """
+
+    if duration is None and iterations is None:
+        iterations = 1
+
+    ast = feature.load_feature(test_case_class.FEATURE_FILE)
+    feature.report_missing_steps(ast, test_case_class(), feature.STEP_MATCHERS)
+
+    virtual_users = [VirtualUser(test_case_class) for user in range(users)]
+    test_case_class.setUpClass()
+    try:
+        start = time.monotonic()
+        deadline = None if duration is None else start + duration
+        threads = [threading.Thread(target=user.run, args=(iterations, deadline), name='VirtualUser-{}'.format(x))
+                   for (x, user) in enumerate(virtual_users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - start
+    finally:
+        test_case_class.tearDownClass()
+
+    latencies = StepLatencies()
+    errors = {}
+    for user in virtual_users:
+        latencies.update(user.latencies)
+        for (error, count) in user.errors.items():
+            errors[error] = errors.get(error, 0) + count
+    return LoadTestReport(latencies, users, sum(user.iterations for user in virtual_users),
+                          sum(user.failed_iterations for user in virtual_users), elapsed, errors)
+
+
+def get_feature_test_case(module_name):
+    """ Get Feature TestCase.
+
+    :param str module_name: a compiled BDD test module's name, e.g. "tests.test_TC_T1_feature",
+        or its file path
+    :raises ValueError: when the module has no TestCase class with a FEATURE_FILE
+    :returns: the module's FeatureTestCase class, else its first TestCase class with a FEATURE_FILE
+    """
+
+    if module_name.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(os.path.basename(module_name)[:-3], module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        module = importlib.import_module(module_name)
+
+    test_case_classes = [value for (name, value) in inspect.getmembers(module, inspect.isclass)
+                         if issubclass(value, unittest.TestCase) and getattr(value, 'FEATURE_FILE', None)]
+    for test_case_class in test_case_classes:
+        if test_case_class.__name__ == BDD_TEST_CASE_CLASS:
+            return test_case_class
+    if test_case_classes:
+        return test_case_classes[0]
+    raise ValueError('Module "{}" has no TestCase class with a FEATURE_FILE'.format(module_name))
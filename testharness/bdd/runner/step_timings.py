@@ -0,0 +1,146 @@
+""" BDD Test Harness Runner: Step Timings
+
+Record the wall time of every Gherkin step and Examples row.
+
+Timing is opt-in. Set the BDD_STEP_TIMINGS environment variable to a
+sidecar file path, or pass run(..., step_timings=path). Each test method
+appends one JSON line to the sidecar file:
+
+    {"classname": "tests.test_TC_T1_feature.FeatureTestCase",
+     "name": "test_scenario_TC_T1",
+     "time": 0.412,
+     "wall_time": 0.160,
+     "rows": [{"row": 0, "scenario": "...", "time": 0.137,
+               "steps": [{"step": "When User GETs endpoint /swagger.json",
+                          "status": "pass", "time": 0.121}, ...]}, ...]}
+
+"time" is the sum of the row times; "wall_time" is the time the Feature
+run took, which is less when rows run at the same time (ROW_CONCURRENCY).
+The classname and name match the XUnit "testcase", so the TM4J reporter
+can add the step timings to each script result.
+Appending whole lines lets parallel test processes share one file.
+"""
+
+import os
+import threading
+
+from morelia.formatters import IFormatter
+from morelia.grammar import Scenario, Step
+
+from testharness.bdd.json_codec import json_codec
+
+STEP_TIMINGS_ENV = 'BDD_STEP_TIMINGS'
+
+_write_lock = threading.Lock()
+
+
+class StepTimingFormatter(IFormatter):
+    """ Step Timing Formatter.
+
+    A morelia formatter that records each step's duration by row,
+    then passes the output on to another formatter, if any.
+    """
+
+    def __init__(self, formatter=None, first_row=0):
+        """ Init StepTimingFormatter.
+
+        :param formatter: morelia formatter for the step output, or None
+        :param int first_row: the Feature row number of the first Scenario run
+        """
+
+        self.formatter = formatter
+        self.rows = []
+        self._next_row = first_row
+
+    def output(self, node, line, status, duration):
+        if isinstance(node, Scenario):
+            self.rows.append({
+                'row': self._next_row,
+                'scenario': node.predicate,
+                'time': 0.0,
+                'steps': []
+            })
+            self._next_row += 1
+        elif isinstance(node, Step) and self.rows:
+            row_timing = self.rows[-1]
+            row_timing['steps'].append({
+                'step': line.strip(),
+                'status': status,
+                'time': round(duration, 6)
+            })
+            row_timing['time'] = round(row_timing['time'] + duration, 6)
+
+        if self.formatter is not None:
+            self.formatter.output(node, line, status, duration)
+
+
+def get_test_key(suite):
+    """ Get Test Key.
+
+    :param unittest.TestCase suite: TestCase instance
+    :returns: (classname, name) as the XUnit "testcase" has them
+    """
+
+    (classname, name) = suite.id().rsplit('.', 1)
+    return (classname, name)
+
+
+def write_step_timings(timings_filename, suite, rows, wall_time=None):
+    """ Write Step Timings.
+
+    Append the test method's step timings to the sidecar file.
+
+    :param str timings_filename: path to the sidecar JSON lines file
+    :param unittest.TestCase suite: TestCase instance that ran the steps
+    :param list rows: the StepTimingFormatter rows
+    :param float wall_time: seconds the Feature run took, default the sum of the row times
+    """
+
+    (classname, name) = get_test_key(suite)
+    row_time = round(sum(row_timing['time'] for row_timing in rows), 6)
+    line = json_codec.dumps({
+        'classname': classname,
+        'name': name,
+        'time': row_time,
+        'wall_time': row_time if wall_time is None else round(wall_time, 6),
+        'rows': rows
+    }, sort_keys=True)
+
+    with _write_lock:
+        with open(timings_filename, 'a') as f:
+            f.write(line + '\n')
+
+
+def load_step_timings(timings_filename):
+    """ Load Step Timings.
+
+    :param str timings_filename: path to the sidecar JSON lines file
+    :returns: a dict {(classname, name): step timings}; the last run wins
+    """
+
+    step_timings = {}
+    if not os.path.isfile(timings_filename):
+        return step_timings
+
+    with open(timings_filename, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json_codec.loads(line)
+                step_timings[(record['classname'], record['name'])] = record
+    return step_timings
+
+
+def format_step_timings(record):
+    """ Format Step Timings.
+
+    :param dict record: one test method's step timings
+    :returns: text with one line per row and per step
+    """
+
+    lines = []
+    for row_timing in record['rows']:
+        lines.append('row {}: {:.3f}s'.format(row_timing['row'], row_timing['time']))
+        for step_timing in row_timing['steps']:
+            lines.append('    {} [{}] {:.3f}s'.format(
+                step_timing['step'], step_timing['status'], step_timing['time']))
+    return '\n'.join(lines)
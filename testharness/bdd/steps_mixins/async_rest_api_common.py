@@ -0,0 +1,50 @@
+""" BDD Test Harness Mixin: Async REST API Steps
+
+These mixins are the asyncio variants of the GET and POST step mixins.
+The request steps are coroutines that await self.client, e.g. an
+AsyncPooledHttpClient; the assertion steps are the same as before.
+
+Run them with the asyncio runner, testharness.bdd.runner.async_feature:
+
+    class ReusableBDDTestCaseWithMixin(unittest.TestCase, AsyncHttpGetRestApiBDDStepsMixin):
+
+        FEATURE_FILE = 'features/TC-T1.feature'
+
+        def setUp(self):
+            self.client = AsyncPooledHttpClient('https://api.example.com')
+
+        def qa_scenario_TC_T1(self):
+            async_feature.run(self.FEATURE_FILE, self, concurrency=20)
+"""
+
+import time
+
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+from testharness.bdd.steps_mixins.post_rest_api_common import HttpPostRestApiBDDStepsMixin
+
+
+class AsyncHttpGetRestApiBDDStepsMixin(HttpGetRestApiBDDStepsMixin):
+    """ Async HTTP GET REST API with BDD Steps Mixin.
+
+    The "test client" must be named self.client and have a coroutine HTTP GET method.
+    """
+
+    async def step_User_GETs_endpoint_relative_url(self, relative_url):
+        r'User GETs endpoint (.+)'
+        start = time.perf_counter()
+        self.response = await self.client.get(relative_url)
+        self.record_response_time('GET', relative_url, time.perf_counter() - start)
+
+
+class AsyncHttpPostRestApiBDDStepsMixin(HttpPostRestApiBDDStepsMixin):
+    """ Async HTTP POST REST API with BDD Steps Mixin.
+
+    The "test client" must be named self.client and have a coroutine HTTP POST method.
+    """
+
+    async def step_User_POSTs_endpoint_relative_url_with_post_payload(self, relative_url, post_payload):
+        r'User POSTs endpoint (.+) with (.+)'
+        post_payload = self.load_post_payload(post_payload)
+        start = time.perf_counter()
+        self.response = await self.client.post(relative_url, post_payload)
+        self.record_response_time('POST', relative_url, time.perf_counter() - start)
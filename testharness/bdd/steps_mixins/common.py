@@ -0,0 +1,84 @@
+""" BDD Test Harness Mixin: Common Response Steps
+
+The REST step mixins share this code to read and time self.response.
+"""
+
+from urllib.parse import urlsplit
+
+from testharness.bdd.http.latency import latency_histograms
+from testharness.bdd.json_codec import json_codec
+
+
+class ResponseJSONMixin:
+    """ Response JSON Mixin.
+
+    Decode each response's JSON once, however many steps assert on it.
+    """
+
+    @property
+    def response_json(self):
+        """ Response JSON.
+
+        The parsed JSON of self.response, decoded on first use.
+        A new self.response is decoded again. The value is shared
+        by every later step; do not change it.
+
+        :returns: the parsed JSON document
+        """
+
+        memo = getattr(self, '_response_json_memo', None)
+        if memo is None or memo[0] is not self.response:
+            memo = self._response_json_memo = (self.response, json_codec.loads_response(self.response))
+        return memo[1]
+
+
+class ResponseTimeMixin:
+    """ Response Time Mixin.
+
+    The request steps time each self.client request: self.response_time
+    is its seconds, also recorded in the process-wide latency histogram
+    of the request's name; see http.latency. The name is the method and
+    the URL path without its query, e.g. "GET /osscwl/servers", so every
+    row of an Outline that differs only in its query shares a histogram.
+    Override get_response_time_name() to share one across path IDs too.
+
+    BDD Feature File steps, to assert a response-time SLO:
+
+        Then the response time is under 500 ms
+        And the p95 response time is under 200 ms
+    """
+
+    def get_response_time_name(self, method, relative_url):
+        """ Get Response Time Name.
+
+        :param str method: HTTP method, e.g. "GET"
+        :param str relative_url: the request's URL, e.g. "/osscwl/servers?page=2"
+        :returns: the request's latency histogram name, e.g. "GET /osscwl/servers"
+        """
+
+        return '{} {}'.format(method, urlsplit(relative_url).path or '/')
+
+    def record_response_time(self, method, relative_url, seconds):
+        """ Record the response time of a request.
+
+        :param str method: HTTP method, e.g. "GET"
+        :param str relative_url: the request's URL, e.g. "/osscwl/servers"
+        :param float seconds: the time the request took
+        """
+
+        self.response_time = seconds
+        self.response_request = self.get_response_time_name(method, relative_url)
+        latency_histograms.record(self.response_request, seconds)
+
+    def step_the_response_time_is_under_max_ms_ms(self, max_ms):
+        r'the response time is under (\d+) ms'
+        self.assertLess(self.response_time * 1000.0, int(max_ms),
+                        '{} took {:.1f} ms'.format(self.response_request, self.response_time * 1000.0))
+
+    def step_the_pct_response_time_is_under_max_ms_ms(self, pct, max_ms):
+        r'the p(\d+) response time is under (\d+) ms'
+        # Every response so far with this request's name, see get_response_time_name().
+        histogram = latency_histograms.get(self.response_request)
+        pct_ms = histogram.percentile(int(pct)) * 1000.0
+        self.assertLess(pct_ms, int(max_ms), '{} p{} is {:.1f} ms over {} requests'.format(
+            self.response_request, pct, pct_ms, histogram.total_count))
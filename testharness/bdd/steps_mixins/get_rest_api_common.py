@@ -9,6 +9,10 @@ To reuse the code below, place it after the unittest.TestCase.
         # ...
 """
 
+import time
+
+from testharness.bdd.steps_mixins.common import ResponseJSONMixin, ResponseTimeMixin
+
 # BDD Feature File
 """
 Feature:
@@ -25,17 +29,20 @@ Feature:
 """
 
 
-class HttpGetRestApiBDDStepsMixin:
+class HttpGetRestApiBDDStepsMixin(ResponseJSONMixin, ResponseTimeMixin):
     """ HTTP GET REST API with BDD Steps Mixin.
 
     Use this mixin to have the common HTTP GET REST API steps.
 
     The "test client" must be named self.client and have the HTTP GET method.
+    For QA-stage tests use testharness.bdd.http.client.PooledHttpClient.
     """
 
     def step_User_GETs_endpoint_relative_url(self, relative_url):
         r'User GETs endpoint (.+)'
+        start = time.perf_counter()
         self.response = self.client.get(relative_url)
+        self.record_response_time('GET', relative_url, time.perf_counter() - start)
 
     def step_the_response_code_is_status_code(self, status_code):
         r'the response code is (.+)'
@@ -48,5 +55,5 @@ class HttpGetRestApiBDDStepsMixin:
     def step_the_response_JSON_has_fields_field_list(self, field_list):
         r'the response JSON has fields (.+)'
         field_list = field_list.split(',')
-        json_dict = self.response.json()
+        json_dict = self.response_json
         self.assertEqual(list(json_dict.keys()), field_list)
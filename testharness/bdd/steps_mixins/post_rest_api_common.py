@@ -9,7 +9,10 @@ To reuse the code below, place it after the unittest.TestCase.
         # ...
 """
 
-from testharness.bdd.loader_mixins.common import JSONDataLoaderMixin
+import time
+
+from testharness.bdd.loader_mixins.common import JSONDataLoaderMixin, PAYLOAD_TEMPLATE_SUFFIX
+from testharness.bdd.steps_mixins.common import ResponseJSONMixin, ResponseTimeMixin
 
 # BDD Feature File
 """
@@ -28,22 +31,40 @@ Feature:
 """
 
 
-class HttpPostRestApiBDDStepsMixin(JSONDataLoaderMixin):
+class HttpPostRestApiBDDStepsMixin(ResponseJSONMixin, ResponseTimeMixin, JSONDataLoaderMixin):
     """ HTTP POST REST API with BDD Steps Mixin.
 
     Use this mixin to have the common HTTP POST REST API steps.
 
     The "test client" must be named self.client and have the HTTP POST method.
+    For QA-stage tests use testharness.bdd.http.client.PooledHttpClient.
+
+    A post_payload file named "*.tmpl.json" is a payload template: its
+    "${name}" placeholders are filled in from the Examples columns.
+    Set POST_PAYLOAD_TEMPLATES to load every post_payload as a template,
+    and TEMPLATE_ENVIRONMENT to fill placeholders from environment variables.
     """
 
+    # Load every post_payload as a payload template, not only "*.tmpl.json" files.
+    POST_PAYLOAD_TEMPLATES = False
+
+    def load_post_payload(self, post_payload):
+        """ Load the post_payload data file, filled in when it is a payload template. """
+
+        if self.POST_PAYLOAD_TEMPLATES or post_payload.endswith(PAYLOAD_TEMPLATE_SUFFIX):
+            return self.load_json_template(post_payload)
+        return self.load_json(post_payload)
+
     def step_User_POSTs_endpoint_relative_url_with_post_payload(self, relative_url, post_payload):
         r'User POSTs endpoint (.+) with (.+)'
-        post_payload = self.load_json(post_payload)
+        post_payload = self.load_post_payload(post_payload)
+        start = time.perf_counter()
         self.response = self.client.post(relative_url, post_payload)
+        self.record_response_time('POST', relative_url, time.perf_counter() - start)
 
     def step_the_response_JSON_message_contains_message_text(self, message_text):
         r'the response JSON message contains (.+)'
-        json_dict = self.response.json()
+        json_dict = self.response_json
         self.assertIn(message_text, json_dict.get('message'))
 
     def step_the_response_code_is_status_code(self, status_code):
@@ -57,5 +78,5 @@ class HttpPostRestApiBDDStepsMixin(JSONDataLoaderMixin):
     def step_the_response_JSON_has_fields_field_list(self, field_list):
         r'the response JSON has fields (.+)'
         field_list = field_list.split(',')
-        json_dict = self.response.json()
+        json_dict = self.response_json
         self.assertEqual(list(json_dict.keys()), field_list)
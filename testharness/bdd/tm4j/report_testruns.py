@@ -2,9 +2,15 @@
 
 Compose a TM4J test run document from the unittest output.
 unittest can create XUnit XML, but not the TM4J "testrun" JSON format.
-"""
 
-from junitparser import JUnitXml, TestSuite, Error, Failure, Skipped
+junitparser is imported only when a reporter is created.
+
+The BDD runner can also record the time of every step in a sidecar file,
+see testharness.bdd.runner.step_timings. When the reporter is given that
+file, each script result's comment lists its rows and steps with their
+times, and the test run's comment has their total wall time. The
+"executionTime" is always the XUnit time.
+"""
 
 import logging
 import warnings
@@ -71,13 +77,15 @@ class TM4JTestRunReporter(object):
         "scriptResults" := XUnit testcases
     """
 
-    def __init__(self, xunit_filename, analyst_id, comment='', environment=''):
+    def __init__(self, xunit_filename, analyst_id, comment='', environment='',
+                 step_timings_filename=None):
         """ Init TM4JTestRunReporter.
 
         :param str xunit_filename: an XUnit XML report file
         :param str analyst_id: Test Analyst user ID in JIRA
         :param str comment: optional comment for test suite(s)
         :param str environment: JIRA Test Environment name (must match exactly)
+        :param str step_timings_filename: optional BDD step timings sidecar file
         """
 
         self.xunit_filename = xunit_filename
@@ -86,6 +94,13 @@ class TM4JTestRunReporter(object):
         self.environment = environment
         self._test_runs_list = []
 
+        self.step_timings = {}
+        if step_timings_filename:
+            from testharness.bdd.runner.step_timings import load_step_timings
+            self.step_timings = load_step_timings(step_timings_filename)
+
+        from junitparser import JUnitXml, TestSuite
+
         xml = JUnitXml.fromfile(self.xunit_filename)
         if isinstance(xml, TestSuite):
             xml = [xml]
@@ -116,6 +131,8 @@ class TM4JTestRunReporter(object):
         :returns: a TM4J status
         """
 
+        from junitparser import Error, Failure, Skipped
+
         if isinstance(result, Error):
             return "Blocked"
         elif isinstance(result, Failure):
@@ -148,7 +165,7 @@ class TM4JTestRunReporter(object):
               "testCaseKey": testcase_key,
               "status": status_all,
               "environment": self.environment,
-              "comment": self.comment,
+              "comment": self.get_testrun_comment(suite),
               "userKey": self.user_key,
               "executionTime": suite.time,
               "executionDate": suite.timestamp,
@@ -159,6 +176,28 @@ class TM4JTestRunReporter(object):
 
         return testrun_json
 
+    def get_testrun_comment(self, suite):
+        """ Get Test Run Comment.
+
+        The comment, then the step timings aggregate of the testsuite's
+        recorded test cases, when there are any. The "executionTime" stays
+        the XUnit time, which includes setUp() and tearDown().
+
+        :param suite: an XUnit testsuite DOM
+        :returns: the comment text
+        """
+
+        cases = list(suite)
+        records = [self.step_timings[(case.classname, case.name)] for case in cases
+                   if (case.classname, case.name) in self.step_timings]
+        if not records:
+            return self.comment
+
+        timings = 'Step timings: {} of {} test cases, {:.3f}s wall time, {:.3f}s in rows'.format(
+            len(records), len(cases), sum(record.get('wall_time', record['time']) for record in records),
+            sum(record['time'] for record in records))
+        return '{}\n{}'.format(self.comment, timings) if self.comment else timings
+
     def get_script_results(self, suite):
         """ Get Script Results.
 
@@ -207,12 +246,28 @@ class TM4JTestRunReporter(object):
             script_result = {
               "index": index,
               "status": status_code,
-              "comment": case.name,
+              "comment": self.get_script_comment(case),
             }
             script_result_list.append(script_result)
 
         return (testcase_key, script_result_list, counter.status_all)
 
+    def get_script_comment(self, case):
+        """ Get Script Comment.
+
+        The comment is the test case name, followed by its step timings, if any.
+
+        :param case: an XUnit testcase DOM
+        :returns: the scriptResults comment
+        """
+
+        record = self.step_timings.get((case.classname, case.name))
+        if record is None:
+            return case.name
+
+        from testharness.bdd.runner.step_timings import format_step_timings
+        return '{}\n{}'.format(case.name, format_step_timings(record))
+
 
 if __name__ == '__main__':  # pragma: no cover
     from pprint import pprint
@@ -0,0 +1,80 @@
+from unittest import TestCase
+
+import os
+import tempfile
+
+from testharness.bdd.compiler import build_manifest
+
+
+class BuildManifestTests(TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.package_directory = self.temp_dir.name
+        self.feature_file = os.path.join(self.package_directory, 'TC-T9.feature')
+        self.module_file = os.path.join(self.package_directory, 'test_TC_T9_feature.py')
+
+        self.write(self.feature_file, 'Feature: original')
+        self.write(self.module_file, '# generated module')
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def recorded_manifest(self):
+        manifest = build_manifest.BuildManifest(self.package_directory)
+        manifest.record(self.feature_file, 'test_TC_T9_feature.py')
+        manifest.save()
+        return build_manifest.BuildManifest(self.package_directory)
+
+    def test_check_unknown_module(self):
+        "Prove a module missing from the manifest is unknown"
+
+        manifest = build_manifest.BuildManifest(self.package_directory)
+        self.assertEqual(manifest.check(self.feature_file, 'test_TC_T9_feature.py'),
+                         build_manifest.MODULE_UNKNOWN)
+
+    def test_check_fresh_module(self):
+        "Prove a saved manifest finds the unchanged module fresh"
+
+        manifest = self.recorded_manifest()
+        self.assertTrue(os.path.isfile(os.path.join(self.package_directory,
+                                                    build_manifest.BUILD_MANIFEST_FILENAME)))
+        self.assertEqual(manifest.check(self.feature_file, 'test_TC_T9_feature.py'),
+                         build_manifest.MODULE_FRESH)
+
+    def test_check_same_contents_new_mtime(self):
+        "Prove a re-downloaded Feature file with the same contents stays fresh"
+
+        manifest = self.recorded_manifest()
+        os.utime(self.feature_file, ns=(0, 0))
+        self.assertEqual(manifest.check(self.feature_file, 'test_TC_T9_feature.py'),
+                         build_manifest.MODULE_FRESH)
+
+    def test_check_stale_module(self):
+        "Prove a changed Feature file makes its module stale"
+
+        manifest = self.recorded_manifest()
+        self.write(self.feature_file, 'Feature: changed in JIRA')
+        self.assertEqual(manifest.check(self.feature_file, 'test_TC_T9_feature.py'),
+                         build_manifest.MODULE_STALE)
+
+    def test_check_modified_module(self):
+        "Prove a module edited by hand is never stale"
+
+        manifest = self.recorded_manifest()
+        self.write(self.feature_file, 'Feature: changed in JIRA')
+        self.write(self.module_file, '# implemented steps')
+        self.assertEqual(manifest.check(self.feature_file, 'test_TC_T9_feature.py'),
+                         build_manifest.MODULE_MODIFIED)
+
+    def test_load_corrupt_manifest(self):
+        "Prove a corrupt manifest starts over empty"
+
+        self.write(os.path.join(self.package_directory, build_manifest.BUILD_MANIFEST_FILENAME),
+                   '{not json')
+        manifest = build_manifest.BuildManifest(self.package_directory)
+        self.assertEqual(manifest.modules, {})
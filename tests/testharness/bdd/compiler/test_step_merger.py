@@ -0,0 +1,192 @@
+from unittest import TestCase, mock
+
+import os
+import tempfile
+
+from testharness.bdd.compiler import step_merger
+
+FEATURE_TEXT = """Feature:
+    Scenario Outline: Merge new steps
+
+        When User GETs endpoint <relative_url>
+        Then the response code is <status_code>
+        And the response time is under <max_ms> ms
+
+        Examples:
+                | relative_url | status_code | max_ms |
+                | /health      | 200         | 100    |
+"""
+
+IMPLEMENTED_MODULE = """# Feature File: merge.feature
+
+import unittest
+
+from morelia import run
+
+
+class FeatureTestCase(unittest.TestCase):
+
+    FEATURE_FILE = 'merge.feature'
+
+    def test_scenario_merge(self):
+        "BDD Scenario(s): merge.feature"
+        run(self.FEATURE_FILE, self, verbose=True)
+
+    def step_User_GETs_endpoint_relative_url(self, relative_url):
+        r'User GETs endpoint (.+)'
+        self.response = self.client.get(relative_url)
+
+    def step_status_code(self, status_code):
+        r'the response code is (\\d+|<status_code>)'
+        self.assertEqual(self.response.status_code, int(status_code))
+
+
+# Run this module directly.
+if __name__ == '__main__':
+    unittest.main()
+"""
+
+MERGED_MODULE = IMPLEMENTED_MODULE.replace("""        self.assertEqual(self.response.status_code, int(status_code))
+""", """        self.assertEqual(self.response.status_code, int(status_code))
+
+    def step_the_response_time_is_under_max_ms_ms(self, max_ms):
+        r'the response time is under (.+) ms'
+
+        raise NotImplementedError('the response time is under <max_ms> ms')
+""")
+
+
+MIXIN_MODULE = """# Feature File: merge.feature
+
+import unittest
+
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+
+
+class FeatureTestCase(unittest.TestCase, HttpGetRestApiBDDStepsMixin):
+
+    FEATURE_FILE = 'merge.feature'
+"""
+
+LOCAL_BASE_MODULE = """# Feature File: merge.feature
+
+import unittest
+
+import testharness.bdd.steps_mixins.common
+
+
+class StatusSteps(object):
+
+    def step_status_code(self, status_code):
+        r'the response code is (\\d+)'
+        self.assertEqual(self.response.status_code, int(status_code))
+
+
+class FeatureTestCase(unittest.TestCase, StatusSteps, testharness.bdd.steps_mixins.common.ResponseTimeMixin):
+
+    FEATURE_FILE = 'merge.feature'
+"""
+
+
+class StepMergerTests(TestCase):
+
+    maxDiff = None
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.feature_file = os.path.join(self.temp_dir.name, 'merge.feature')
+        self.module_path = os.path.join(self.temp_dir.name, 'test_merge_feature.py')
+        self.write(self.feature_file, FEATURE_TEXT)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def write(self, path, text):
+        with open(path, 'w') as f:
+            f.write(text)
+
+    def read_module(self):
+        with open(self.module_path) as f:
+            return f.read()
+
+    def test_merge_test_module(self):
+        "Prove only the missing step stub is appended to the TestCase class"
+
+        self.write(self.module_path, IMPLEMENTED_MODULE)
+
+        new_methods = step_merger.merge_test_module(self.feature_file, self.module_path)
+
+        self.assertEqual(new_methods, ['step_the_response_time_is_under_max_ms_ms'])
+        self.assertEqual(self.read_module(), MERGED_MODULE)
+
+    def test_merge_test_module_unchanged(self):
+        "Prove a module with every step is not rewritten"
+
+        self.write(self.module_path, MERGED_MODULE)
+        os.utime(self.module_path, ns=(0, 0))
+
+        self.assertEqual(step_merger.merge_test_module(self.feature_file, self.module_path), [])
+        self.assertEqual(os.stat(self.module_path).st_mtime_ns, 0)
+
+    def test_merge_test_module_at_end_of_file(self):
+        "Prove stubs are appended when the TestCase class ends the module"
+
+        module_text = IMPLEMENTED_MODULE.split('\n\n# Run this module')[0] + '\n'
+        self.write(self.module_path, module_text)
+
+        step_merger.merge_test_module(self.feature_file, self.module_path)
+
+        self.assertEqual(self.read_module(), MERGED_MODULE.split('\n\n# Run this module')[0] + '\n')
+
+    def test_merge_test_module_method_name_exists(self):
+        "Prove a stub never replaces an existing method of the same name"
+
+        module_text = IMPLEMENTED_MODULE.replace(
+            'def step_status_code(self, status_code):',
+            'def step_the_response_time_is_under_max_ms_ms(self, status_code):')
+        self.write(self.module_path, module_text)
+
+        with mock.patch('testharness.bdd.compiler.step_merger.print',
+                        return_value=None) as mock_print:
+            new_methods = step_merger.merge_test_module(self.feature_file, self.module_path)
+            self.assertEqual(len(mock_print.mock_calls), 1)
+
+        self.assertEqual(new_methods, [])
+        self.assertEqual(self.read_module(), module_text)
+
+    def test_merge_test_module_without_test_case(self):
+        self.write(self.module_path, 'import unittest\n')
+
+        with self.assertRaises(step_merger.StepMergeError):
+            step_merger.merge_test_module(self.feature_file, self.module_path)
+
+    def test_merge_test_module_with_mixin(self):
+        "Prove the steps inherited from a step mixin are not stubbed again"
+
+        self.write(self.module_path, MIXIN_MODULE)
+
+        self.assertEqual(step_merger.merge_test_module(self.feature_file, self.module_path), [])
+        self.assertEqual(self.read_module(), MIXIN_MODULE)
+
+    def test_merge_test_module_with_mixin_for_tc_t1(self):
+        self.write(self.module_path, MIXIN_MODULE)
+
+        self.assertEqual(step_merger.merge_test_module('tests/features/TC-T1.feature', self.module_path), [])
+
+    def test_merge_test_module_with_local_base_class(self):
+        "Prove the steps of a base class in the module, or imported by dotted name, count"
+
+        self.write(self.module_path, LOCAL_BASE_MODULE)
+
+        new_methods = step_merger.merge_test_module(self.feature_file, self.module_path)
+
+        self.assertEqual(new_methods, ['step_User_GETs_endpoint_relative_url'])
+
+    def test_merge_test_module_unknown_base_class(self):
+        module_text = MIXIN_MODULE.replace('HttpGetRestApiBDDStepsMixin)', 'HttpGetRestApiBDDStepsMixin, Missing)')
+        self.write(self.module_path, module_text)
+
+        with mock.patch('testharness.bdd.compiler.step_merger.print',
+                        return_value=None) as mock_print:
+            self.assertEqual(step_merger.merge_test_module(self.feature_file, self.module_path), [])
+            self.assertEqual(len(mock_print.mock_calls), 1)
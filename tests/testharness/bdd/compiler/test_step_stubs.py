@@ -0,0 +1,61 @@
+from unittest import TestCase
+
+from morelia.matchers import RegexpStepMatcher
+
+from testharness.bdd.compiler import step_stubs
+
+from tests.testharness.bdd.compiler.test_testcase_writer import TC_T1_TEST_CASE
+
+STEP_PREDICATES = [
+    'User GETs endpoint <relative_url>',
+    'User POSTs endpoint <relative_url> with <post_payload>',
+    'I enter "50" into the calculator',
+    'I add "2" and "3"  to get <total>',
+    "the user's name is \"Zoë\"",
+    'I press add',
+]
+
+
+class StepStubsTests(TestCase):
+
+    maxDiff = None
+
+    def test_step_method_matches_morelia_suggest(self):
+        "Prove step stubs are the same code morelia suggests for missing steps"
+
+        matcher = RegexpStepMatcher(None)
+        for predicate in STEP_PREDICATES:
+            self.assertEqual(step_stubs.get_step_method(predicate)[0],
+                             matcher.suggest(predicate)[0])
+
+    def test_get_step_arguments(self):
+        data = [
+            # (expected_arguments, predicate)
+            (['relative_url', 'post_payload'], 'User POSTs endpoint <relative_url> with <post_payload>'),
+            (['number'], 'I enter "50" into the calculator'),
+            (['number1', 'number2'], 'I add "2" and "3"'),
+            ([], 'I press add'),
+        ]
+
+        for expected_result, predicate in data:
+            self.assertEqual(step_stubs.get_step_arguments(predicate), expected_result)
+
+    def test_get_step_methods_unique_docstrings(self):
+        "Prove a repeated step becomes only one stub"
+
+        step_methods = step_stubs.get_step_methods([
+            'the response code is <status_code>',
+            'User GETs endpoint <relative_url>',
+            'the response code is <status_code>',
+        ])
+        self.assertEqual(list(step_methods.keys()), [
+            "r'the response code is (.+)'",
+            "r'User GETs endpoint (.+)'",
+        ])
+
+    def test_get_steps_lines(self):
+        "Prove the parsed Feature file writes the step stubs in step order"
+
+        steps_lines = step_stubs.get_steps_lines('tests/features/TC-T1.feature')
+        self.assertTrue(TC_T1_TEST_CASE.endswith(steps_lines))
+        self.assertTrue(steps_lines.startswith('\n    def step_User_GETs_endpoint_relative_url'))
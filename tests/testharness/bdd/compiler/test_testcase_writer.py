@@ -1,7 +1,10 @@
 from unittest import TestCase, mock
 
+import contextlib
+import io
 import os.path
 import sys
+import tempfile
 
 from testharness.bdd.compiler import testcase_writer
 
@@ -9,7 +12,7 @@ from testharness.bdd.compiler import testcase_writer
 TC_T1_TEST_CASE = """
 import unittest
 
-from morelia import run
+from testharness.bdd.runner.feature import run
 
 
 class FeatureTestCase(unittest.TestCase):
@@ -122,11 +125,56 @@ class CompilerTestCaseWriterTests(TestCase):
 
                     self.assertTrue(result)
                     self.assertEqual(mock_print.mock_calls[0:2], [
-                        mock.call('Compiling Feature: {}...\n\n'.format(
-                            testcase_writer.BDDTestCaseWriter.FEATURE_FILE), file=sys.stderr),
+                        mock.call('Compiling Feature: {}...\n\n'.format(feature_file), file=sys.stderr),
                         mock.call('# Feature File: tests/features/TC-T2.feature', file=mock_bdd_file()),
                     ])
 
+    def test_compile_function_backends_write_same_module(self):
+        "Prove the ast and morelia compiler backends write the same test module"
+
+        feature_file = 'tests/features/TC-T1.feature'
+        modules = []
+
+        for backend in testcase_writer.COMPILER_BACKENDS:
+            with mock.patch('testharness.bdd.compiler.testcase_writer.os.path.isfile',
+                            return_value=False):
+                with mock.patch('testharness.bdd.compiler.testcase_writer.open',
+                                mock.mock_open()) as mock_bdd_file:
+                    with mock.patch('testharness.bdd.compiler.testcase_writer.print',
+                                    return_value=None) as mock_print:
+                        result = testcase_writer.compile(feature_file, 'test', backend=backend)
+
+                        self.assertTrue(result)
+                        self.assertEqual(mock_print.mock_calls[2],
+                                         mock.call(mock.ANY, file=mock_bdd_file()))
+                        modules.append(mock_print.mock_calls[2][1][0])
+
+        self.assertEqual(modules, [TC_T1_TEST_CASE, TC_T1_TEST_CASE])
+
+    def test_compile_function_split_rows(self):
+        "Prove split_rows writes one test method per Examples row"
+
+        with tempfile.TemporaryDirectory() as package_directory:
+            with contextlib.redirect_stderr(io.StringIO()):
+                result = testcase_writer.compile('tests/features/TC-T1.feature', 'test',
+                                                 package_directory, split_rows=True)
+            with open(os.path.join(package_directory, 'test_TC_T1_feature.py')) as f:
+                module_source = f.read()
+
+        self.assertTrue(result)
+        self.assertNotIn('def test_scenario_TC_T1(self):', module_source)
+        for row in range(3):
+            self.assertIn(
+                '    def test_row_{row}_scenario_TC_T1(self):\n'
+                '        "BDD Scenario row {row}: Show OSSCWL Servers that are available"\n'
+                '        run(self.FEATURE_FILE, self, verbose=True, row={row})\n'.format(row=row),
+                module_source)
+        self.assertIn(TC_T1_TEST_CASE[TC_T1_TEST_CASE.index('\n    def step_'):], module_source)
+
+    def test_compile_function_invalid_backend(self):
+        with self.assertRaises(ValueError):
+            testcase_writer.compile('tests/features/TC-T1.feature', 'test', backend='fake')
+
     def test_compile_function_bdd_module_exists(self):
         feature_file = 'tests/features/TC-T2.feature'
         testing_prefix = 'test'
@@ -143,3 +191,123 @@ class CompilerTestCaseWriterTests(TestCase):
                 mock_print.assert_called_once_with(
                     'Cannot compile new feature file, "{}" already exists.\n'.format(
                         expected_bdd_filename), file=sys.stderr)
+
+
+class CompilerBatchTests(TestCase):
+
+    def test_compile_summary(self):
+        "Prove CompileSummary tallies each Feature file status"
+
+        summary = testcase_writer.CompileSummary()
+        summary.tally('a.feature', testcase_writer.COMPILE_CREATED)
+        summary.tally('b.feature', testcase_writer.COMPILE_SKIPPED)
+        self.assertTrue(summary.ok)
+
+        summary.tally('c.feature', testcase_writer.COMPILE_FAILED)
+        self.assertFalse(summary.ok)
+        self.assertEqual(list(summary.results.keys()), ['a.feature', 'b.feature', 'c.feature'])
+        self.assertEqual(str(summary), 'created=1, merged=0, unchanged=0, skipped=1, failed=1')
+
+    def test_get_feature_files(self):
+        "Prove get_feature_files() expands a directory of Feature files"
+
+        self.assertEqual(testcase_writer.get_feature_files('tests/features'), [
+            'tests/features/TC-T1.feature',
+            'tests/features/TC-T2.feature',
+        ])
+        self.assertEqual(testcase_writer.get_feature_files('tests/features/TC-T1.feature'),
+                         ['tests/features/TC-T1.feature'])
+
+    def test_compile_many_worker_failure(self):
+        "Prove compile_many() marks a Feature file failed when its worker raises"
+
+        with mock.patch('testharness.bdd.compiler.testcase_writer._compile_feature',
+                        side_effect=[testcase_writer.COMPILE_CREATED, OSError('disk full')]):
+            with mock.patch('testharness.bdd.compiler.testcase_writer.print',
+                            return_value=None):
+                summary = testcase_writer.compile_many(['a.feature', 'b.feature'], jobs=1)
+
+        self.assertEqual(summary.results, {
+            'a.feature': testcase_writer.COMPILE_CREATED,
+            'b.feature': testcase_writer.COMPILE_FAILED,
+        })
+
+    def test_compile_many_process_pool(self):
+        "Prove compile_many() writes every test module from worker processes"
+
+        with tempfile.TemporaryDirectory() as package_directory:
+            summary = testcase_writer.compile_many(
+                testcase_writer.get_feature_files('tests/features'),
+                'test', package_directory, jobs=2)
+
+            self.assertEqual(summary.counters, {
+                testcase_writer.COMPILE_CREATED: 2,
+                testcase_writer.COMPILE_MERGED: 0,
+                testcase_writer.COMPILE_UNCHANGED: 0,
+                testcase_writer.COMPILE_SKIPPED: 0,
+                testcase_writer.COMPILE_FAILED: 0,
+            })
+            self.assertEqual(sorted(os.listdir(package_directory)),
+                             ['test_TC_T1_feature.py', 'test_TC_T2_feature.py'])
+
+    def test_compile_many_build_cache(self):
+        "Prove compile_many() skips unchanged modules and rebuilds stale ones"
+
+        with tempfile.TemporaryDirectory() as package_directory:
+            feature_file = os.path.join(package_directory, 'TC-T1.feature')
+            with open('tests/features/TC-T1.feature') as f:
+                feature_text = f.read()
+            with open(feature_file, 'w') as f:
+                f.write(feature_text)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                       jobs=1, build_cache=True)
+                self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_CREATED)
+
+                with mock.patch('testharness.bdd.compiler.step_stubs.get_steps_lines') as mock_stubs:
+                    summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                           jobs=1, build_cache=True)
+                    self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_UNCHANGED)
+                    mock_stubs.assert_not_called()
+
+                # A new step makes the module stale.
+                with open(feature_file, 'a') as f:
+                    f.write('\n        And the response is cached')
+                summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                       jobs=1, build_cache=True)
+                self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_CREATED)
+
+            with open(os.path.join(package_directory, 'test_TC_T1_feature.py')) as f:
+                self.assertIn('def step_the_response_is_cached(self):', f.read())
+
+    def test_compile_many_merge(self):
+        "Prove compile_many() merges new steps into an existing module"
+
+        with tempfile.TemporaryDirectory() as package_directory:
+            feature_file = os.path.join(package_directory, 'TC-T1.feature')
+            with open('tests/features/TC-T1.feature') as f:
+                feature_text = f.read()
+            with open(feature_file, 'w') as f:
+                f.write(feature_text)
+
+            with contextlib.redirect_stderr(io.StringIO()):
+                summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                       jobs=1, merge=True)
+                self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_CREATED)
+
+                summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                       jobs=1, merge=True)
+                self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_UNCHANGED)
+
+                with open(feature_file, 'a') as f:
+                    f.write('\n        And the response is cached')
+                summary = testcase_writer.compile_many([feature_file], 'test', package_directory,
+                                                       jobs=1, merge=True)
+                self.assertEqual(summary.results[feature_file], testcase_writer.COMPILE_MERGED)
+
+            with open(os.path.join(package_directory, 'test_TC_T1_feature.py')) as f:
+                module_text = f.read()
+            self.assertEqual(module_text.count('def step_'), 5)
+            self.assertTrue(module_text.endswith(
+                "        raise NotImplementedError('the response is cached')\n"))
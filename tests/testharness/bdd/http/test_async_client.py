@@ -0,0 +1,135 @@
+from unittest import TestCase
+
+import asyncio
+import json
+import ssl
+import threading
+
+from testharness.bdd.http import async_client
+from testharness.bdd.http.async_client import AsyncPooledHttpClient
+from testharness.bdd.http.client import encode_post_data
+
+from .test_client import EchoHandler, QuietHTTPServer
+
+
+class AsyncPooledHttpClientTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = QuietHTTPServer(('127.0.0.1', 0), EchoHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:{}/api/'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def run_async(self, coroutine):
+        async def run_and_close():
+            try:
+                return await coroutine
+            finally:
+                async_client.close_async_connection_pools()
+        return asyncio.run(run_and_close())
+
+    def test_get_and_post(self):
+        "Prove get() and post() are coroutines that return the response status, headers and JSON"
+
+        async def requests():
+            client = AsyncPooledHttpClient(self.base_url)
+            return (await client.get('swagger.json?v=1'), await client.post('/osscwl/view', {'user': 'guest'}))
+
+        (get_response, post_response) = self.run_async(requests())
+
+        self.assertEqual(get_response.status_code, 200)
+        self.assertEqual(get_response.headers.get('content-type'), 'application/json')
+        self.assertEqual(get_response.json(), {'method': 'GET', 'path': '/api/swagger.json?v=1'})
+        self.assertEqual(post_response.status_code, 201)
+        self.assertEqual(json.loads(post_response.json()['body']), {'user': 'guest'})
+        self.assertEqual(post_response.json()['content_type'], 'application/json')
+
+    def test_connection_pool_per_ssl_context(self):
+        ssl_context = ssl.create_default_context()
+
+        async def pools():
+            return (AsyncPooledHttpClient('https://example.com').pool,
+                    AsyncPooledHttpClient('https://example.com', ssl_context=ssl_context).pool)
+
+        (default_pool, pool) = self.run_async(pools())
+
+        self.assertIsNot(pool, default_pool)
+        self.assertIs(pool.ssl_context, ssl_context)
+
+    def test_headers_sent_once(self):
+        "Prove a caller's lowercase host, content-length and content-type replace the defaults"
+
+        async def request():
+            client = AsyncPooledHttpClient(self.base_url, headers={'X-Trace': 'a', 'Accept': 'text/plain'})
+            return await client.post('echo', b'{"a": 1}', headers={
+                'host': '127.0.0.1', 'content-length': '8', 'content-type': 'text/json', 'accept': '*/*'})
+
+        echo = self.run_async(request()).json()
+
+        self.assertEqual(sorted(echo['header_names']),
+                         ['accept', 'content-length', 'content-type', 'host', 'x-trace'])
+        self.assertEqual((echo['body'], echo['content_type']), ('{"a": 1}', 'text/json'))
+        self.assertEqual(async_client.merge_headers({'Accept': 'a'}, None, {'accept': 'b'}),
+                         {'accept': ('accept', 'b')})
+        self.assertEqual(encode_post_data({'a': 1}, {'content-type': 'text/json'})[1], {'content-type': 'text/json'})
+
+    def test_keep_alive_pool(self):
+        "Prove requests on one event loop reuse a keep-alive connection"
+
+        async def requests():
+            client = AsyncPooledHttpClient(self.base_url)
+            for x in range(3):
+                await AsyncPooledHttpClient(self.base_url).get('swagger.json')
+            return client.pool
+
+        pool = self.run_async(requests())
+
+        self.assertEqual(pool.connections_created, 1)
+        self.assertEqual(pool.connections_reused, 2)
+
+    def test_concurrent_requests(self):
+        "Prove requests gathered on one event loop wait at the same time"
+
+        async def requests():
+            client = AsyncPooledHttpClient(self.base_url)
+            responses = await asyncio.gather(*(client.get('slow') for x in range(5)))
+            return (responses, client.pool)
+
+        (responses, pool) = self.run_async(requests())
+
+        self.assertEqual([response.status_code for response in responses], [200] * 5)
+        self.assertEqual(pool.connections_created, 5)
+        self.assertLess(max(response.elapsed for response in responses), 1.2)
+
+    def test_stale_connection_retried(self):
+        "Prove a kept connection the server closed is replaced and the request sent again"
+
+        async def requests():
+            client = AsyncPooledHttpClient(self.base_url)
+            await client.post('close_after', 'first')
+            await asyncio.sleep(0.05)
+            return (await client.get('swagger.json'), client.pool)
+
+        (response, pool) = self.run_async(requests())
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(pool.connections_created, 2)
+
+    def test_timeout(self):
+        async def request():
+            await AsyncPooledHttpClient(self.base_url, timeout=0.05).get('slow')
+
+        with self.assertRaises(asyncio.TimeoutError):
+            self.run_async(request())
+
+    def test_other_origin(self):
+        async def request():
+            await AsyncPooledHttpClient(self.base_url).get('http://example.com/')
+
+        with self.assertRaises(ValueError):
+            self.run_async(request())
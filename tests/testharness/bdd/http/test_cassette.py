@@ -0,0 +1,221 @@
+from unittest import TestCase, mock
+
+import asyncio
+import http.client
+import json
+import os
+import shutil
+import tempfile
+import threading
+
+from testharness.bdd.http import cassette
+from testharness.bdd.http.cassette import (
+    CASSETTE_MODE_ENV,
+    AsyncCassetteClient,
+    CassetteClient,
+    CassetteMissError
+)
+from testharness.bdd.http.client import HttpResponse, PooledHttpClient
+from testharness.bdd.loader_mixins.cache import DataFileCache
+from testharness.bdd.loader_mixins.common import DataFileError
+from testharness.bdd.runner import feature
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+
+from .test_client import EchoHandler, QuietHTTPServer
+from ..runner.test_feature import RESPONSE_FIELDS
+
+
+class CountingClient(object):
+    "Fake HTTP client that answers each GET with a new count."
+
+    def __init__(self):
+        self.count = 0
+
+    def get(self, relative_url):
+        self.count += 1
+        headers = http.client.HTTPMessage()
+        headers['Content-Type'] = 'application/json'
+        if relative_url == '/osscwl':
+            return HttpResponse(relative_url, 404, 'Not Found', headers, b'{"message": null}', 0.01)
+        content = json.dumps(dict.fromkeys(RESPONSE_FIELDS.get(relative_url, 'count').split(','), self.count))
+        return HttpResponse(relative_url, 200, 'OK', headers, content.encode('utf-8'), 0.01)
+
+
+class CassetteFeatureTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by CassetteClientTests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+    cassette_mode = 'replay'
+    live_client = None
+
+    def setUp(self):
+        self.client = CassetteClient(self.FEATURE_FILE, self.live_client, mode=self.cassette_mode)
+
+    def test_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self)
+
+
+class CassetteClientTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = QuietHTTPServer(('127.0.0.1', 0), EchoHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:{}/api/'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.feature_file = os.path.join(self.temp_dir, 'features', 'TC-T9.feature')
+        self.cassette_path = os.path.join(self.temp_dir, 'features', 'data', 'TC-T9', 'cassette.jsonl')
+
+        patcher = mock.patch.object(cassette, 'data_file_cache', DataFileCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_record_and_replay(self):
+        "Prove a recorded exchange replays the same response, without the server"
+
+        recorder = CassetteClient(self.feature_file, PooledHttpClient(self.base_url), mode='record')
+        recorded_get = recorder.get('swagger.json?v=1')
+        recorded_post = recorder.post('osscwl/view', {'user': 'guest'})
+        self.assertTrue(os.path.isfile(self.cassette_path))
+
+        player = CassetteClient(self.feature_file)
+        self.assertEqual(player.mode, 'replay')
+
+        response = player.get('swagger.json?v=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get('content-type'), 'application/json')
+        self.assertEqual(response.content, recorded_get.content)
+        self.assertEqual(response.json(), {'method': 'GET', 'path': '/api/swagger.json?v=1'})
+
+        response = player.post('osscwl/view', {'user': 'guest'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), recorded_post.json())
+
+        with self.assertRaises(CassetteMissError):
+            player.post('osscwl/view', {'user': 'admin'})  # The body is matched too.
+        with self.assertRaises(CassetteMissError):
+            player.get('swagger.json')
+
+    def test_replay_repeated_requests(self):
+        "Prove the same request replays its responses in order, then the last one"
+
+        recorder = CassetteClient(self.feature_file, CountingClient(), mode='record')
+        for x in range(2):
+            recorder.get('/count')
+
+        player = CassetteClient(self.feature_file, mode='replay')
+        self.assertEqual([player.get('/count').json()['count'] for x in range(3)], [1, 2, 2])
+
+        self.assertEqual(CassetteClient(self.feature_file).get('/count').json()['count'], 1)
+
+    def test_replay_index_cached(self):
+        "Prove the cassette file is read once for every client"
+
+        CassetteClient(self.feature_file, CountingClient(), mode='record').get('/count')
+
+        with mock.patch.object(cassette, 'read_cassette', wraps=cassette.read_cassette) as read_cassette:
+            for x in range(3):
+                CassetteClient(self.feature_file).get('/count')
+        self.assertEqual(read_cassette.call_count, 1)
+
+    def test_record_appends(self):
+        "Prove clients recording the same cassette, e.g. in parallel processes, keep each other's exchanges"
+
+        CassetteClient(self.feature_file, CountingClient(), mode='record').get('/count')
+        CassetteClient(self.feature_file, CountingClient(), mode='record').get('/other')
+
+        player = CassetteClient(self.feature_file)
+        self.assertEqual(player.get('/count').status_code, 200)
+        self.assertEqual(player.get('/other').status_code, 200)
+
+    def test_start_recording(self):
+        "Prove start_recording() empties the cassette for a new recording"
+
+        cassette.start_recording(self.feature_file)  # No cassette yet.
+        CassetteClient(self.feature_file, CountingClient(), mode='record').get('/count')
+
+        cassette.start_recording(self.feature_file)
+        self.assertFalse(os.path.exists(self.cassette_path))
+        CassetteClient(self.feature_file, CountingClient(), mode='record').get('/other')
+
+        with self.assertRaises(CassetteMissError):
+            CassetteClient(self.feature_file).get('/count')
+        self.assertEqual(CassetteClient(self.feature_file).get('/other').status_code, 200)
+
+    def test_live(self):
+        client = CassetteClient(self.feature_file, CountingClient())
+
+        self.assertEqual(client.mode, 'live')
+        self.assertEqual(client.get('/count').status_code, 200)
+        self.assertFalse(os.path.exists(self.cassette_path))
+
+    def test_mode_env(self):
+        with mock.patch.dict(os.environ, {CASSETTE_MODE_ENV: 'record'}):
+            self.assertEqual(CassetteClient(self.feature_file, CountingClient()).mode, 'record')
+            with self.assertRaises(ValueError):
+                CassetteClient(self.feature_file)  # Nothing to record.
+
+        with self.assertRaises(ValueError):
+            CassetteClient(self.feature_file, mode='rewind')
+
+    def test_corrupt_cassette(self):
+        os.makedirs(os.path.dirname(self.cassette_path))
+        with open(self.cassette_path, 'w') as f:
+            f.write('{"method": "GET"}\n')
+
+        with self.assertRaises(DataFileError):
+            CassetteClient(self.feature_file).get('/count')
+
+    def test_request_key_json_backend(self):
+        "Prove a JSON body has the same key whatever JSON backend encodes it"
+
+        from testharness.bdd.http import client as client_module
+        from testharness.bdd.json_codec import JSONCodec, get_installed_backends
+
+        data = {'user': 'guest', 'id': 1.5, 'name': '\u00e9', 'rows': [{'b': 2, 'a': 1}]}
+        keys = set()
+        for backend in get_installed_backends():
+            with mock.patch.object(client_module, 'json_codec', JSONCodec(backend)):
+                keys.add(cassette.get_request_key('post', '/osscwl/view', data))
+        keys.add(cassette.get_request_key('POST', '/osscwl/view', json.loads(json.dumps(data, sort_keys=True))))
+
+        self.assertEqual(len(keys), 1)
+        self.assertNotEqual(keys.pop(), cassette.get_request_key('POST', '/osscwl/view', {'user': 'admin'}))
+        self.assertEqual(cassette.get_request_key('GET', '/a'), ('GET', '/a', ''))
+
+    def test_async_replay(self):
+        "Prove the async cassette client records and replays with coroutines"
+
+        class AsyncCountingClient(CountingClient):
+            async def get(self, relative_url):
+                return CountingClient.get(self, relative_url)
+
+        async def requests():
+            await AsyncCassetteClient(self.feature_file, AsyncCountingClient(), mode='record').get('/count')
+            return await AsyncCassetteClient(self.feature_file).get('/count')
+
+        self.assertEqual(asyncio.run(requests()).json(), {'count': 1})
+
+    def test_replay_feature(self):
+        "Prove a Feature recorded once replays as a unit-stage test"
+
+        feature_file = os.path.join(self.temp_dir, 'features', 'TC-T1.feature')
+        os.makedirs(os.path.dirname(feature_file))
+        shutil.copy(CassetteFeatureTestCase.FEATURE_FILE, feature_file)
+
+        with mock.patch.multiple(CassetteFeatureTestCase, FEATURE_FILE=feature_file,
+                                 cassette_mode='record', live_client=CountingClient()):
+            result = CassetteFeatureTestCase('test_scenario_TC_T1').run()
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+
+        with mock.patch.object(CassetteFeatureTestCase, 'FEATURE_FILE', feature_file):
+            result = CassetteFeatureTestCase('test_scenario_TC_T1').run()
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
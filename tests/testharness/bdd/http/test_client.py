@@ -0,0 +1,177 @@
+from unittest import TestCase
+
+import json
+import socket
+import ssl
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from testharness.bdd.http import client as client_module
+from testharness.bdd.http.client import ConnectionPool, PooledHttpClient, get_request_target
+
+
+class EchoHandler(BaseHTTPRequestHandler):
+    "Echo each request back as JSON, over HTTP/1.1 keep-alive."
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.endswith('/slow'):
+            time.sleep(0.3)
+        self.reply(200, {'method': 'GET', 'path': self.path})
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.reply(201, {'method': 'POST', 'path': self.path, 'body': body.decode('utf-8'),
+                         'content_type': self.headers.get('Content-Type'),
+                         'header_names': [name.lower() for name in self.headers.keys()]})
+        if self.path.endswith('/close_after'):
+            self.close_connection = True  # Close without telling the client.
+
+    def reply(self, status, payload):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class QuietHTTPServer(ThreadingHTTPServer):
+    "Ignore clients that hang up, e.g. after a timeout."
+
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class PooledHttpClientTests(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = QuietHTTPServer(('127.0.0.1', 0), EchoHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base_url = 'http://127.0.0.1:{}/api/'.format(cls.server.server_port)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        # Each test gets fresh pools.
+        client_module.close_connection_pools()
+        client_module._pools.clear()
+
+    def test_get_and_post(self):
+        "Prove get() and post() return the response status, headers and JSON"
+
+        client = PooledHttpClient(self.base_url)
+
+        response = client.get('swagger.json?v=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get('content-type'), 'application/json')
+        self.assertEqual(response.json(), {'method': 'GET', 'path': '/api/swagger.json?v=1'})
+
+        response = client.post('/osscwl/view', {'user': 'guest'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(json.loads(response.json()['body']), {'user': 'guest'})
+        self.assertEqual(response.json()['content_type'], 'application/json')
+
+        response = client.post('upload', memoryview(b'raw bytes'), headers={'Content-Type': 'text/plain'})
+        self.assertEqual(response.json()['body'], 'raw bytes')
+        self.assertEqual(response.json()['content_type'], 'text/plain')
+
+    def test_keep_alive_pool_shared(self):
+        "Prove every client for an origin shares one keep-alive connection"
+
+        clients = [PooledHttpClient(self.base_url) for n in range(3)]
+        for n in range(5):
+            for client in clients:
+                client.get('ping')
+
+        self.assertIs(clients[0].pool, clients[2].pool)
+        self.assertEqual(clients[0].pool.connections_created, 1)
+        self.assertEqual(clients[0].pool.connections_reused, 14)
+
+    def test_pool_size(self):
+        "Prove the pool keeps at most pool_size idle connections"
+
+        client = PooledHttpClient(self.base_url, pool_size=2)
+        barrier = threading.Barrier(4)
+
+        def get():
+            barrier.wait()
+            client.get('slow')
+
+        threads = [threading.Thread(target=get) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(client.pool.connections_created, 4)
+        self.assertEqual(len(client.pool._idle), 2)
+
+    def test_stale_connection_retried(self):
+        "Prove a kept connection the server closed is replaced once"
+
+        client = PooledHttpClient(self.base_url)
+        client.post('close_after', 'x')
+        time.sleep(0.1)
+
+        self.assertEqual(client.get('again').status_code, 200)
+        self.assertEqual(client.pool.connections_created, 2)
+
+    def test_timeout(self):
+        client = PooledHttpClient(self.base_url, timeout=0.1)
+
+        with self.assertRaises(socket.timeout):
+            client.get('slow')
+        self.assertEqual(len(client.pool._idle), 0)
+
+    def test_bad_base_url(self):
+        with self.assertRaises(ValueError):
+            PooledHttpClient('ftp://example.com/')
+
+        with self.assertRaises(ValueError):
+            PooledHttpClient(self.base_url).get('http://example.com/elsewhere')
+
+    def test_request_target_port(self):
+        "Prove an absolute URL is on the base URL only with the same port, default the scheme's"
+
+        self.assertEqual(get_request_target('http://example.com/v1/', 'http://example.com:80/a?b=1',
+                                            'http', 'example.com', 80),
+                         ('http://example.com:80/a?b=1', '/a?b=1'))
+        self.assertEqual(get_request_target('https://example.com/', 'https://example.com/a',
+                                            'https', 'example.com', 443)[1], '/a')
+
+        with self.assertRaises(ValueError):
+            get_request_target('http://example.com/', 'http://example.com:8080/a', 'http', 'example.com', 80)
+        with self.assertRaises(ValueError):
+            get_request_target('https://example.com:8443/', 'https://example.com/a', 'https', 'example.com', 8443)
+
+    def test_connection_pool_per_ssl_context(self):
+        "Prove a client with its own SSL context never shares another client's pool"
+
+        ssl_context = ssl.create_default_context()
+        ssl_context.check_hostname = False
+        ssl_context.verify_mode = ssl.CERT_NONE
+
+        default_pool = PooledHttpClient('https://example.com').pool
+        pool = PooledHttpClient('https://example.com', ssl_context=ssl_context).pool
+
+        self.assertIsNot(pool, default_pool)
+        self.assertIs(pool.ssl_context, ssl_context)
+        self.assertIsNone(default_pool.ssl_context)
+        self.assertIs(PooledHttpClient('https://example.com/v2/', ssl_context=ssl_context).pool, pool)
+
+    def test_connection_pool_https(self):
+        pool = ConnectionPool('https', 'example.com', 443)
+        self.assertEqual((pool.scheme, pool.port, pool.pool_size), ('https', 443, 10))
@@ -0,0 +1,173 @@
+from unittest import TestCase, mock
+
+import os
+import random
+import shutil
+import tempfile
+
+from testharness.bdd.http import client as client_module
+from testharness.bdd.http import latency
+from testharness.bdd.http import mock_server
+from testharness.bdd.http.client import PooledHttpClient
+from testharness.bdd.http.latency import (
+    LatencyHistogram,
+    LatencyHistograms,
+    load_latency_histograms,
+    write_latency_histograms
+)
+from testharness.bdd.http.mock_server import get_mock_server
+from testharness.bdd.steps_mixins import common
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+
+
+class SLOTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by ResponseTimeStepsTests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+
+    def setUp(self):
+        self.client = PooledHttpClient(get_mock_server(self.FEATURE_FILE).base_url)
+
+    def runTest(self):
+        pass
+
+
+class LatencyHistogramTests(TestCase):
+
+    def test_percentiles(self):
+        "Prove each percentile is within 1% of the exact value"
+
+        samples = [random.uniform(0.0005, 2.0) for x in range(10000)]
+        histogram = LatencyHistogram()
+        for sample in samples:
+            histogram.record(sample)
+
+        samples.sort()
+        self.assertEqual(histogram.total_count, 10000)
+        for pct in (50, 90, 95, 99, 99.9):
+            exact = samples[int(-(-len(samples) * pct // 100)) - 1]
+            self.assertAlmostEqual(histogram.percentile(pct), exact, delta=exact * 0.01)
+        self.assertAlmostEqual(histogram.max, samples[-1], places=6)
+        self.assertAlmostEqual(histogram.min, samples[0], places=6)
+        self.assertAlmostEqual(histogram.mean, sum(samples) / len(samples), places=5)
+        self.assertEqual(histogram.percentile(100), histogram.max)
+        self.assertLess(len(histogram.counts), 1500)
+
+    def test_small_values(self):
+        histogram = LatencyHistogram()
+        for microseconds in range(0, 200):
+            histogram.record(microseconds / 1000000.0)
+
+        self.assertEqual(histogram.percentile(50), 0.000099)  # Exact under 256 microseconds.
+        self.assertEqual(LatencyHistogram().percentile(95), 0.0)
+
+    def test_merge(self):
+        "Prove merged histograms equal one histogram of every value"
+
+        first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for x in range(1, 1001):
+            (first if x % 2 else second).record(x / 1000.0)
+            both.record(x / 1000.0)
+
+        first.merge(second)
+
+        self.assertEqual(first.to_dict(), both.to_dict())
+        with self.assertRaises(ValueError):
+            first.merge(LatencyHistogram(3))
+        with self.assertRaises(ValueError):
+            LatencyHistogram(6)
+
+    def test_sidecar_file(self):
+        "Prove each process's line is merged on load"
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        histograms_filename = os.path.join(temp_dir, 'latency.jsonl')
+
+        for process in range(3):
+            histograms = LatencyHistograms()
+            for x in range(100):
+                histograms.record('GET /a', 0.010)
+            histograms.record('POST /b', 0.500 + process)
+            write_latency_histograms(histograms_filename, histograms)
+        write_latency_histograms(histograms_filename, LatencyHistograms())  # No line.
+
+        with open(histograms_filename) as f:
+            self.assertEqual(len(f.readlines()), 3)
+        histograms = load_latency_histograms(histograms_filename)
+
+        self.assertEqual(histograms.get('GET /a').total_count, 300)
+        self.assertAlmostEqual(histograms.get('GET /a').percentile(95), 0.010, delta=0.0001)
+        self.assertEqual(histograms.get('POST /b').max, 2.5)
+        self.assertIsNone(histograms.get('GET /c'))
+
+    def test_write_at_exit(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        histograms_filename = os.path.join(temp_dir, 'latency.jsonl')
+        histograms = LatencyHistograms()
+        histograms.record('GET /a', 0.010)
+
+        with mock.patch.object(latency, 'latency_histograms', histograms), \
+                mock.patch.dict(os.environ, {latency.LATENCY_HISTOGRAMS_ENV: histograms_filename}):
+            latency._write_at_exit()
+
+        self.assertEqual(load_latency_histograms(histograms_filename).get('GET /a').total_count, 1)
+
+
+class ResponseTimeStepsTests(TestCase):
+
+    def setUp(self):
+        self.histograms = LatencyHistograms()
+        patcher = mock.patch.object(common, 'latency_histograms', self.histograms)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(mock_server.stop_mock_servers)
+        self.addCleanup(client_module.close_connection_pools)
+        self.suite = SLOTestCase()
+        self.suite.setUp()
+
+    def test_request_is_timed(self):
+        "Prove each GET is timed, and recorded in its request's histogram"
+
+        for x in range(3):
+            self.suite.step_User_GETs_endpoint_relative_url('/osscwl/servers')
+
+        self.assertGreater(self.suite.response_time, 0)
+        self.assertEqual(self.suite.response_request, 'GET /osscwl/servers')
+        self.assertEqual(self.histograms.get('GET /osscwl/servers').total_count, 3)
+
+    def test_request_name_without_query(self):
+        "Prove the rows of an Outline that differ only in the query share a histogram"
+
+        for relative_url in ('/osscwl/servers?page=1', '/osscwl/servers?page=2', '/osscwl/servers'):
+            self.suite.step_User_GETs_endpoint_relative_url(relative_url)
+
+        self.assertEqual(self.suite.response_request, 'GET /osscwl/servers')
+        self.assertEqual(list(self.histograms.to_dict()), ['GET /osscwl/servers'])
+        self.assertEqual(self.histograms.get('GET /osscwl/servers').total_count, 3)
+
+    def test_response_time_name_override(self):
+        self.suite.get_response_time_name = lambda method, relative_url: 'osscwl'
+
+        self.suite.step_User_GETs_endpoint_relative_url('/osscwl/servers')
+        self.suite.step_User_GETs_endpoint_relative_url('/osscwl')
+
+        self.assertEqual(self.histograms.get('osscwl').total_count, 2)
+
+    def test_response_time_steps(self):
+        self.suite.step_User_GETs_endpoint_relative_url('/osscwl/servers')
+
+        self.suite.step_the_response_time_is_under_max_ms_ms('10000')
+        self.suite.step_the_pct_response_time_is_under_max_ms_ms('95', '10000')
+
+        self.suite.response_time = 0.250
+        with self.assertRaises(AssertionError) as cm:
+            self.suite.step_the_response_time_is_under_max_ms_ms('200')
+        self.assertIn('GET /osscwl/servers took 250.0 ms', str(cm.exception))
+
+        for x in range(10):
+            self.histograms.record('GET /osscwl/servers', 0.300)
+        with self.assertRaises(AssertionError) as cm:
+            self.suite.step_the_pct_response_time_is_under_max_ms_ms('95', '200')
+        self.assertIn('GET /osscwl/servers p95 is 300.0 ms over 11 requests', str(cm.exception))
@@ -0,0 +1,111 @@
+from unittest import TestCase
+
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from testharness.bdd.http import client as client_module
+from testharness.bdd.http import mock_server
+from testharness.bdd.http.client import PooledHttpClient
+from testharness.bdd.http.mock_server import MockRestServer, get_mock_server
+from testharness.bdd.loader_mixins.common import DataFileError
+from testharness.bdd.runner import feature
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+from testharness.bdd.steps_mixins.post_rest_api_common import HttpPostRestApiBDDStepsMixin
+
+
+class MockGetFeatureTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by MockRestServerTests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+    ROW_CONCURRENCY = 3
+
+    def setUp(self):
+        self.client = PooledHttpClient(get_mock_server(self.FEATURE_FILE).base_url)
+
+    def test_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self)
+
+
+class MockPostFeatureTestCase(TestCase, HttpPostRestApiBDDStepsMixin):
+
+    __test__ = False
+    FEATURE_FILE = 'tests/features/TC-T2.feature'
+
+    def setUp(self):
+        self.client = PooledHttpClient(get_mock_server(self.FEATURE_FILE).base_url)
+
+    def test_scenario_TC_T2(self):
+        feature.run(self.FEATURE_FILE, self)
+
+
+class MockRestServerTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(mock_server.stop_mock_servers)
+        self.addCleanup(client_module.close_connection_pools)
+
+    def test_get_feature(self):
+        "Prove the GET outline runs its rows at the same time against the mock server"
+
+        result = MockGetFeatureTestCase('test_scenario_TC_T1').run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(get_mock_server(MockGetFeatureTestCase.FEATURE_FILE).requests_served, 3)
+
+    def test_post_feature(self):
+        "Prove the POST outline gets its response from a body_file"
+
+        result = MockPostFeatureTestCase('test_scenario_TC_T2').run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+
+    def test_shared_server(self):
+        server = get_mock_server('tests/features/TC-T1.feature')
+
+        self.assertIs(get_mock_server('./tests/features/TC-T1.feature'), server)
+        self.assertIsNot(get_mock_server('tests/features/TC-T2.feature'), server)
+
+    def test_routes(self):
+        "Prove routes match on method and path, with or without the query"
+
+        server = MockRestServer()
+        server.add_route('GET', '/orders', body=[1, 2])
+        server.add_route('GET', '/orders?page=2', body=[3])
+        server.add_route('DELETE', '/orders/1', status=204, headers={'X-Deleted': '1'})
+
+        start = time.perf_counter()
+        with server:
+            start_time = time.perf_counter() - start
+            client = PooledHttpClient(server.base_url)
+
+            self.assertEqual(client.get('/orders?page=1').json(), [1, 2])
+            self.assertEqual(client.get('/orders?page=2').json(), [3])
+
+            response = client.request('DELETE', '/orders/1')
+            self.assertEqual((response.status_code, response.content), (204, b''))
+            self.assertEqual(response.headers.get('X-Deleted'), '1')
+
+            response = client.post('/orders', {'id': 3})
+            self.assertEqual(response.status_code, 404)
+            self.assertEqual(response.json(), {'message': 'No mock route for POST /orders'})
+            self.assertEqual(server.requests_served, 4)
+
+        self.assertLess(start_time, 0.1)
+
+    def test_bad_routes_file(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        feature_file = os.path.join(temp_dir, 'TC-T9.feature')
+
+        with self.assertRaises(DataFileError):
+            MockRestServer().load_routes(feature_file)  # No routes file.
+
+        os.makedirs(os.path.join(temp_dir, 'data', 'TC-T9'))
+        with open(os.path.join(temp_dir, 'data', 'TC-T9', 'mock_routes.json'), 'w') as f:
+            json.dump([{'method': 'GET', 'path': '/a', 'body_file': 'missing.json'}], f)
+
+        with self.assertRaises(DataFileError):
+            MockRestServer().load_routes(feature_file)
@@ -0,0 +1,127 @@
+from unittest import TestCase, mock
+
+import os
+import shutil
+import tempfile
+
+from testharness.bdd.loader_mixins.cache import DataFileCache, copy_json
+
+
+class DataFileCacheTests(TestCase):
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_dir)
+
+    def write_file(self, filename, data):
+        file_path = os.path.join(self.data_dir, filename)
+        with open(file_path, 'wb') as f:
+            f.write(data)
+        return file_path
+
+    def read_file(self, file_path):
+        with open(file_path, 'rb') as f:
+            return f.read()
+
+    def test_load_hit_and_miss(self):
+        "Prove a data file is read once, then served from the cache"
+
+        file_path = self.write_file('a.bin', b'0123456789')
+        cache = DataFileCache(max_bytes=100)
+        loader = mock.Mock(side_effect=self.read_file)
+
+        self.assertEqual(cache.load(file_path, 'bytes', loader), b'0123456789')
+        self.assertEqual(cache.load(file_path, 'bytes', loader), b'0123456789')
+        loader.assert_called_once_with(file_path)
+
+        # Each kind of load is its own entry.
+        cache.load(file_path, 'text', loader)
+        self.assertEqual(cache.stats(), {
+            'hits': 1, 'misses': 2, 'evictions': 0, 'entries': 2, 'bytes': 20, 'max_bytes': 100
+        })
+
+    def test_load_changed_file(self):
+        "Prove a changed data file is read again"
+
+        file_path = self.write_file('a.bin', b'old')
+        cache = DataFileCache(max_bytes=100)
+        cache.load(file_path, 'bytes', self.read_file)
+
+        self.write_file('a.bin', b'newer')
+        self.assertEqual(cache.load(file_path, 'bytes', self.read_file), b'newer')
+        self.assertEqual(cache.stats()['misses'], 2)
+        self.assertEqual(cache.stats()['bytes'], 5)
+
+    def test_load_sized(self):
+        "Prove a sized loader's nbytes count against the budget, not the file size"
+
+        file_path = self.write_file('a.gz', b'0123')
+        cache = DataFileCache(max_bytes=100)
+
+        self.assertEqual(cache.load(file_path, 'bytes', lambda path: (b'x' * 40, 40), sized=True), b'x' * 40)
+        self.assertEqual(cache.stats()['bytes'], 40)
+
+        cache.load(file_path, 'text', lambda path: ('x' * 101, 101), sized=True)
+        self.assertEqual(cache.stats()['entries'], 1)
+
+    def test_load_missing_file(self):
+        "Prove a missing data file goes to the loader uncached"
+
+        cache = DataFileCache(max_bytes=100)
+        loader = mock.Mock(side_effect=FileNotFoundError('missing'))
+
+        with self.assertRaises(FileNotFoundError):
+            cache.load(os.path.join(self.data_dir, 'missing.bin'), 'bytes', loader)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_lru_eviction(self):
+        "Prove the least recently used data files are evicted over budget"
+
+        cache = DataFileCache(max_bytes=25)
+        (a, b, c) = [self.write_file(name, b'x' * 10) for name in ('a', 'b', 'c')]
+
+        cache.load(a, 'bytes', self.read_file)
+        cache.load(b, 'bytes', self.read_file)
+        cache.load(a, 'bytes', self.read_file)  # b is now least recently used.
+        cache.load(c, 'bytes', self.read_file)
+
+        loader = mock.Mock(side_effect=self.read_file)
+        cache.load(a, 'bytes', loader)
+        cache.load(c, 'bytes', loader)
+        loader.assert_not_called()
+        cache.load(b, 'bytes', loader)
+        loader.assert_called_once_with(b)
+        self.assertEqual(cache.stats()['evictions'], 2)
+        self.assertLessEqual(cache.stats()['bytes'], 25)
+
+    def test_too_big_for_budget(self):
+        "Prove a data file bigger than the whole budget is never cached"
+
+        cache = DataFileCache(max_bytes=5)
+        file_path = self.write_file('big', b'x' * 10)
+
+        self.assertEqual(cache.load(file_path, 'bytes', self.read_file), b'x' * 10)
+        self.assertEqual(cache.stats()['entries'], 0)
+
+    def test_max_bytes_and_clear(self):
+        cache = DataFileCache(max_bytes=100)
+        for name in ('a', 'b', 'c'):
+            cache.load(self.write_file(name, b'x' * 10), 'bytes', self.read_file)
+
+        cache.max_bytes = 15
+        self.assertEqual(cache.stats()['entries'], 1)
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+        cache.clear()
+        self.assertEqual(cache.stats(), {
+            'hits': 0, 'misses': 0, 'evictions': 0, 'entries': 0, 'bytes': 0, 'max_bytes': 15
+        })
+
+    def test_copy_json(self):
+        document = {'a': [1, {'b': 'c'}], 'd': None}
+        document_copy = copy_json(document)
+
+        self.assertEqual(document_copy, document)
+        self.assertIsNot(document_copy, document)
+        self.assertIsNot(document_copy['a'], document['a'])
+        self.assertIsNot(document_copy['a'][1], document['a'][1])
@@ -1,10 +1,21 @@
 from unittest import TestCase, mock
 
+import bz2
+import gzip
+import io
 import json
+import lzma
+import os
+import shutil
+import tempfile
 
+from testharness.bdd.loader_mixins import common
+from testharness.bdd.loader_mixins.cache import DataFileCache
 from testharness.bdd.loader_mixins.common import (
     UNPARSEABLE_JSON_TOKEN,
     DataFileError,
+    JSONRecordError,
+    PayloadTemplate,
     BaseDataLoaderMixin,
     JSONDataLoaderMixin,
     TextDataLoaderMixin
@@ -46,6 +57,56 @@ class BaseDataLoaderMixinTests(TestCase):
             self.assertIsInstance(data, bytes)
 
 
+    def test_data_loader_mixin_map_data(self):
+        "Prove BaseDataLoaderMixin map_data() maps the file read-only until released"
+
+        expected_data_file = 'osscwl_view_login_failure_input.json'
+
+        loader = BaseDataLoaderMixin()
+        loader.FEATURE_FILE = 'tests/features/TC-T2.feature'
+
+        data = loader.map_data(expected_data_file)
+
+        self.assertIsInstance(data, memoryview)
+        self.assertTrue(data.readonly)
+        with open(loader.get_path(expected_data_file), 'rb') as f:
+            self.assertEqual(data.tobytes(), f.read())
+
+        loader.release_data_maps()
+        with self.assertRaises(ValueError):
+            data.tobytes()  # Released
+
+    def test_data_loader_mixin_map_data_released_after_test(self):
+        "Prove map_data() mappings are released when the TestCase finishes"
+
+        class MapDataTestCase(TestCase, BaseDataLoaderMixin):
+            FEATURE_FILE = 'tests/features/TC-T2.feature'
+
+            def runTest(self):
+                self.data = self.map_data('osscwl_view_login_failure_input.json')
+                self.assertGreater(len(self.data), 0)
+
+        test_case = MapDataTestCase()
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        with self.assertRaises(ValueError):
+            test_case.data.tobytes()  # Released
+
+    def test_data_loader_mixin_map_data_empty_and_missing(self):
+        "Prove map_data() handles an empty file and raises DataFileError on a missing file"
+
+        with tempfile.TemporaryDirectory() as features_dir:
+            loader = BaseDataLoaderMixin()
+            loader.FEATURE_FILE = os.path.join(features_dir, 'Empty.feature')
+            os.makedirs(loader.data_files_dir)
+            open(loader.get_path('empty.bin'), 'wb').close()
+
+            self.assertEqual(loader.map_data('empty.bin').tobytes(), b'')
+            with self.assertRaises(DataFileError):
+                loader.map_data('missing.bin')
+
+
 class JSONDataLoaderMixinTests(TestCase):
 
     def test_data_loader_mixin_load_json(self):
@@ -75,6 +136,22 @@ class JSONDataLoaderMixinTests(TestCase):
             self.assertEqual(data, expected_data)
             self.assertIsInstance(data, dict)
 
+    def test_data_loader_mixin_load_json_cached_copies(self):
+        "Prove JSONDataLoaderMixin load_json() reads the file once and returns new copies"
+
+        loader = JSONDataLoaderMixin()
+        loader.FEATURE_FILE = 'tests/features/TC-T2.feature'
+
+        with mock.patch('testharness.bdd.loader_mixins.common.data_file_cache',
+                        DataFileCache()) as cache:
+            first_data = loader.load_json('osscwl_view_login_failure_input.json')
+            first_data['changed'] = True
+            second_data = loader.load_json('osscwl_view_login_failure_input.json')
+
+        self.assertNotIn('changed', second_data)
+        self.assertIsInstance(second_data, dict)
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
     def test_data_loader_mixin_load_json_decode_error(self):
         "Prove JSONDataLoaderMixin load_json() returns error token on decode error"
 
@@ -117,6 +194,404 @@ class JSONDataLoaderMixinTests(TestCase):
                     'rb')
 
 
+class JSONRecordsTests(TestCase):
+
+    RECORDS = [
+        {'id': 1, 'name': 'na\u00efve \u2713', 'values': [1.5, -2, 1e10]},
+        {'id': 2, 'nested': {'list': [[], {}], 'empty': ''}},
+        12345678901234567890,
+        'text',
+        None,
+        True,
+    ]
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+        self.loader = JSONDataLoaderMixin()
+        self.loader.FEATURE_FILE = os.path.join(self.features_dir, 'Bulk.feature')
+        os.makedirs(self.loader.data_files_dir)
+
+    def write_data_file(self, data_filename, data):
+        with open(self.loader.get_path(data_filename), 'wb') as f:
+            f.write(data)
+
+    def test_iter_json_records_array(self):
+        "Prove iter_json_records() streams the elements of a top-level JSON array"
+
+        self.write_data_file('records.json', json.dumps(self.RECORDS, indent=4).encode('utf-8'))
+        self.assertEqual(list(self.loader.iter_json_records('records.json')), self.RECORDS)
+
+        self.write_data_file('empty.json', b' [ ] ')
+        self.assertEqual(list(self.loader.iter_json_records('empty.json')), [])
+
+    def test_iter_json_records_array_chunks(self):
+        "Prove records, numbers and UTF-8 characters split across chunks are parsed whole"
+
+        data = json.dumps(self.RECORDS, ensure_ascii=False).encode('utf-8')
+        for chunk_size in (1, 2, 3, 5, 8, 1024):
+            records = common._iter_json_array_records(io.BytesIO(data), 'records.json', chunk_size)
+            self.assertEqual(list(records), self.RECORDS, chunk_size)
+
+    def test_iter_json_records_ndjson(self):
+        "Prove iter_json_records() streams NDJSON lines and skips blank lines"
+
+        data = '\n'.join(json.dumps(record) for record in self.RECORDS) + '\n\n'
+        self.write_data_file('records.ndjson', data.encode('utf-8'))
+        self.assertEqual(list(self.loader.iter_json_records('records.ndjson')), self.RECORDS)
+
+    def test_iter_json_records_errors(self):
+        "Prove a corrupt record raises JSONRecordError at its byte offset"
+
+        data = [
+            # (data file contents, expected records before the error, expected byte offset)
+            (b'[{"a": 1}, {"b": tru}]', [{'a': 1}], 17),
+            (b'[1 2]', [], 3),
+            (b'[1, 2,]', [1, 2], 6),
+            (b'[1, 2', [1], 5),
+            (b'[1] extra', [1], 4),
+            (b'{"a": 1}\n{"\xc3\xa9": 2}\n{"c": x}\n', [{'a': 1}, {'\u00e9': 2}], 25),
+            (b'{"a": 1}\n"\xff"\n', [{'a': 1}], 10),
+        ]
+
+        for (contents, expected_records, expected_offset) in data:
+            self.write_data_file('corrupt.json', contents)
+            records = []
+            with self.assertRaises(JSONRecordError) as context:
+                for record in self.loader.iter_json_records('corrupt.json'):
+                    records.append(record)
+
+            self.assertEqual(records, expected_records, contents)
+            self.assertEqual(context.exception.offset, expected_offset, contents)
+            self.assertIn('byte {}:'.format(expected_offset), str(context.exception))
+            self.assertIsInstance(context.exception, DataFileError)
+
+    def test_iter_json_records_corrupt_early_record(self):
+        "Prove a corrupt record is raised at once, not after reading the rest of the file"
+
+        data = b'[{"a": 1}, {"b": x}, ' + b', '.join([b'{"c": 2}'] * 100000) + b']'
+        f = io.BytesIO(data)
+
+        with self.assertRaises(JSONRecordError) as context:
+            list(common._iter_json_array_records(f, 'records.json', chunk_size=64))
+
+        self.assertEqual(context.exception.offset, 17)
+        self.assertLess(f.tell(), 1024)
+
+    def test_iter_json_records_missing_file(self):
+        with self.assertRaises(DataFileError):
+            list(self.loader.iter_json_records('missing.json'))
+
+
+class CompressedDataFilesTests(TestCase):
+
+    PAYLOAD = {'user': 'guest', 'lines': ['line {}'.format(n) for n in range(100)]}
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+        self.loader = JSONDataLoaderMixin()
+        self.loader.FEATURE_FILE = os.path.join(self.features_dir, 'Compressed.feature')
+        os.makedirs(self.loader.data_files_dir)
+
+        self.cache = DataFileCache()
+        patcher = mock.patch.object(common, 'data_file_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_data_file(self, data_filename, data, compress=None):
+        with open(self.loader.get_path(data_filename), 'wb') as f:
+            f.write(compress(data) if compress else data)
+
+    def test_load_compressed(self):
+        "Prove load_data(), load_text() and load_json() find the .gz, .xz and .bz2 files"
+
+        data = json.dumps(self.PAYLOAD).encode('utf-8')
+        for (suffix, compress) in [('.gz', gzip.compress), ('.xz', lzma.compress), ('.bz2', bz2.compress)]:
+            data_filename = 'payload{}.json'.format(suffix.replace('.', '_'))
+            self.write_data_file(data_filename + suffix, data, compress)
+
+            self.assertEqual(self.loader.load_data(data_filename), data, suffix)
+            self.assertEqual(TextDataLoaderMixin.load_text(self.loader, data_filename), data.decode('utf-8'))
+            self.assertEqual(self.loader.load_json(data_filename), self.PAYLOAD)
+            self.assertEqual(self.loader.load_json(data_filename + suffix), self.PAYLOAD)
+            self.assertEqual(list(self.loader.iter_json_records(data_filename)), [self.PAYLOAD])
+
+    def test_load_compressed_cached(self):
+        "Prove the decoded data is cached and counted at its decoded size"
+
+        data = json.dumps(self.PAYLOAD).encode('utf-8')
+        self.write_data_file('payload.json.gz', data, gzip.compress)
+
+        self.loader.load_json('payload.json')
+        self.assertEqual(self.loader.load_json('payload.json'), self.PAYLOAD)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['bytes'], len(data))
+
+    def test_load_compressed_text_bytes(self):
+        "Prove decompressed text is counted in bytes, not characters"
+
+        text = '\u00e9t\u00e9 \u2713\n' * 100
+        self.write_data_file('summer.txt.gz', text.encode('utf-8'), gzip.compress)
+
+        self.assertEqual(TextDataLoaderMixin.load_text(self.loader, 'summer.txt'), text)
+        self.assertEqual(self.cache.stats()['bytes'], len(text.encode('utf-8')))
+        self.assertGreater(self.cache.stats()['bytes'], len(text))
+
+    def test_uncompressed_file_first(self):
+        "Prove the uncompressed file wins over its compressed file"
+
+        self.write_data_file('payload.json', b'{"plain": true}')
+        self.write_data_file('payload.json.gz', b'{"plain": false}', gzip.compress)
+
+        self.assertEqual(self.loader.load_json('payload.json'), {'plain': True})
+
+    def test_corrupt_compressed(self):
+        "Prove a corrupt compressed file raises DataFileError"
+
+        for suffix in ('.gz', '.xz', '.bz2'):
+            self.write_data_file('corrupt.json' + suffix, b'not compressed at all')
+            with self.assertRaises(DataFileError):
+                self.loader.load_json('corrupt.json' + suffix)
+
+        self.write_data_file('truncated.json.gz', gzip.compress(b'{"a": 1}')[:-6])
+        with self.assertRaises(DataFileError):
+            self.loader.load_data('truncated.json.gz')
+
+
+class PayloadTemplateTests(TestCase):
+
+    TEMPLATE = {
+        'order_id': '${order_id}',
+        'note': 'Order ${order_id} for ${user}',
+        'items': [{'sku': 'A-1', 'qty': 1}, {'sku': '${sku}'}],
+        'constant': {'list': [1, 2], 'price': '$10'},
+        'count': 3,
+    }
+
+    def test_render(self):
+        "Prove render() fills in every placeholder and returns a new copy"
+
+        template = PayloadTemplate(self.TEMPLATE)
+        values = {'order_id': '42', 'user': 'guest', 'sku': 'B-2'}
+        rendered = template.render(values)
+
+        self.assertEqual(template.placeholders, {'order_id', 'user', 'sku'})
+        self.assertEqual(rendered, {
+            'order_id': '42',
+            'note': 'Order 42 for guest',
+            'items': [{'sku': 'A-1', 'qty': 1}, {'sku': 'B-2'}],
+            'constant': {'list': [1, 2], 'price': '$10'},
+            'count': 3,
+        })
+
+        rendered['constant']['list'].append(3)
+        rendered['items'][0]['qty'] = 2
+        self.assertEqual(template.render(values)['constant']['list'], [1, 2])
+        self.assertEqual(template.render(values)['items'][0]['qty'], 1)
+        self.assertEqual(self.TEMPLATE['order_id'], '${order_id}')
+
+    def test_render_without_placeholders(self):
+        template = PayloadTemplate({'a': [1, {'b': 'c'}]})
+        self.assertEqual(template.placeholders, set())
+        self.assertEqual(template.render({}), {'a': [1, {'b': 'c'}]})
+        self.assertIsNot(template.render({}), template.render({}))
+
+    def test_render_errors(self):
+        "Prove a missing value or a placeholder key raises DataFileError"
+
+        with self.assertRaisesRegex(DataFileError, r'order.json: no value for placeholder "\$\{user\}"'):
+            PayloadTemplate(self.TEMPLATE, 'order.json').render({'order_id': '42', 'sku': 'B-2'})
+
+        with self.assertRaises(DataFileError):
+            PayloadTemplate({'${key}': 'value'})
+
+
+class TemplateFeatureTestCase(JSONDataLoaderMixin, TestCase):
+    "Run a Scenario Outline that posts payload templates. Not a test itself."
+
+    __test__ = False
+    TEMPLATE_ENVIRONMENT = True
+
+    def runTest(self):
+        pass
+
+    def step_User_POSTs_with_post_payload(self, post_payload):
+        r'User POSTs with (.+)'
+        self.payloads.append(self.load_json_template(post_payload))
+
+
+class LoadJSONTemplateTests(TestCase):
+
+    FEATURE_TEXT = (
+        'Feature: Templates\n'
+        '    Scenario Outline: Post an order\n'
+        '        When User POSTs with <post_payload>\n'
+        '        Examples:\n'
+        '            | post_payload | order_id |\n'
+        '            | order.json   | 41       |\n'
+        '            | order.json   | 42       |\n'
+    )
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+
+        self.feature_file = os.path.join(self.features_dir, 'TC-T9.feature')
+        with open(self.feature_file, 'w') as f:
+            f.write(self.FEATURE_TEXT)
+
+        data_files_dir = os.path.join(self.features_dir, 'data', 'TC-T9')
+        os.makedirs(data_files_dir)
+        with open(os.path.join(data_files_dir, 'order.json'), 'w') as f:
+            f.write('{"order_id": "${order_id}", "user": "${BDD_TEST_USER}"}')
+
+        self.cache = DataFileCache()
+        patcher = mock.patch.object(common, 'data_file_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @mock.patch.dict(os.environ, {'BDD_TEST_USER': 'guest', 'order_id': 'from the environment'})
+    def test_load_json_template_examples_and_environment(self):
+        "Prove placeholders are filled in from the Examples row, then the environment"
+
+        from testharness.bdd.runner.feature import run
+
+        suite = TemplateFeatureTestCase()
+        suite.FEATURE_FILE = self.feature_file
+        suite.payloads = []
+        run(self.feature_file, suite)
+
+        self.assertEqual(suite.payloads, [
+            {'order_id': '41', 'user': 'guest'},
+            {'order_id': '42', 'user': 'guest'},
+        ])
+        # The template is compiled once.
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_load_json_template_values(self):
+        "Prove keyword values override the others, and a missing value raises DataFileError"
+
+        loader = JSONDataLoaderMixin()
+        loader.FEATURE_FILE = self.feature_file
+
+        self.assertEqual(loader.load_json_template('order.json', order_id='7', BDD_TEST_USER='admin'),
+                         {'order_id': '7', 'user': 'admin'})
+        with self.assertRaises(DataFileError):
+            loader.load_json_template('order.json', order_id='7')
+
+    @mock.patch.dict(os.environ, {'BDD_TEST_USER': 'guest'})
+    def test_load_json_template_environment_off(self):
+        "Prove the environment variables fill placeholders only when TEMPLATE_ENVIRONMENT is set"
+
+        loader = JSONDataLoaderMixin()
+        loader.FEATURE_FILE = self.feature_file
+
+        with self.assertRaises(DataFileError):
+            loader.load_json_template('order.json', order_id='7')
+
+        loader.TEMPLATE_ENVIRONMENT = True
+        self.assertEqual(loader.load_json_template('order.json', order_id='7'),
+                         {'order_id': '7', 'user': 'guest'})
+
+
+class PrefetchDataFilesTests(TestCase):
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+
+        feature_file = os.path.join(self.features_dir, 'TC-T9.feature')
+        with open(feature_file, 'w') as f:
+            f.write('Feature: Prefetch\n'
+                    '    Scenario Outline: Post a payload\n'
+                    '        When User POSTs endpoint /login with <post_payload>\n'
+                    '        Examples:\n'
+                    '            | post_payload |\n'
+                    '            | login.json   |\n'
+                    '            | missing.json |\n')
+
+        data_files_dir = os.path.join(self.features_dir, 'data', 'TC-T9')
+        os.makedirs(data_files_dir)
+        for data_filename in ('login.json', 'unused.json'):
+            with open(os.path.join(data_files_dir, data_filename), 'w') as f:
+                f.write('{"user": "guest"}')
+
+        self.cache = DataFileCache()
+        patcher = mock.patch.object(common, 'data_file_cache', self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        class PrefetchLoader(JSONDataLoaderMixin):
+            FEATURE_FILE = feature_file
+            PREFETCH_DATA_FILES = True
+
+        self.loader_class = PrefetchLoader
+
+    def test_prefetch_examples_data_files(self):
+        "Prove class setup prefetches only the Examples' data files into the cache"
+
+        self.loader_class.setUpClass()
+        self.loader_class.set_up_data_files().join(5)
+
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(self.loader_class().load_json('login.json'), {'user': 'guest'})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+    def test_set_up_data_files_once(self):
+        "Prove the manifest and prefetch are set up once per class"
+
+        thread = self.loader_class.set_up_data_files()
+        thread.join(5)
+        self.assertIs(self.loader_class.set_up_data_files(), thread)
+        self.assertEqual(list(self.loader_class().data_manifest), ['login.json', 'unused.json'])
+
+    def test_prefetch_off(self):
+        self.loader_class.PREFETCH_DATA_FILES = False
+
+        self.assertIsNone(self.loader_class.set_up_data_files())
+        self.assertEqual(self.cache.stats()['entries'], 0)
+
+    def test_prefetch_started_by_the_runner(self):
+        "Prove the runner starts the prefetch before the first step, with TestCase first in the bases"
+
+        from testharness.bdd.runner import feature
+
+        feature_file = self.loader_class.FEATURE_FILE
+        prefetch_threads = []
+
+        class InstanceFeatureTestCase(TestCase, JSONDataLoaderMixin):
+            PREFETCH_DATA_FILES = True
+
+            def setUp(self):
+                self.FEATURE_FILE = feature_file
+
+            def runTest(self):
+                pass
+
+            def step_User_POSTs_endpoint_login_with_post_payload(self, post_payload):
+                r'User POSTs endpoint /login with (.+)'
+                prefetch_threads.append(type(self).set_up_data_files(self.FEATURE_FILE))
+
+        InstanceFeatureTestCase.setUpClass()  # No FEATURE_FILE yet, no AttributeError.
+        self.assertIsNone(InstanceFeatureTestCase.set_up_data_files())
+
+        test_case = InstanceFeatureTestCase()
+        test_case.setUp()
+        test_case.data_files_dir  # No side effects.
+        self.assertNotIn('_data_prefetch_threads', InstanceFeatureTestCase.__dict__)
+
+        feature.run(feature_file, test_case, show_all_missing=False)
+
+        (thread, missing_thread) = prefetch_threads
+        self.assertIsNotNone(thread)  # Started before the first step.
+        self.assertIs(missing_thread, thread)
+        thread.join(5)
+        self.assertEqual(self.cache.stats()['entries'], 1)
+        self.assertEqual(test_case.load_json('login.json'), {'user': 'guest'})
+        self.assertEqual(self.cache.stats()['hits'], 1)
+
+
 class TextDataLoaderMixinTests(TestCase):
 
     def test_data_loader_mixin_load_text(self):
@@ -0,0 +1,82 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+from testharness.bdd.loader_mixins.manifest import (
+    DataFilesManifest,
+    get_data_manifest,
+    get_examples_cells
+)
+
+FEATURE_TEXT = """Feature: Data Files
+    Scenario Outline: Post a payload
+
+        When User POSTs endpoint <relative_url> with <post_payload>
+        Then the response code is <status_code>
+
+        Examples:
+            | relative_url | post_payload | status_code |
+            | /one         | one.json     | 200         |
+            | /two         | two.json     | 200         |
+
+    Scenario: Post nothing
+
+        When User POSTs endpoint /three with payloads/three.json
+"""
+
+
+class DataFilesManifestTests(TestCase):
+
+    def setUp(self):
+        self.data_files_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.data_files_dir)
+
+        os.makedirs(os.path.join(self.data_files_dir, 'payloads'))
+        for (data_filename, data) in [('one.json', b'{}'), ('payloads/three.json', b'[1, 2]')]:
+            with open(os.path.join(self.data_files_dir, data_filename), 'wb') as f:
+                f.write(data)
+
+    def test_manifest(self):
+        "Prove the manifest lists every file under the data directory"
+
+        manifest = DataFilesManifest(self.data_files_dir)
+
+        self.assertEqual(list(manifest), ['one.json', os.path.join('payloads', 'three.json')])
+        self.assertEqual(len(manifest), 2)
+        self.assertEqual(manifest.total_bytes, 8)
+        self.assertIn('one.json', manifest)
+        self.assertIn('payloads/three.json', manifest)
+        self.assertNotIn('two.json', manifest)
+        self.assertNotIn('payloads', manifest)
+
+    def test_manifest_rebuild(self):
+        "Prove rebuild() finds files added after the manifest was built"
+
+        manifest = DataFilesManifest(self.data_files_dir)
+        with open(os.path.join(self.data_files_dir, 'two.json'), 'wb') as f:
+            f.write(b'{}')
+
+        self.assertNotIn('two.json', manifest)
+        manifest.rebuild()
+        self.assertIn('two.json', manifest)
+
+    def test_manifest_missing_dir(self):
+        manifest = DataFilesManifest(os.path.join(self.data_files_dir, 'missing'))
+        self.assertEqual(len(manifest), 0)
+
+    def test_get_data_manifest(self):
+        "Prove each data directory's manifest is built once"
+
+        manifest = get_data_manifest(self.data_files_dir)
+        self.assertIs(get_data_manifest(self.data_files_dir + os.sep), manifest)
+
+    def test_get_examples_cells(self):
+        "Prove every Examples cell is listed once, and never the header row"
+
+        feature_file = os.path.join(self.data_files_dir, 'TC-T9.feature')
+        with open(feature_file, 'w') as f:
+            f.write(FEATURE_TEXT)
+
+        self.assertEqual(get_examples_cells(feature_file), ['/one', 'one.json', '200', '/two', 'two.json'])
@@ -0,0 +1,202 @@
+from unittest import TestCase, mock
+
+import asyncio
+import io
+import os
+import tempfile
+import unittest
+
+from morelia.formatters import PlainTextFormatter
+
+from testharness.bdd.runner import async_feature
+from testharness.bdd.runner.concurrent_rows import ConcurrentRowsError
+from testharness.bdd.steps_mixins.async_rest_api_common import AsyncHttpGetRestApiBDDStepsMixin
+
+from .test_feature import RESPONSE_FIELDS, fake_get
+
+
+class FakeAsyncClient(object):
+    "Fake coroutine HTTP GET client that counts the requests in flight."
+
+    def __init__(self, requested_urls, in_flight):
+        self.requested_urls = requested_urls
+        self.in_flight = in_flight
+
+    async def get(self, relative_url):
+        self.requested_urls.append(relative_url)
+        self.in_flight['now'] += 1
+        self.in_flight['most'] = max(self.in_flight['most'], self.in_flight['now'])
+        await asyncio.sleep(0.05)
+        self.in_flight['now'] -= 1
+        return fake_get(relative_url)
+
+
+class AsyncGetFeatureTestCase(TestCase, AsyncHttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by AsyncFeatureRunTests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+    formatter = None
+    requested_urls = None
+    in_flight = None
+
+    def setUp(self):
+        # Every row calls setUp() on its own copy.
+        self.client = FakeAsyncClient(self.requested_urls, self.in_flight)
+
+    def test_scenario_TC_T1(self):
+        async_feature.run(self.FEATURE_FILE, self, formatter=self.formatter)
+
+    def test_row_1_scenario_TC_T1(self):
+        async_feature.run(self.FEATURE_FILE, self, row=1)
+
+    def test_serial_scenario_TC_T1(self):
+        async_feature.run(self.FEATURE_FILE, self, concurrency=1)
+
+
+class PlainTestCase(TestCase):
+
+    __test__ = False
+
+    def test_pass(self):
+        pass
+
+    def test_fail(self):
+        self.fail('plain failure')
+
+
+class BrokenClassTestCase(AsyncGetFeatureTestCase):
+
+    __test__ = False
+
+    @classmethod
+    def setUpClass(cls):
+        raise RuntimeError('no service')
+
+
+class AsyncFeatureRunTests(TestCase):
+
+    def setUp(self):
+        AsyncGetFeatureTestCase.requested_urls = []
+        AsyncGetFeatureTestCase.in_flight = {'now': 0, 'most': 0}
+        self.addCleanup(setattr, AsyncGetFeatureTestCase, 'formatter', None)
+
+    def test_run_feature(self):
+        "Prove run() awaits the async steps of every row at the same time, and prints them in row order"
+
+        stream = io.StringIO()
+        AsyncGetFeatureTestCase.formatter = PlainTextFormatter(stream)
+        test_case = AsyncGetFeatureTestCase('test_scenario_TC_T1')
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(sorted(test_case.requested_urls), ['/osscwl', '/osscwl/servers', '/swagger.json'])
+        self.assertEqual(test_case.in_flight['most'], 3)
+        self.assertFalse(hasattr(test_case, 'response'))  # Each row had its own TestCase copy.
+
+        step_lines = [line.split('#')[0].strip() for line in stream.getvalue().splitlines()
+                      if line.strip().startswith('When ')]
+        self.assertEqual(step_lines, ['When User GETs endpoint /swagger.json',
+                                      'When User GETs endpoint /osscwl/servers',
+                                      'When User GETs endpoint /osscwl'])
+
+    def test_run_feature_concurrency(self):
+        "Prove concurrency limits the rows in flight"
+
+        test_case = AsyncGetFeatureTestCase('test_serial_scenario_TC_T1')
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(test_case.in_flight['most'], 1)
+
+    def test_run_feature_row(self):
+        test_case = AsyncGetFeatureTestCase('test_row_1_scenario_TC_T1')
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(test_case.requested_urls, ['/osscwl/servers'])
+
+    def test_run_feature_failure(self):
+        "Prove every failed row is reported in one test failure"
+
+        test_case = AsyncGetFeatureTestCase('test_scenario_TC_T1')
+        with mock.patch.dict(RESPONSE_FIELDS, {'/swagger.json': 'wrong_field', '/osscwl': 'wrong_field'}):
+            result = test_case.run()
+
+        self.assertEqual(len(result.failures), 1)
+        self.assertEqual(result.errors, [])
+        failure_text = result.failures[0][1]
+        self.assertIn('2 of 3 rows failed', failure_text)
+        self.assertIn('row 0: ', failure_text)
+        self.assertIn('row 2: ', failure_text)
+        self.assertIn('And the response JSON has fields', failure_text)
+
+    def test_run_feature_error(self):
+        "Prove a row that raises an error makes the test an error"
+
+        test_case = AsyncGetFeatureTestCase('test_scenario_TC_T1')
+        with mock.patch.dict(RESPONSE_FIELDS, {'/osscwl/servers': None}):
+            result = test_case.run()
+
+        self.assertEqual(result.failures, [])
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn(ConcurrentRowsError.__name__, result.errors[0][1])
+
+
+class AsyncFeatureRunnerTests(TestCase):
+
+    def setUp(self):
+        AsyncGetFeatureTestCase.requested_urls = []
+        AsyncGetFeatureTestCase.in_flight = {'now': 0, 'most': 0}
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.xunit_file = os.path.join(self.temp_dir.name, 'nosetests.xml')
+
+    def run_tests(self, *tests):
+        runner = async_feature.AsyncFeatureRunner(concurrency=4, xunit_file=self.xunit_file,
+                                                  stream=io.StringIO())
+        return runner.run(unittest.TestSuite(tests))
+
+    def test_runner(self):
+        "Prove the runner runs Feature tests on one event loop at the same time, and reports them in order"
+
+        result = self.run_tests(AsyncGetFeatureTestCase('test_scenario_TC_T1'),
+                                AsyncGetFeatureTestCase('test_row_1_scenario_TC_T1'),
+                                PlainTestCase('test_pass'),
+                                PlainTestCase('test_fail'))
+
+        self.assertEqual(result.testsRun, 4)
+        self.assertEqual(result.errors, [])
+        self.assertEqual([test.id() for (test, text) in result.failures], [PlainTestCase('test_fail').id()])
+        self.assertEqual(AsyncGetFeatureTestCase.in_flight['most'], 4)  # 3 rows and 1 row at once.
+
+    def test_runner_xunit(self):
+        "Prove the XUnit report is in nose's format, as the TM4J reporter reads it"
+
+        from junitparser import Failure, JUnitXml
+
+        self.run_tests(AsyncGetFeatureTestCase('test_scenario_TC_T1'), PlainTestCase('test_fail'))
+
+        suite = JUnitXml.fromfile(self.xunit_file)
+        self.assertEqual(suite.name, 'nosetests')
+        self.assertEqual((suite.tests, suite.failures, suite.errors), (2, 1, 0))
+
+        cases = list(suite)
+        self.assertEqual([(case.classname, case.name) for case in cases], [
+            (__name__ + '.AsyncGetFeatureTestCase', 'test_scenario_TC_T1'),
+            (__name__ + '.PlainTestCase', 'test_fail')
+        ])
+        self.assertIsNone(cases[0].result)
+        self.assertIsInstance(cases[1].result, Failure)
+        self.assertEqual(cases[1].result.message, 'plain failure')
+
+    def test_runner_set_up_class_error(self):
+        "Prove a setUpClass() error is an error for each of the class's tests"
+
+        result = self.run_tests(BrokenClassTestCase('test_scenario_TC_T1'),
+                                BrokenClassTestCase('test_row_1_scenario_TC_T1'),
+                                PlainTestCase('test_pass'))
+
+        self.assertEqual(result.testsRun, 3)
+        self.assertEqual(len(result.errors), 2)
+        self.assertIn('no service', result.errors[0][1])
+        self.assertEqual(AsyncGetFeatureTestCase.requested_urls, [])
@@ -0,0 +1,98 @@
+from unittest import TestCase
+
+from morelia.matchers import RegexpStepMatcher, ParseStepMatcher
+
+from testharness.bdd.runner import dispatch
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+from testharness.bdd.steps_mixins.post_rest_api_common import HttpPostRestApiBDDStepsMixin
+
+
+class StepLibraryTestCase(TestCase, HttpGetRestApiBDDStepsMixin, HttpPostRestApiBDDStepsMixin):
+
+    def test_nothing(self):
+        pass
+
+    def step_named_group(self, user):
+        r'(?P<user>\w+) logs in'
+
+    def step_alternation(self, verb):
+        r'User (GETs|HEADs) the root|Admin resets everything'
+
+    def step_optional_space(self):
+        r'Cache ?warmed'
+
+    def step_format_like(self, count):
+        r'I have {count} apples'
+
+    def step_not_a_regex(self):
+        r'broken (regex'
+
+
+STEP_LINES = [
+    'User GETs endpoint /swagger.json',
+    'User POSTs endpoint /osscwl/view with payload.json',
+    'User HEADs the root',
+    'Admin resets everything',
+    'the response code is 200',
+    'the response JSON message contains SEC102E INCORRECT OR INVALID SIGNON',
+    'alice logs in',
+    'Cachewarmed',
+    'Cache warmed',
+    'Nobody matches this step',
+]
+
+
+class LiteralFirstWordTests(TestCase):
+
+    def test_get_literal_first_word(self):
+        data = [
+            # (expected_first_word, docstring)
+            ('User', r'User GETs endpoint (.+)'),
+            ('the', r'the response code is (.+)'),
+            (None, r'(?P<user>\w+) logs in'),
+            (None, r'User (GETs|HEADs) the root|Admin resets everything'),
+            (None, r'Cache ?warmed'),
+            (None, r'Users?'),
+            ('I', r'I have {count} apples'),
+        ]
+
+        for expected_result, docstring in data:
+            self.assertEqual(dispatch.get_literal_first_word(docstring), expected_result)
+
+
+class StepDispatchIndexTests(TestCase):
+
+    def test_index_matches_morelia(self):
+        "Prove the dispatch index finds the same step method as morelia's regex matcher"
+
+        suite = StepLibraryTestCase('test_nothing')
+        indexed_matcher = dispatch.IndexedRegexpStepMatcher(suite)
+        morelia_matcher = RegexpStepMatcher(suite)
+        step_methods = [name for name in dir(suite) if name.startswith('step_') and
+                        name != 'step_not_a_regex']
+
+        for step_line in STEP_LINES:
+            self.assertEqual(indexed_matcher.match(step_line, step_line, None),
+                             morelia_matcher.match(step_line, step_line, step_methods),
+                             step_line)
+
+    def test_index_built_once_per_class(self):
+        "Prove every TestCase instance reuses its class's dispatch index"
+
+        first = dispatch.IndexedRegexpStepMatcher(StepLibraryTestCase('test_nothing'))
+        second = dispatch.IndexedRegexpStepMatcher(StepLibraryTestCase('test_nothing'))
+        self.assertIs(first._index, second._index)
+        self.assertIs(dispatch.get_dispatch_index(StepLibraryTestCase), first._index)
+
+    def test_find_falls_through_to_next_matcher(self):
+        "Prove a step missing from the index is passed down the matcher chain"
+
+        suite = StepLibraryTestCase('test_nothing')
+        matcher = dispatch.IndexedRegexpStepMatcher(suite)
+        matcher.add_matcher(ParseStepMatcher(suite))
+
+        (method, args, kwargs) = matcher.find('I have 3 apples', 'I have 3 apples')
+        self.assertEqual(method, suite.step_format_like)
+        self.assertEqual(kwargs, {'count': '3'})
+
+        self.assertEqual(matcher.find('Nobody matches', 'Nobody matches'), (None, (), {}))
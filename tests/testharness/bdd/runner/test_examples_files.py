@@ -0,0 +1,150 @@
+from unittest import TestCase, mock
+
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from morelia.formatters import PlainTextFormatter
+
+from testharness.bdd.compiler.testcase_writer import get_test_methods
+from testharness.bdd.loader_mixins import cache
+from testharness.bdd.loader_mixins.common import DataFileError
+from testharness.bdd.runner import examples_files, feature
+from testharness.bdd.runner.examples_files import ExamplesTable, read_examples_csv
+
+FEATURE_TEXT = """Feature: Orders
+    Scenario Outline: Order lookup
+        When User GETs order <order_id>
+        Then the order status is <status>
+
+        Examples:
+            | examples_file |
+            | orders.csv    |
+"""
+
+
+class OrdersTestCase(TestCase):
+    "Record the orders a Scenario Outline looks up. Not a test itself."
+
+    __test__ = False
+
+    def runTest(self):
+        pass
+
+    def step_User_GETs_order_order_id(self, order_id):
+        r'User GETs order (.+)'
+        self.orders.append(order_id)
+
+    def step_the_order_status_is_status(self, status):
+        r'the order status is (.+)'
+        self.statuses.append(status)
+
+
+class ExamplesTableTests(TestCase):
+
+    def test_examples_table(self):
+        "Prove rows and columns read back, with each distinct value stored once"
+
+        table = ExamplesTable(['order_id', 'status'])
+        for n in range(1000):
+            table.append([str(n), 'OPEN' if n % 2 else 'CLOSED'])
+        table.freeze()
+
+        self.assertEqual(len(table), 1000)
+        self.assertEqual(table.row(0), ['0', 'CLOSED'])
+        self.assertEqual(table.row(999), ['999', 'OPEN'])
+        self.assertEqual(list(table.column('status'))[:3], ['CLOSED', 'OPEN', 'CLOSED'])
+        self.assertEqual(len(table.values), 1002)
+
+
+class ExamplesFileTests(TestCase):
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+
+        self.feature_file = os.path.join(self.features_dir, 'TC-T9.feature')
+        with open(self.feature_file, 'w') as f:
+            f.write(FEATURE_TEXT)
+        self.data_files_dir = os.path.join(self.features_dir, 'data', 'TC-T9')
+        os.makedirs(self.data_files_dir)
+
+        patcher = mock.patch.object(examples_files, 'data_file_cache', cache.DataFileCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_csv(self, data_filename, text, compress=None):
+        data = text.encode('utf-8')
+        with open(os.path.join(self.data_files_dir, data_filename), 'wb') as f:
+            f.write(compress(data) if compress else data)
+
+    def run_feature(self, **kwargs):
+        suite = OrdersTestCase()
+        (suite.orders, suite.statuses) = ([], [])
+        feature.run(self.feature_file, suite, **kwargs)
+        return suite
+
+    def test_run_examples_file(self):
+        "Prove every CSV row runs through the step methods, in order"
+
+        self.write_csv('orders.csv', 'order_id,status\n' + ''.join(
+            '{},"OPEN, {}"\n'.format(n, n % 3) for n in range(500)))
+
+        suite = self.run_feature()
+        self.assertEqual(suite.orders, [str(n) for n in range(500)])
+        self.assertEqual(suite.statuses[:2], ['OPEN, 0', 'OPEN, 1'])
+
+        suite = self.run_feature(row=42)
+        self.assertEqual((suite.orders, suite.statuses), (['42'], ['OPEN, 0']))
+
+        suite = self.run_feature(concurrency=4)
+        self.assertEqual(sorted(suite.orders, key=int), [str(n) for n in range(500)])
+
+    def test_run_compressed_examples_file(self):
+        self.write_csv('orders.csv.gz', 'order_id,status\n7,OPEN\n', gzip.compress)
+
+        suite = self.run_feature()
+        self.assertEqual((suite.orders, suite.statuses), (['7'], ['OPEN']))
+
+    def test_output_visits_only_the_current_row(self):
+        "Prove the step output shows the header and current row, not every row"
+
+        self.write_csv('orders.csv', 'order_id,status\n' + ''.join('{},OPEN\n'.format(n) for n in range(50)))
+        stream = io.StringIO()
+
+        self.run_feature(formatter=PlainTextFormatter(stream))
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(sum('| order_id | status |' in line for line in lines), 50)
+        self.assertEqual(sum('| 49 | OPEN |' in line for line in lines), 1)
+
+    def test_split_rows(self):
+        "Prove the compiler writes one test method per CSV row"
+
+        self.write_csv('orders.csv', 'order_id,status\n1,OPEN\n2,OPEN\n3,CLOSED\n')
+
+        test_methods = get_test_methods(self.feature_file, 'qa', 'TC_T9', split_rows=True)
+        self.assertEqual(test_methods.count('def qa_row_'), 3)
+        self.assertIn('def qa_row_2_scenario_TC_T9', test_methods)
+
+    def test_examples_file_errors(self):
+        "Prove a missing or malformed CSV file raises DataFileError"
+
+        with self.assertRaises(DataFileError):
+            self.run_feature()
+
+        self.write_csv('orders.csv', 'order_id,status\n1,OPEN\n2\n')
+        with self.assertRaisesRegex(DataFileError, 'line 3: 1 cells, expected 2'):
+            read_examples_csv(os.path.join(self.data_files_dir, 'orders.csv'))
+
+        self.write_csv('orders.csv', '')
+        with self.assertRaisesRegex(DataFileError, 'no column titles'):
+            read_examples_csv(os.path.join(self.data_files_dir, 'orders.csv'))
+
+    def test_examples_file_names_one_file(self):
+        with open(self.feature_file, 'a') as f:
+            f.write('            | more.csv      |\n')
+
+        with self.assertRaisesRegex(DataFileError, 'names one file, not 2'):
+            self.run_feature()
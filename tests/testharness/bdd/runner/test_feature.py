@@ -0,0 +1,165 @@
+from unittest import TestCase, mock
+
+import io
+import threading
+
+from morelia.formatters import PlainTextFormatter
+
+from testharness.bdd.runner import feature
+from testharness.bdd.runner.concurrent_rows import ConcurrentRowsError
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+
+RESPONSE_FIELDS = {
+    '/swagger.json': 'swagger,basePath,paths,info,produces,consumes,tags,definitions,responses,host',
+    '/osscwl/servers': 'WFA_SERVERS,message',
+    '/osscwl': 'message',
+}
+
+
+def fake_get(relative_url):
+    "Fake HTTP GET client for tests/features/TC-T1.feature"
+
+    response = mock.Mock()
+    response.status_code = 404 if relative_url == '/osscwl' else 200
+    response.headers = {'Content-Type': 'application/json'}
+    response.json.return_value = dict.fromkeys(RESPONSE_FIELDS[relative_url].split(','))
+    return response
+
+
+class GetFeatureTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by FeatureRunTests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+    barrier = None
+    formatter = None
+
+    def setUp(self):
+        # morelia calls setUp() again for every Examples row.
+        self.client = mock.Mock()
+        self.client.get.side_effect = self.get_url
+
+    def get_url(self, relative_url):
+        self.requested_urls.append(relative_url)
+        if self.barrier is not None:
+            self.barrier.wait()  # Every row must be waiting at once.
+        return fake_get(relative_url)
+
+    def test_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self)
+
+    def test_row_1_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self, row=1)
+
+    def test_row_3_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self, row=3)
+
+    def test_concurrent_scenario_TC_T1(self):
+        feature.run(self.FEATURE_FILE, self, concurrency=3, formatter=self.formatter)
+
+
+class FeatureRunTests(TestCase):
+
+    def test_get_feature_rows(self):
+        rows = feature.get_feature_rows(feature.load_feature(GetFeatureTestCase.FEATURE_FILE))
+
+        self.assertEqual(len(rows), 3)
+        self.assertEqual([scenario.predicate for (scenario, indices) in rows],
+                         ['Show OSSCWL Servers that are available'] * 3)
+
+    def test_run_feature(self):
+        "Prove run() executes every Examples row through the dispatch index"
+
+        test_case = GetFeatureTestCase('test_scenario_TC_T1')
+        test_case.requested_urls = []
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(test_case.requested_urls, ['/swagger.json', '/osscwl/servers', '/osscwl'])
+
+    def test_run_feature_failure(self):
+        "Prove a failing step still fails the test"
+
+        test_case = GetFeatureTestCase('test_scenario_TC_T1')
+        test_case.requested_urls = []
+        with mock.patch.dict(RESPONSE_FIELDS, {'/osscwl': 'wrong_field'}):
+            result = test_case.run()
+
+        self.assertEqual(len(result.failures), 1)
+
+    def test_run_feature_row(self):
+        "Prove run() with a row runs only that Examples row"
+
+        test_case = GetFeatureTestCase('test_row_1_scenario_TC_T1')
+        test_case.requested_urls = []
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(test_case.requested_urls, ['/osscwl/servers'])
+
+    def test_run_feature_missing_row(self):
+        test_case = GetFeatureTestCase('test_row_3_scenario_TC_T1')
+        test_case.requested_urls = []
+
+        with self.assertRaises(IndexError):
+            test_case.test_row_3_scenario_TC_T1()
+        self.assertEqual(test_case.requested_urls, [])
+
+    def run_concurrent_rows(self, **attrs):
+        test_case = GetFeatureTestCase('test_concurrent_scenario_TC_T1')
+        test_case.requested_urls = []
+        test_case.barrier = threading.Barrier(3, timeout=5)
+        for name, value in attrs.items():
+            setattr(test_case, name, value)
+        return (test_case, test_case.run())
+
+    def test_run_feature_concurrent_rows(self):
+        "Prove concurrent rows run at the same time and print their steps in row order"
+
+        stream = io.StringIO()
+        (test_case, result) = self.run_concurrent_rows(formatter=PlainTextFormatter(stream))
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        self.assertEqual(sorted(test_case.requested_urls), ['/osscwl', '/osscwl/servers', '/swagger.json'])
+        self.assertFalse(hasattr(test_case, 'response'))  # Each row had its own TestCase copy.
+
+        step_lines = [line.split('#')[0].strip() for line in stream.getvalue().splitlines()
+                      if line.strip().startswith('When ')]
+        self.assertEqual(step_lines, ['When User GETs endpoint /swagger.json',
+                                      'When User GETs endpoint /osscwl/servers',
+                                      'When User GETs endpoint /osscwl'])
+
+    def test_run_feature_concurrent_rows_failure(self):
+        "Prove every failed row is reported in one test failure"
+
+        with mock.patch.dict(RESPONSE_FIELDS, {'/swagger.json': 'wrong_field', '/osscwl': 'wrong_field'}):
+            (test_case, result) = self.run_concurrent_rows()
+
+        self.assertEqual(len(result.failures), 1)
+        self.assertEqual(result.errors, [])
+        failure_text = result.failures[0][1]
+        self.assertIn('2 of 3 rows failed', failure_text)
+        self.assertIn('row 0: ', failure_text)
+        self.assertIn('row 2: ', failure_text)
+        self.assertNotIn('row 1: ', failure_text)
+
+    def test_run_feature_concurrent_rows_error(self):
+        "Prove a row that raises an error makes the test an error"
+
+        with mock.patch.dict(RESPONSE_FIELDS, {'/osscwl/servers': None}):
+            (test_case, result) = self.run_concurrent_rows()
+
+        self.assertEqual(result.failures, [])
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn(ConcurrentRowsError.__name__, result.errors[0][1])
+        self.assertIn('1 of 3 rows failed', result.errors[0][1])
+
+    def test_run_feature_row_concurrency_attribute(self):
+        "Prove ROW_CONCURRENCY on the TestCase turns on concurrent rows"
+
+        test_case = GetFeatureTestCase('test_scenario_TC_T1')
+        test_case.requested_urls = []
+        test_case.barrier = threading.Barrier(3, timeout=5)
+        test_case.ROW_CONCURRENCY = 3
+        result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
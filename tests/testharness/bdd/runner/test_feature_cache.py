@@ -0,0 +1,87 @@
+import os
+import shutil
+import tempfile
+from unittest import TestCase, mock
+
+from morelia.grammar import Feature, Scenario, Step
+
+from testharness.bdd.runner import feature_cache
+
+FEATURE_FILE = 'tests/features/TC-T1.feature'
+
+
+def get_predicates(ast):
+    return [(type(step).__name__, step.predicate) for step in ast.steps]
+
+
+class FeatureCacheTests(TestCase):
+
+    def setUp(self):
+        self.features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.features_dir)
+        self.feature_file = os.path.join(self.features_dir, 'TC-T1.feature')
+        shutil.copy(FEATURE_FILE, self.feature_file)
+
+    def test_get_cache_path(self):
+        self.assertEqual(feature_cache.get_cache_path(self.feature_file),
+                         os.path.join(self.features_dir, '.cache', 'TC-T1.feature.pickle'))
+
+    def test_cold_then_warm(self):
+        "Prove the second load unpickles the same Feature without parsing it"
+
+        cold_ast = feature_cache.load_feature(self.feature_file)
+        self.assertTrue(os.path.isfile(feature_cache.get_cache_path(self.feature_file)))
+        self.assertIsInstance(cold_ast.steps[0], Feature)
+        self.assertTrue(any(isinstance(step, Scenario) for step in cold_ast.steps))
+        self.assertTrue(any(isinstance(step, Step) for step in cold_ast.steps))
+
+        with mock.patch.object(feature_cache.Parser, 'parse_file') as mock_parse_file:
+            warm_ast = feature_cache.load_feature(self.feature_file)
+            another_ast = feature_cache.load_feature(self.feature_file)
+
+        mock_parse_file.assert_not_called()
+        self.assertEqual(get_predicates(warm_ast), get_predicates(cold_ast))
+        self.assertIsNot(warm_ast, another_ast)
+
+    def test_touched_feature_file(self):
+        "Prove a touched but unchanged Feature file is hashed, not parsed"
+
+        feature_cache.load_feature(self.feature_file)
+        stat = os.stat(self.feature_file)
+        os.utime(self.feature_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 5000000000))
+
+        with mock.patch.object(feature_cache.Parser, 'parse_file') as mock_parse_file:
+            feature_cache.load_feature(self.feature_file)
+        mock_parse_file.assert_not_called()
+
+    def test_changed_feature_file(self):
+        "Prove a changed Feature file is parsed again"
+
+        feature_cache.load_feature(self.feature_file)
+        with open(self.feature_file, 'a') as f:
+            f.write('\n                | /osscwl/missing | 404         | application/json | message |\n')
+
+        ast = feature_cache.load_feature(self.feature_file)
+        self.assertIn(('Row', '/osscwl/missing | 404         | application/json | message |'),
+                      get_predicates(ast))
+
+    def test_corrupt_cache_file(self):
+        "Prove a corrupt cache file is parsed again and replaced"
+
+        cache_path = feature_cache.get_cache_path(self.feature_file)
+        os.makedirs(os.path.dirname(cache_path))
+        with open(cache_path, 'wb') as f:
+            f.write(b'not a pickle')
+
+        with self.assertLogs(feature_cache.log, 'WARNING'):
+            ast = feature_cache.load_feature(self.feature_file)
+        self.assertIsInstance(ast.steps[0], Feature)
+        self.assertIsNotNone(feature_cache._read_cache(cache_path))
+
+    def test_unwritable_cache(self):
+        "Prove the Feature still loads when the cache cannot be written"
+
+        with mock.patch.object(feature_cache.os, 'makedirs', side_effect=PermissionError('read-only')):
+            with self.assertLogs(feature_cache.log, 'WARNING'):
+                ast = feature_cache.load_feature(self.feature_file)
+        self.assertIsInstance(ast.steps[0], Feature)
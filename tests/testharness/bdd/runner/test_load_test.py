@@ -0,0 +1,170 @@
+from unittest import TestCase
+
+import os
+import shutil
+import tempfile
+
+from testharness.bdd.http import client as client_module
+from testharness.bdd.http import mock_server
+from testharness.bdd.http.client import PooledHttpClient
+from testharness.bdd.http.mock_server import get_mock_server
+from testharness.bdd.runner import load_test
+from testharness.bdd.steps_mixins.get_rest_api_common import HttpGetRestApiBDDStepsMixin
+
+GET_STEPS = ['When User GETs endpoint /swagger.json',
+             'When User GETs endpoint /osscwl/servers',
+             'When User GETs endpoint /osscwl']
+
+
+class LoadFeatureTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False  # Run only by the load tests.
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+
+    def setUp(self):
+        self.client = PooledHttpClient(get_mock_server(self.FEATURE_FILE).base_url)
+
+
+class SetUpClassFeatureTestCase(TestCase, HttpGetRestApiBDDStepsMixin):
+
+    __test__ = False
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+    class_fixture_calls = []
+
+    @classmethod
+    def setUpClass(cls):
+        cls.class_fixture_calls.append('setUpClass')
+        cls.server = get_mock_server(cls.FEATURE_FILE)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.class_fixture_calls.append('tearDownClass')
+        del cls.server
+
+    def setUp(self):
+        self.client = PooledHttpClient(self.server.base_url)
+
+
+class WithCleanupFeatureTestCase(LoadFeatureTestCase):
+
+    __test__ = False
+    cleanups = []
+
+    def setUp(self):
+        super(WithCleanupFeatureTestCase, self).setUp()
+        self.addCleanup(self.cleanups.append, 'cleanup')
+
+
+class MissingStepsTestCase(TestCase):
+
+    __test__ = False
+    FEATURE_FILE = 'tests/features/TC-T1.feature'
+
+
+class LoadTestTests(TestCase):
+
+    def setUp(self):
+        self.addCleanup(mock_server.stop_mock_servers)
+        self.addCleanup(client_module.close_connection_pools)
+
+    def test_percentile(self):
+        samples = list(range(1, 101))
+
+        self.assertEqual(load_test.percentile(samples, 50), 50)
+        self.assertEqual(load_test.percentile(samples, 95), 95)
+        self.assertEqual(load_test.percentile(samples, 99), 99)
+        self.assertEqual(load_test.percentile(samples, 100), 100)
+        self.assertEqual(load_test.percentile([7], 99), 7)
+        self.assertEqual(load_test.percentile([], 50), 0.0)
+
+    def test_iterations(self):
+        "Prove each virtual user runs the Feature's rows the number of iterations"
+
+        report = load_test.run_load_test(LoadFeatureTestCase, users=4, iterations=5)
+
+        self.assertEqual((report.iterations, report.failed_iterations), (20, 0))
+        self.assertEqual(get_mock_server(LoadFeatureTestCase.FEATURE_FILE).requests_served, 60)
+
+        steps = {stats['step']: stats for stats in report.steps}
+        for step in GET_STEPS:
+            stats = steps[step]
+            self.assertEqual((stats['count'], stats['failures']), (20, 0))
+            self.assertTrue(0 < stats['p50'] <= stats['p95'] <= stats['p99'] <= stats['max'])
+            self.assertGreater(stats['throughput'], 0)
+        self.assertEqual(len(steps), 9)  # Rows with the same step line share its stats.
+
+        text = report.format()
+        self.assertIn('4 users, 20 iterations (0 failed)', text)
+        self.assertIn('p95 ms', text)
+        self.assertIn(GET_STEPS[0], text)
+
+    def test_duration(self):
+        report = load_test.run_load_test(LoadFeatureTestCase, users=2, duration=0.2)
+
+        self.assertGreater(report.iterations, 2)
+        self.assertGreaterEqual(report.elapsed, 0.2)
+
+    def test_failures(self):
+        "Prove a failing step is counted, and the iteration failed"
+
+        server = get_mock_server(LoadFeatureTestCase.FEATURE_FILE)
+        server.add_route('GET', '/osscwl', status=500, body={'message': 'down'})
+
+        report = load_test.run_load_test(LoadFeatureTestCase, users=2, iterations=2)
+
+        self.assertEqual(report.failed_iterations, 4)
+        steps = {stats['step']: stats for stats in report.steps}
+        self.assertEqual(steps['Then the response code is 404']['failures'], 4)
+        self.assertEqual(steps['Then the response code is 200']['failures'], 0)
+        self.assertEqual(report.to_dict()['failed_iterations'], 4)
+
+        errors = report.to_dict()['errors']
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['count'], 4)
+        self.assertTrue(errors[0]['error'].startswith('AssertionError: 1 scenario failed'))
+        self.assertIn('AssertionError: 500 != 404', errors[0]['error'])
+        self.assertIn('AssertionError: 500 != 404', report.format())
+
+    def test_cleanups(self):
+        "Prove the cleanups of each iteration run, e.g. map_data()'s release_data_maps()"
+
+        del WithCleanupFeatureTestCase.cleanups[:]
+
+        report = load_test.run_load_test(WithCleanupFeatureTestCase, users=2, iterations=3)
+
+        self.assertEqual((report.iterations, report.failed_iterations), (6, 0))
+        # setUp() runs again for each of the 3 rows.
+        self.assertEqual(WithCleanupFeatureTestCase.cleanups, ['cleanup'] * 18)
+        self.assertEqual(report.to_dict()['errors'], [])
+
+    def test_class_fixture(self):
+        "Prove setUpClass() runs once before the virtual users, and tearDownClass() once after"
+
+        del SetUpClassFeatureTestCase.class_fixture_calls[:]
+
+        report = load_test.run_load_test(SetUpClassFeatureTestCase, users=3, iterations=2)
+
+        self.assertEqual((report.iterations, report.failed_iterations), (6, 0))
+        self.assertEqual(SetUpClassFeatureTestCase.class_fixture_calls, ['setUpClass', 'tearDownClass'])
+        self.assertFalse(hasattr(SetUpClassFeatureTestCase, 'server'))
+
+    def test_missing_steps(self):
+        with self.assertRaises(AssertionError) as cm:
+            load_test.run_load_test(MissingStepsTestCase)
+        self.assertIn('Cannot match steps:', str(cm.exception))
+
+    def test_get_feature_test_case(self):
+        "Prove the FeatureTestCase of a compiled module is found by module name or file"
+
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        module_path = os.path.join(temp_dir, 'test_TC_T9_feature.py')
+        with open(module_path, 'w') as f:
+            f.write('import unittest\n\n'
+                    'class FeatureTestCase(unittest.TestCase):\n'
+                    '    FEATURE_FILE = "features/TC-T9.feature"\n')
+
+        self.assertEqual(load_test.get_feature_test_case(module_path).FEATURE_FILE, 'features/TC-T9.feature')
+        self.assertIs(load_test.get_feature_test_case(__name__), LoadFeatureTestCase)
+        with self.assertRaises(ValueError):
+            load_test.get_feature_test_case('testharness.bdd.runner.load_test')
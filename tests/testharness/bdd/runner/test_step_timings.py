@@ -0,0 +1,113 @@
+from unittest import TestCase, mock
+
+import os
+import shutil
+import tempfile
+import threading
+
+from testharness.bdd.runner import step_timings
+
+from tests.testharness.bdd.runner.test_feature import GetFeatureTestCase
+
+TEST_CLASSNAME = 'tests.testharness.bdd.runner.test_feature.GetFeatureTestCase'
+
+TC_T1_STEPS = [
+    'When User GETs endpoint {}',
+    'Then the response code is {}',
+    'And the response content-type is application/json',
+    'And the response JSON has fields {}',
+]
+
+
+class StepTimingsTests(TestCase):
+
+    def setUp(self):
+        self.timings_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.timings_dir)
+        self.timings_filename = os.path.join(self.timings_dir, 'step_timings.jsonl')
+
+    def run_feature(self, test_method_name, **attrs):
+        test_case = GetFeatureTestCase(test_method_name)
+        test_case.requested_urls = []
+        for name, value in attrs.items():
+            setattr(test_case, name, value)
+
+        with mock.patch.dict(os.environ, {step_timings.STEP_TIMINGS_ENV: self.timings_filename}):
+            result = test_case.run()
+
+        self.assertTrue(result.wasSuccessful(), result.failures + result.errors)
+        return step_timings.load_step_timings(self.timings_filename)
+
+    def assert_row_steps(self, row_timing, row, relative_url, status_code, field_list):
+        self.assertEqual(row_timing['row'], row)
+        self.assertEqual(row_timing['scenario'], 'Show OSSCWL Servers that are available')
+        self.assertEqual([step_timing['step'] for step_timing in row_timing['steps']], [
+            TC_T1_STEPS[0].format(relative_url),
+            TC_T1_STEPS[1].format(status_code),
+            TC_T1_STEPS[2],
+            TC_T1_STEPS[3].format(field_list),
+        ])
+        self.assertEqual([step_timing['status'] for step_timing in row_timing['steps']], ['pass'] * 4)
+        self.assertAlmostEqual(row_timing['time'],
+                               sum(step_timing['time'] for step_timing in row_timing['steps']), 5)
+
+    def test_step_timings_all_rows(self):
+        "Prove every row and step of a test method is timed"
+
+        timings = self.run_feature('test_scenario_TC_T1')
+
+        self.assertEqual(list(timings.keys()), [(TEST_CLASSNAME, 'test_scenario_TC_T1')])
+        record = timings[(TEST_CLASSNAME, 'test_scenario_TC_T1')]
+        self.assertEqual(len(record['rows']), 3)
+        self.assert_row_steps(record['rows'][0], 0, '/swagger.json', 200,
+                              'swagger,basePath,paths,info,produces,consumes,tags,definitions,responses,host')
+        self.assert_row_steps(record['rows'][2], 2, '/osscwl', 404, 'message')
+        self.assertAlmostEqual(record['time'], sum(row_timing['time'] for row_timing in record['rows']), 5)
+        self.assertGreaterEqual(record['wall_time'], record['time'] * 0.9)
+
+    def test_step_timings_one_row(self):
+        "Prove a split row test method is timed with its Feature row number"
+
+        record = self.run_feature('test_row_1_scenario_TC_T1')[(TEST_CLASSNAME, 'test_row_1_scenario_TC_T1')]
+
+        self.assertEqual(len(record['rows']), 1)
+        self.assert_row_steps(record['rows'][0], 1, '/osscwl/servers', 200, 'WFA_SERVERS,message')
+
+    def test_step_timings_concurrent_rows(self):
+        "Prove concurrent rows are timed once each, in row order"
+
+        timings = self.run_feature('test_concurrent_scenario_TC_T1', barrier=threading.Barrier(3, timeout=5))
+
+        self.assertEqual(len(timings), 1)
+        record = timings[(TEST_CLASSNAME, 'test_concurrent_scenario_TC_T1')]
+        self.assertEqual([row_timing['row'] for row_timing in record['rows']], [0, 1, 2])
+        self.assert_row_steps(record['rows'][1], 1, '/osscwl/servers', 200, 'WFA_SERVERS,message')
+        # The overlapping rows' times add up to more than the run took.
+        self.assertLess(record['wall_time'], record['time'])
+
+    def test_load_step_timings_last_run_wins(self):
+        self.run_feature('test_row_1_scenario_TC_T1')
+        self.run_feature('test_row_1_scenario_TC_T1')
+
+        with open(self.timings_filename) as f:
+            self.assertEqual(len(f.readlines()), 2)
+        self.assertEqual(len(step_timings.load_step_timings(self.timings_filename)), 1)
+
+    def test_load_step_timings_missing_file(self):
+        self.assertEqual(step_timings.load_step_timings(self.timings_filename), {})
+
+    def test_format_step_timings(self):
+        record = {
+            'rows': [
+                {'row': 0, 'time': 0.25, 'steps': [
+                    {'step': 'When User GETs endpoint /a', 'status': 'pass', 'time': 0.2},
+                    {'step': 'Then the response code is 200', 'status': 'fail', 'time': 0.05},
+                ]},
+            ]
+        }
+
+        self.assertEqual(step_timings.format_step_timings(record), '\n'.join([
+            'row 0: 0.250s',
+            '    When User GETs endpoint /a [pass] 0.200s',
+            '    Then the response code is 200 [fail] 0.050s',
+        ]))
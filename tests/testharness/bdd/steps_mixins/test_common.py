@@ -0,0 +1,94 @@
+from unittest import TestCase, mock
+
+import os
+import shutil
+import tempfile
+
+from testharness.bdd.loader_mixins import common as loader_common
+from testharness.bdd.loader_mixins.cache import DataFileCache
+from testharness.bdd.steps_mixins.common import ResponseJSONMixin
+from testharness.bdd.steps_mixins.post_rest_api_common import HttpPostRestApiBDDStepsMixin
+
+
+def fake_response(payload):
+    response = mock.Mock(spec=['json', 'status_code', 'headers'])
+    response.json.return_value = payload
+    return response
+
+
+class PostStepsTestCase(TestCase, HttpPostRestApiBDDStepsMixin):
+
+    __test__ = False
+
+    def runTest(self):
+        pass
+
+
+class ResponseJSONMixinTests(TestCase):
+
+    def test_response_json_decoded_once(self):
+        "Prove every JSON step shares one decode of the response"
+
+        steps = PostStepsTestCase()
+        steps.response = fake_response({'TRK': 1, 'ROWS': [], 'message': 'SEC102E INCORRECT SIGNON'})
+
+        steps.step_the_response_JSON_has_fields_field_list('TRK,ROWS,message')
+        steps.step_the_response_JSON_message_contains_message_text('SEC102E')
+        steps.response.json.assert_called_once_with()
+
+    def test_new_response_decoded_again(self):
+        "Prove a new self.response replaces the memoized JSON"
+
+        mixin = ResponseJSONMixin()
+        mixin.response = fake_response({'a': 1})
+        self.assertEqual(mixin.response_json, {'a': 1})
+
+        mixin.response = fake_response({'b': 2})
+        self.assertEqual(mixin.response_json, {'b': 2})
+        self.assertEqual(mixin.response_json, {'b': 2})
+        mixin.response.json.assert_called_once_with()
+
+
+class PostPayloadTests(TestCase):
+
+    def setUp(self):
+        features_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, features_dir)
+        data_files_dir = os.path.join(features_dir, 'data', 'TC-T9')
+        os.makedirs(data_files_dir)
+        for data_filename in ('literal.json', 'order.tmpl.json'):
+            with open(os.path.join(data_files_dir, data_filename), 'w') as f:
+                f.write('{"order_id": "${order_id}"}')
+
+        patcher = mock.patch.object(loader_common, 'data_file_cache', DataFileCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.steps = PostStepsTestCase()
+        self.steps.FEATURE_FILE = os.path.join(features_dir, 'TC-T9.feature')
+        self.steps.client = mock.Mock(spec=['post'])
+
+    @mock.patch.dict(os.environ, {'order_id': 'from the environment'})
+    def test_payload_posted_as_stored(self):
+        "Prove a payload that is not a template keeps its literal ${...} text"
+
+        self.steps.step_User_POSTs_endpoint_relative_url_with_post_payload('/orders', 'literal.json')
+
+        self.steps.client.post.assert_called_once_with('/orders', {'order_id': '${order_id}'})
+
+    @mock.patch.dict(os.environ, {'order_id': '42'})
+    def test_payload_templates(self):
+        "Prove a *.tmpl.json payload, or any payload with POST_PAYLOAD_TEMPLATES, is filled in"
+
+        with self.assertRaises(loader_common.DataFileError):  # Not from the environment, by default.
+            self.steps.step_User_POSTs_endpoint_relative_url_with_post_payload('/orders', 'order.tmpl.json')
+
+        self.steps.TEMPLATE_ENVIRONMENT = True
+        self.steps.step_User_POSTs_endpoint_relative_url_with_post_payload('/orders', 'order.tmpl.json')
+        self.steps.POST_PAYLOAD_TEMPLATES = True
+        self.steps.step_User_POSTs_endpoint_relative_url_with_post_payload('/orders', 'literal.json')
+
+        self.assertEqual(self.steps.client.post.call_args_list, [
+            mock.call('/orders', {'order_id': '42'}),
+            mock.call('/orders', {'order_id': '42'}),
+        ])
@@ -0,0 +1,92 @@
+from unittest import TestCase, mock
+
+import json
+
+from testharness.bdd import json_codec as json_codec_module
+from testharness.bdd.json_codec import (
+    JSON_BACKENDS,
+    JSONCodec,
+    get_installed_backends
+)
+
+DOCUMENT = {
+    'name': 'naïve ✓ /path',
+    'values': [1, -2.5, 1e10, True, False, None],
+    'nested': {'b': [], 'a': {}},
+}
+
+
+class JSONCodecTests(TestCase):
+
+    def setUp(self):
+        self.codecs = [JSONCodec(backend) for backend in get_installed_backends()]
+
+    def test_installed_backends(self):
+        "Prove the stdlib is always installed and the fastest backend is the default"
+
+        installed = get_installed_backends()
+        self.assertEqual(installed[-1], 'json')
+        self.assertEqual([name for name in JSON_BACKENDS if name in installed], installed)
+        self.assertEqual(JSONCodec().backend, installed[0])
+
+    def test_round_trip(self):
+        "Prove every backend decodes what every backend encodes"
+
+        for codec in self.codecs:
+            for (sort_keys, indent) in [(False, None), (True, None), (True, 2), (False, 4)]:
+                text = codec.dumps(DOCUMENT, sort_keys=sort_keys, indent=indent)
+                self.assertIsInstance(text, str)
+                for other_codec in self.codecs:
+                    self.assertEqual(other_codec.loads(text), DOCUMENT, (codec.backend, other_codec.backend))
+                    self.assertEqual(other_codec.loads(text.encode('utf-8')), DOCUMENT)
+
+            sorted_text = codec.dumps(DOCUMENT['nested'], sort_keys=True)
+            self.assertLess(sorted_text.index('"a"'), sorted_text.index('"b"'), codec.backend)
+
+    def test_stdlib_fallback(self):
+        "Prove documents a fast backend refuses are handled by the stdlib"
+
+        for codec in self.codecs:
+            big_int = 2 ** 70
+            self.assertEqual(codec.loads(str(big_int)), big_int, codec.backend)
+            self.assertEqual(codec.loads(codec.dumps([big_int])), [big_int])
+            self.assertTrue(codec.loads('NaN') != codec.loads('NaN'))
+
+    def test_decode_error(self):
+        "Prove a corrupt document raises the stdlib JSONDecodeError and its position"
+
+        for codec in self.codecs:
+            with self.assertRaises(json.JSONDecodeError) as context:
+                codec.loads(b'{"a": tru}')
+            self.assertEqual(context.exception.pos, 6, codec.backend)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            JSONCodec('simplejson2')
+
+    def test_environment_backend(self):
+        "Prove BDD_JSON_BACKEND chooses the backend, and a bad one is ignored"
+
+        with mock.patch.dict('os.environ', {'BDD_JSON_BACKEND': 'json'}):
+            self.assertEqual(json_codec_module._get_default_codec().backend, 'json')
+
+        with mock.patch.dict('os.environ', {'BDD_JSON_BACKEND': 'no_such_backend'}):
+            with self.assertLogs(json_codec_module.log, 'WARNING'):
+                codec = json_codec_module._get_default_codec()
+        self.assertEqual(codec.backend, get_installed_backends()[0])
+
+    def test_loads_response(self):
+        "Prove a response is decoded from its content bytes, else by its own json()"
+
+        for codec in self.codecs:
+            response = mock.Mock(content=b'{"a": 1}')
+            self.assertEqual(codec.loads_response(response), {'a': 1})
+            response.json.assert_not_called()
+
+            response = mock.Mock(content=b'\xff\xfe{\x00}\x00')  # UTF-16
+            response.json.return_value = {}
+            self.assertEqual(codec.loads_response(response), {})
+
+            response = mock.Mock(spec=['json'])
+            response.json.return_value = {'b': 2}
+            self.assertEqual(codec.loads_response(response), {'b': 2})
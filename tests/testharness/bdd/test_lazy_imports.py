@@ -0,0 +1,34 @@
+from unittest import TestCase
+
+import subprocess
+import sys
+
+# Imported only when they are used, never by the bin/ scripts at startup.
+HEAVY_MODULES = ['concurrent.futures.process', 'jira_rest_clients', 'junitparser', 'morelia']
+
+CHECK_IMPORT_FMT = """
+import sys
+import {module_name}
+print(','.join(name for name in {heavy_modules!r} if name in sys.modules))
+"""
+
+
+class LazyImportTests(TestCase):
+
+    def get_heavy_modules(self, module_name):
+        "Import the module in a new interpreter and list the heavy modules it loaded"
+
+        output = subprocess.run(
+            [sys.executable, '-c', CHECK_IMPORT_FMT.format(module_name=module_name,
+                                                           heavy_modules=HEAVY_MODULES)],
+            stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout
+        return [name for name in output.strip().split(',') if name]
+
+    def test_lazy_imports(self):
+        "Prove the compiler and TM4J modules defer their heavy dependencies"
+
+        for module_name in ['testharness.bdd',
+                            'testharness.bdd.compiler.testcase_writer',
+                            'testharness.bdd.compiler.tm4j_features',
+                            'testharness.bdd.tm4j.report_testruns']:
+            self.assertEqual(self.get_heavy_modules(module_name), [], module_name)
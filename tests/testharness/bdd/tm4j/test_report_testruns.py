@@ -1,6 +1,9 @@
 from unittest import TestCase
 
+import json
 import os.path
+import shutil
+import tempfile
 
 from testharness.bdd.tm4j import report_testruns
 
@@ -127,3 +130,50 @@ class TM4JTestRunReporterTests(TestCase):
         results = reporter.all_testrun_reports
 
         self.assertEqual(results, EXPECTED_TESTRUN_RESULTS)
+
+    def test_reporter_and_step_timings_file(self):
+        "Prove the step timings sidecar file adds step times to the script results"
+
+        xunit_file = os.path.join(XUNIT_SAMPLES_DIR, 'prove_script_results.xml')
+        timings_file = os.path.join(XUNIT_SAMPLES_DIR, 'prove_step_timings.jsonl')
+        reporter = report_testruns.TM4JTestRunReporter(xunit_file, EXPECTED_USER_KEY,
+                                                       comment=EXPECTED_COMMENT,
+                                                       environment=EXPECTED_ENVIRONMENT,
+                                                       step_timings_filename=timings_file)
+        testrun_item = reporter.all_testrun_reports[0]['items'][0]
+
+        self.assertEqual(testrun_item['executionTime'], 0.847)
+        self.assertEqual(testrun_item['comment'], EXPECTED_COMMENT + '\n'
+                         'Step timings: 2 of 5 test cases, 0.505s wall time, 0.505s in rows')
+        self.assertEqual([script_result['comment'] for script_result in testrun_item['scriptResults']], [
+            'test_zero_TC_T1\n'
+            'row 0: 0.501s\n'
+            '    When User GETs endpoint /swagger.json [pass] 0.500s\n'
+            '    Then the response code is 200 [pass] 0.001s',
+            'test_one_TC_T1',
+            'test_two_TC_T1',
+            'test_three_TC_T1\n'
+            'row 0: 0.004s\n'
+            '    When User GETs endpoint /osscwl [fail] 0.004s',
+            'test_four_TC_T1',  # The sidecar file's test_four_TC_T1 is in another class.
+        ])
+
+    def test_reporter_and_step_timings_of_every_test_case(self):
+        "Prove the executionTime stays the XUnit time, and the comment has the step timings' wall time"
+
+        xunit_file = os.path.join(XUNIT_SAMPLES_DIR, 'prove_script_results.xml')
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        timings_file = os.path.join(temp_dir, 'step_timings.jsonl')
+
+        with open(timings_file, 'w') as f:
+            for name in ('zero', 'one', 'two', 'three', 'four'):
+                f.write(json.dumps({'classname': 'rest_api.tests.RestApiTestCases',
+                                    'name': 'test_{}_TC_T1'.format(name), 'rows': [],
+                                    'time': 0.3, 'wall_time': 0.1}) + '\n')
+        reporter = report_testruns.TM4JTestRunReporter(xunit_file, EXPECTED_USER_KEY,
+                                                       step_timings_filename=timings_file)
+        testrun_item = reporter.all_testrun_reports[0]['items'][0]
+
+        self.assertEqual(testrun_item['executionTime'], 0.847)
+        self.assertEqual(testrun_item['comment'], 'Step timings: 5 of 5 test cases, 0.500s wall time, 1.500s in rows')